@@ -4,10 +4,10 @@
 const BASE_URL = "http://localhost:8000";
 
 // ─── Helper ───────────────────────────────────────────────────────────────────
-async function request(method, path, body = null) {
+async function request(method, path, body = null, headers = {}) {
   const options = {
     method,
-    headers: { "Content-Type": "application/json" },
+    headers: { "Content-Type": "application/json", ...headers },
   };
   if (body) options.body = JSON.stringify(body);
 
@@ -33,16 +33,96 @@ export async function healthCheck() {
 /**
  * Step 1 — Send free text to Gemini for extraction, saves as draft.
  * Call this when user clicks "Log Entry".
+ * Simple check-ins come back right away; the rest are queued server-side (202)
+ * and this waits on getDraft until the extraction finishes.
+ * Pass the same `idempotencyKey` when retrying a check-in (e.g. after a timeout):
+ * the server then returns the first attempt's entry instead of saving it twice.
  * @returns { entry_id, extracted_data }
  */
-export async function createDraft({ userId, text, date, condition, conditionData }) {
-  return request("POST", "/entries/draft", {
+export async function createDraft({ userId, text, date, condition, conditionData, idempotencyKey }) {
+  const draft = await request("POST", "/entries/draft", {
     user_id: userId,
     text,
     date, // "YYYY-MM-DD"
     condition: condition || null,
     condition_data: conditionData || null,
+  }, idempotencyKey ? { "Idempotency-Key": idempotencyKey } : {});
+
+  let job = draft;
+  while (job.status === "queued" || job.status === "running") {
+    job = await getDraft(draft.entry_id, { wait: 20 });
+  }
+  if (job.status === "failed") throw new Error(job.error || "Extraction failed");
+  return { entry_id: draft.entry_id, extracted_data: job.extracted_data };
+}
+
+/**
+ * Status of a queued draft. With `wait` (seconds), the server holds the request
+ * until the job finishes or the wait runs out.
+ * @returns { entry_id, status: "queued"|"running"|"done"|"failed", attempts, extracted_data?, error? }
+ */
+export async function getDraft(entryId, { wait = 0 } = {}) {
+  return request("GET", `/entries/draft/${entryId}?wait=${wait}`);
+}
+
+/**
+ * Step 1 (streaming) — Same as createDraft, but Gemini's output is streamed back as
+ * Server-Sent Events so extracted fields can be shown while the model is still writing.
+ * @param {(key: string, value: any) => void} [onField] - called as each field parses
+ * @param {string} [idempotencyKey] - reuse on retries so a check-in is only saved once
+ * @returns { entry_id, extracted_data }
+ */
+export async function createDraftStream({ userId, text, date, condition, conditionData, onField, idempotencyKey }) {
+  const res = await fetch(`${BASE_URL}/entries/draft/stream`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      Accept: "text/event-stream",
+      ...(idempotencyKey ? { "Idempotency-Key": idempotencyKey } : {}),
+    },
+    body: JSON.stringify({
+      user_id: userId,
+      text,
+      date, // "YYYY-MM-DD"
+      condition: condition || null,
+      condition_data: conditionData || null,
+    }),
   });
+
+  if (!res.ok) {
+    const error = await res.json().catch(() => ({ detail: res.statusText }));
+    throw new Error(error.detail || "Something went wrong");
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = "message";
+      let data = "";
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+      }
+      const payload = data ? JSON.parse(data) : {};
+
+      if (event === "field") onField?.(payload.key, payload.value);
+      else if (event === "done") return payload;
+      else if (event === "error") throw new Error(payload.detail || "Something went wrong");
+    }
+  }
+
+  throw new Error("Connection closed before the entry was saved");
 }
 
 /**
@@ -57,16 +137,90 @@ export async function confirmEntry({ entryId, extractedData }) {
 }
 
 /**
- * Get all confirmed entries for the Timeline page.
+ * Import many historical entries at once (e.g. migrating from another app).
+ * @param {Array<{userId, text, date, condition?, conditionData?}>} entries
+ * @returns { total, imported, failed, entries: [{index, entry_id}], errors: [{index, detail}] }
+ */
+export async function bulkImport(entries) {
+  return request("POST", "/entries/bulk", {
+    entries: entries.map(({ userId, text, date, condition, conditionData }) => ({
+      user_id: userId,
+      text,
+      date, // "YYYY-MM-DD"
+      condition: condition || null,
+      condition_data: conditionData || null,
+    })),
+  });
+}
+
+/**
+ * Get confirmed entries for the Timeline page, newest first.
+ * With a month and no limit the whole month is returned; otherwise results are
+ * paged — pass the returned nextCursor back as `cursor` to load more.
  * @param {string} userId
  * @param {string} [month] - optional "YYYY-MM" filter
- * @returns { entries: [...] }
+ * @param {number} [limit] - page size (server default 50, max 200)
+ * @param {string} [cursor] - next_cursor from the previous page
+ * @param {string[]} [fields] - projection, e.g. ["id", "date", "excerpt", "tags", "mood"]
+ * @param {string} [tag] - only entries with this tag, e.g. "headache"
+ * @param {string} [mood] - only entries with this mood ("good" | "neutral" | "bad")
+ * @param {string} [start] - "YYYY-MM-DD", inclusive
+ * @param {string} [end] - "YYYY-MM-DD", inclusive
+ * @returns { entries: [...], next_cursor: string | null }
  */
-export async function getEntries({ userId, month = null }) {
-  const query = month ? `?month=${month}` : "";
+export async function getEntries({
+  userId, month = null, limit = null, cursor = null, fields = null,
+  tag = null, mood = null, start = null, end = null,
+}) {
+  const params = new URLSearchParams();
+  if (month) params.set("month", month);
+  if (limit) params.set("limit", limit);
+  if (cursor) params.set("cursor", cursor);
+  if (fields) params.set("fields", fields.join(","));
+  if (tag) params.set("tag", tag);
+  if (mood) params.set("mood", mood);
+  if (start) params.set("start", start);
+  if (end) params.set("end", end);
+  const query = params.toString() ? `?${params}` : "";
   return request("GET", `/entries/${userId}${query}`);
 }
 
+/**
+ * Full-text search over the user's journal text, best matches first.
+ * Supports plain words, prefixes (`migr*`) and quoted phrases (`"red wine"`).
+ * Snippets are HTML-escaped with matches wrapped in <mark>.
+ * @param {number} [limit] - page size (server default 20, max 100)
+ * @param {number} [offset] - next_offset from the previous page
+ * @returns { query, total, results: [{ entry_id, date, score, snippet }], next_offset: number | null }
+ */
+export async function searchEntries({ userId, q, limit = null, offset = null }) {
+  const params = new URLSearchParams({ q });
+  if (limit) params.set("limit", limit);
+  if (offset) params.set("offset", offset);
+  return request("GET", `/entries/${userId}/search?${params}`);
+}
+
+// ─── Metrics ──────────────────────────────────────────────────────────────────
+
+/**
+ * One condition metric ("glucose", "bp", "bp_secondary", "heart_rate"…) over any period.
+ * Long ranges come back downsampled: bucket "auto" picks raw / day / week / month.
+ * @param {string} [start] - "YYYY-MM-DD", inclusive (default: first reading)
+ * @param {string} [end] - "YYYY-MM-DD", inclusive (default: last reading)
+ * @param {string} [bucket] - "auto" | "raw" | "day" | "week" | "month"
+ * @param {number} [window] - rolling average window, in buckets (days for raw)
+ * @returns { metric, unit, threshold_high, threshold_low, bucket, summary, points: [...] }
+ */
+export async function getMetricSeries({ userId, metric, start = null, end = null, bucket = null, window = null }) {
+  const params = new URLSearchParams();
+  if (start) params.set("start", start);
+  if (end) params.set("end", end);
+  if (bucket) params.set("bucket", bucket);
+  if (window) params.set("window", window);
+  const query = params.toString() ? `?${params}` : "";
+  return request("GET", `/series/${userId}/${metric}${query}`);
+}
+
 // ─── Patterns ─────────────────────────────────────────────────────────────────
 
 /**
@@ -76,4 +230,30 @@ export async function getEntries({ userId, month = null }) {
 export async function getPatterns({ userId, condition }) {
   const query = condition ? `?condition=${condition}` : '';
   return request("GET", `/patterns/${userId}${query}`);
-}
\ No newline at end of file
+}
+
+/**
+ * Strongest associations mined across every tracked variable (same-day and next-day).
+ * @returns { has_enough_data: bool, entries_analyzed, associations: [...] }
+ */
+export async function getAssociations({ userId, minSupport, minLift, minConfidence }) {
+  const params = new URLSearchParams();
+  if (minSupport) params.set("min_support", minSupport);
+  if (minLift) params.set("min_lift", minLift);
+  if (minConfidence) params.set("min_confidence", minConfidence);
+  const query = params.toString() ? `?${params}` : "";
+  return request("GET", `/patterns/${userId}/associations${query}`);
+}
+
+/**
+ * Narrative insights generated from a compact digest of the user's history.
+ * Regenerated in the background when new entries land; `wait` (seconds) long-polls.
+ * @returns { status: "ready"|"refreshing"|"generating"|"failed", summary, insights: [...] }
+ */
+export async function getInsights({ userId, condition, wait }) {
+  const params = new URLSearchParams();
+  if (condition) params.set("condition", condition);
+  if (wait) params.set("wait", wait);
+  const query = params.toString() ? `?${params}` : "";
+  return request("GET", `/insights/${userId}${query}`);
+}
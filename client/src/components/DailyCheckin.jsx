@@ -2,7 +2,7 @@ import { useEffect, useRef, useState } from "react";
 import Webcam from 'react-webcam';
 import "./DailyCheckin.css";
 import InsightModal from '../components/InsightModal'
-import { createDraft } from '../backend/api'
+import { createDraftStream } from '../backend/api'
 import useConditionConfig from '../hooks/useConditionConfig'
 
 import { FaceLandmarker, FilesetResolver } from "@mediapipe/tasks-vision";
@@ -32,6 +32,9 @@ const DailyCheckIn = () => {
   const [error, setError] = useState(null);
   const [draftEntryId, setDraftEntryId] = useState(null);
   const [extractedData, setExtractedData] = useState(null);
+  const [streamedFields, setStreamedFields] = useState({});
+  // Same check-in → same key, so retrying after a timeout doesn't save it twice
+  const submissionRef = useRef({ submission: null, key: null });
 
   // --- STATES DE CAMARA DE 15 SEGUNDOS ---
   const [isModelLoaded, setIsModelLoaded] = useState(false);
@@ -69,6 +72,7 @@ const DailyCheckIn = () => {
     if (!entry.trim() && sleep === 0) return // Permitir submit si hay datos de cámara aunque no haya texto
     setLoading(true)
     setError(null)
+    setStreamedFields({})
     try {
       const now = new Date()
       const today = `${now.getFullYear()}-${String(now.getMonth() + 1).padStart(2, '0')}-${String(now.getDate()).padStart(2, '0')}`
@@ -97,14 +101,24 @@ const DailyCheckIn = () => {
       }
 
       const fullText = parts.join('. ')
-
-      const result = await createDraft({
+      const checkin = {
         userId: USER_ID,
         text: fullText,
         date: today,
         condition: condition !== 'general' ? condition : null,
         conditionData: condition !== 'general' ? conditionData : null,
+      }
+      const submission = JSON.stringify(checkin)
+      if (submissionRef.current.submission !== submission) {
+        submissionRef.current = { submission, key: crypto.randomUUID() }
+      }
+
+      const result = await createDraftStream({
+        ...checkin,
+        onField: (key, value) => setStreamedFields((prev) => ({ ...prev, [key]: value })),
+        idempotencyKey: submissionRef.current.key,
       })
+      submissionRef.current = { submission: null, key: null }
       setDraftEntryId(result.entry_id)
       setExtractedData(result.extracted_data)
       setShowInsights(true)
@@ -507,6 +521,18 @@ const DailyCheckIn = () => {
           {loading ? 'Analyzing with Gemini...' : (entry.length > 0 || sleep > 0) ? 'Log Entry →' : 'Log Entry'}
         </button>
 
+        {loading && Object.keys(streamedFields).length > 0 && (
+          <p className="footer-text">
+            Found: {[
+              ...(streamedFields.symptoms || []),
+              ...(streamedFields.food || []),
+              streamedFields.sleep && `${streamedFields.sleep} sleep`,
+              streamedFields.stress && `${streamedFields.stress} stress`,
+              streamedFields.mood && `${streamedFields.mood} mood`,
+            ].filter(Boolean).join(' · ')}
+          </p>
+        )}
+
         <p className="footer-text">Takes 30 seconds · No account needed</p>
       </div>
 
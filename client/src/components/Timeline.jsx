@@ -4,6 +4,7 @@ import './Timeline.css';
 import { getEntries } from '../backend/api';
 
 const USER_ID = 'demo-user';
+const PAGE_SIZE = 50;
 
 const MOOD_COLORS = {
   good:    '#6B8F71',
@@ -212,19 +213,40 @@ export default function Timeline() {
     new Date(today.getFullYear(), today.getMonth(), 1)
   );
   const [selectedId, setSelectedId] = useState(null);
-  const [entries, setEntries] = useState([]);
+  const [feed, setFeed] = useState({ month: null, entries: [], nextCursor: null });
   const [loading, setLoading] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const monthStr = `${currentMonth.getFullYear()}-${String(currentMonth.getMonth() + 1).padStart(2, '0')}`;
+  const entries = feed.month === monthStr ? feed.entries : [];
+  const nextCursor = feed.month === monthStr ? feed.nextCursor : null;
 
   useEffect(() => {
+    let stale = false;
     setLoading(true);
-    getEntries({ userId: USER_ID, month: monthStr })
-      .then((res) => setEntries(res.entries || []))
+    getEntries({ userId: USER_ID, month: monthStr, limit: PAGE_SIZE })
+      .then((res) => {
+        if (!stale) setFeed({ month: monthStr, entries: res.entries || [], nextCursor: res.next_cursor || null });
+      })
       .catch((err) => console.error('Failed to load entries:', err))
-      .finally(() => setLoading(false));
+      .finally(() => { if (!stale) setLoading(false); });
+    return () => { stale = true; };
   }, [monthStr]);
 
+  const loadMore = () => {
+    if (!nextCursor || loadingMore) return;
+    const month = monthStr;
+    setLoadingMore(true);
+    getEntries({ userId: USER_ID, month, limit: PAGE_SIZE, cursor: nextCursor })
+      .then((res) => setFeed((prev) => (prev.month !== month ? prev : {  // navigated away meanwhile
+        month,
+        entries: [...prev.entries, ...(res.entries || [])],
+        nextCursor: res.next_cursor || null,
+      })))
+      .catch((err) => console.error('Failed to load more entries:', err))
+      .finally(() => setLoadingMore(false));
+  };
+
   const isCurrentMonth =
     currentMonth.getFullYear() === today.getFullYear() &&
     currentMonth.getMonth()    === today.getMonth();
@@ -278,15 +300,22 @@ export default function Timeline() {
           ) : filteredEntries.length === 0 ? (
             <p className="no-entries">No entries for this month.</p>
           ) : (
-            filteredEntries.map((entry, i) => (
-              <DayCard
-                key={entry.id}
-                entry={entry}
-                index={i}
-                isSelected={selectedId === entry.id}
-                onClick={() => setSelectedId(selectedId === entry.id ? null : entry.id)}
-              />
-            ))
+            <>
+              {filteredEntries.map((entry, i) => (
+                <DayCard
+                  key={entry.id}
+                  entry={entry}
+                  index={i}
+                  isSelected={selectedId === entry.id}
+                  onClick={() => setSelectedId(selectedId === entry.id ? null : entry.id)}
+                />
+              ))}
+              {nextCursor && (
+                <button className="load-more-btn" onClick={loadMore} disabled={loadingMore}>
+                  {loadingMore ? 'Loading...' : 'Load earlier entries'}
+                </button>
+              )}
+            </>
           )}
         </div>
       </div>
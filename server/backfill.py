@@ -0,0 +1,47 @@
+"""
+Backfill the denormalized timeline columns (tags, mood, sleep, stress) for
+entries written before migrations/003_entries_denormalized.sql.
+
+Run from server/ against the configured STORAGE_BACKEND:
+    python backfill.py [--batch 500]
+
+Safe to re-run: it only touches rows whose tags are still null.
+"""
+import sys
+import asyncio
+import argparse
+
+import main
+
+
+async def backfill(batch: int = 500) -> set[str]:
+    """Fill the columns batch by batch; returns the users whose entries changed."""
+    users = set()
+    done = 0
+    while True:
+        rows = await main.storage.entries_missing("tags", "id, user_id, extracted_json", batch)
+        if not rows:
+            return users
+        for row in rows:
+            await main.storage.update_entry(row["id"], main._derived_columns(row.get("extracted_json") or {}))
+            users.add(row["user_id"])
+        done += len(rows)
+        print(f"🔁 Backfilled {done} entries...")
+
+
+async def run(batch: int):
+    try:
+        users = await backfill(batch)
+    finally:
+        await main.storage.close()
+    # Timelines served before the backfill showed these rows without tags — expire their ETags
+    for user_id in users:
+        main.data_versions.bump(user_id)
+    print(f"✅ Backfill complete — {len(users)} users updated")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args(sys.argv[1:])
+    asyncio.run(run(args.batch))
@@ -0,0 +1,237 @@
+"""
+Backtest for risk_model: prequential (predict, then learn) over synthetic
+histories where the next-day risk is known.
+
+Each synthetic user has their own hidden logistic model — how much short
+sleep, stress, alcohol and a headache the day before raise tomorrow's
+headache, fatigue and bad mood — and logs most days (some are skipped, so
+gaps are exercised). Walking each history in order, every next-day outcome
+is first predicted from the model state so far, then learned from — exactly
+what the write path does. Reported per target, after the first MIN_EXAMPLES
+pairs (what /patterns hides anyway):
+
+  • log loss, Brier score and AUC against two references: the user's running
+    base rate (what "usually N%" stats give) and the hidden true probability
+    (the best any model could do);
+  • calibration: expected calibration error and a reliability table;
+  • the cost of one update (µs) and the size of a stored state (bytes).
+
+--null runs the same on benchmarks.synthetic histories, which have no
+next-day structure: the model should then match the base rate, not overfit.
+
+Run from server/:
+    python -m benchmarks.backtest_risk [--users 200] [--days 365] [--null]
+"""
+import sys
+import json
+import math
+import time
+import random
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+from scipy.stats import rankdata
+
+import risk_model
+from benchmarks.synthetic import synthetic_entries
+
+BINS = 10
+
+
+# ── Synthetic histories with planted next-day effects ─────────────────────────
+def _true_weights(rng: random.Random) -> dict[str, dict[str, float]]:
+    """Hidden per-user coefficients on yesterday's state, per target."""
+    return {
+        "headache": {
+            "bias": rng.gauss(-2.2, 0.4), "low_sleep": rng.uniform(0.3, 1.6), "high_stress": rng.uniform(0, 1.2),
+            "alcohol": rng.uniform(0, 1.5), "headache": rng.uniform(0.3, 1.2), "exercise": -rng.uniform(0, 0.6),
+        },
+        "fatigue": {
+            "bias": rng.gauss(-1.8, 0.4), "low_sleep": rng.uniform(0.5, 1.8), "exercise": -rng.uniform(0, 0.8),
+            "fatigue": rng.uniform(0.2, 1.0), "headache": rng.uniform(0, 0.6),
+        },
+        "bad_mood": {
+            "bias": rng.gauss(-1.6, 0.4), "high_stress": rng.uniform(0.4, 1.5), "low_sleep": rng.uniform(0, 1.0),
+            "bad_mood": rng.uniform(0.2, 1.0), "exercise": -rng.uniform(0.2, 1.0),
+        },
+    }
+
+
+def _probability(weights: dict[str, float], yesterday: dict[str, float]) -> float:
+    z = weights["bias"] + sum(w * yesterday.get(k, 0.0) for k, w in weights.items() if k != "bias")
+    return 1 / (1 + math.exp(-z))
+
+
+def planted_history(user: int, days: int, seed: int) -> list[dict]:
+    """One user's entry rows, oldest first; each row carries the true next-day probabilities it was drawn with."""
+    rng = random.Random(seed * 100_003 + user)
+    weights = _true_weights(rng)
+    skip = rng.uniform(0.05, 0.3)
+    drinker = rng.uniform(0.05, 0.4)
+    stress_level = rng.choice(["low", "medium", "high"])
+    yesterday, rows = None, []
+    start = date(2025, 1, 1)
+
+    for i in range(days):
+        if yesterday is not None:
+            truth = {t: _probability(w, yesterday) for t, w in weights.items()}
+        else:
+            truth = {t: _probability(w, {}) for t, w in weights.items()}
+        outcome = {t: rng.random() < p for t, p in truth.items()}
+
+        hours = max(3.0, min(10.0, round(rng.gauss(7 - 1.5 * outcome["fatigue"] * rng.random(), 1.2))))
+        if rng.random() < 0.3:
+            stress_level = rng.choice(["low", "medium", "high"])
+        exercise = rng.random() < 0.35
+        food = rng.sample(["salad", "pasta", "fruit", "pizza", "coffee"], rng.randint(0, 2))
+        if rng.random() < drinker:
+            food.append(rng.choice(["wine", "beer"]))
+        mood = "bad" if outcome["bad_mood"] else rng.choice(["good", "neutral"])
+        symptoms = [s for s, t in (("headache", "headache"), ("Fatigue", "fatigue")) if outcome[t]]
+
+        yesterday = {
+            "low_sleep": float(hours < 6), "high_stress": float(stress_level == "high"),
+            "alcohol": float("wine" in food or "beer" in food), "exercise": float(exercise),
+            "headache": float(outcome["headache"]), "fatigue": float(outcome["fatigue"]),
+            "bad_mood": float(outcome["bad_mood"]),
+        }
+        if rng.random() < skip:
+            yesterday = None  # not logged: the next day has no inputs, and this day no outcome
+            continue
+        rows.append({
+            "id": f"u{user:05d}-{i:05d}",
+            "date": (start + timedelta(days=i)).isoformat(),
+            "extracted_json": {
+                "symptoms": symptoms, "sleep": "low" if hours < 6 else "medium", "sleep_hours": hours,
+                "food": food, "stress": stress_level, "exercise": exercise, "mood": mood,
+            },
+            "truth": truth,
+        })
+    return rows
+
+
+def null_history(user: int, days: int, seed: int) -> list[dict]:
+    """benchmarks.synthetic rows, one per day: features drawn independently of the day before."""
+    rows = synthetic_entries(days, seed=seed * 100_003 + user, condition=None, user_id=f"u{user}")
+    start = date(2025, 1, 1)
+    for i, row in enumerate(rows):
+        row["date"] = (start + timedelta(days=i)).isoformat()
+    return rows
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+def _log_loss(p: np.ndarray, y: np.ndarray) -> float:
+    p = np.clip(p, 1e-6, 1 - 1e-6)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+
+def _auc(p: np.ndarray, y: np.ndarray) -> float | None:
+    pos, neg = int(y.sum()), int(len(y) - y.sum())
+    if not pos or not neg:
+        return None
+    ranks = rankdata(p)  # ties share their mean rank
+    return float((ranks[y == 1].sum() - pos * (pos + 1) / 2) / (pos * neg))
+
+
+def _reliability(p: np.ndarray, y: np.ndarray) -> tuple[float, list[dict]]:
+    """Expected calibration error and the per-bin table (equal-width bins)."""
+    bins = np.minimum((p * BINS).astype(int), BINS - 1)
+    table, ece = [], 0.0
+    for b in range(BINS):
+        mask = bins == b
+        if not mask.any():
+            continue
+        predicted, observed = float(p[mask].mean()), float(y[mask].mean())
+        ece += mask.sum() / len(p) * abs(predicted - observed)
+        table.append({"bin": f"{b / BINS:.1f}-{(b + 1) / BINS:.1f}", "count": int(mask.sum()),
+                      "predicted": round(predicted, 3), "observed": round(observed, 3)})
+    return ece, table
+
+
+def _scores(p: np.ndarray, y: np.ndarray) -> dict:
+    auc = _auc(p, y)
+    return {
+        "log_loss": round(_log_loss(p, y), 4),
+        "brier": round(float(np.mean((p - y) ** 2)), 4),
+        "auc": round(auc, 3) if auc is not None else None,
+        "ece": round(_reliability(p, y)[0], 4),
+    }
+
+
+# ── Backtest ──────────────────────────────────────────────────────────────────
+def run(users: int = 200, days: int = 365, seed: int = 3, null: bool = False) -> dict:
+    histories = [(null_history if null else planted_history)(u, days, seed) for u in range(users)]
+    preds = {t: {"model": [], "base_rate": [], "truth": [], "y": []} for t in risk_model.TARGETS}
+    update_ns: list[int] = []
+    sizes: list[int] = []
+    entries = 0
+
+    for rows in histories:
+        state = risk_model.empty()
+        for row in rows:
+            entries += 1
+            last = state["day"]
+            scored = last is not None and date.fromisoformat(row["date"]) - date.fromisoformat(last) == timedelta(days=1)
+            if scored:
+                probabilities = risk_model.predict(state)
+                today = risk_model.day_features(row["extracted_json"])
+                for target, model in state["targets"].items():
+                    if model["n"] < risk_model.MIN_EXAMPLES:
+                        continue
+                    out = preds[target]
+                    out["model"].append(probabilities[target])
+                    out["base_rate"].append((model["pos"] + 1) / (model["n"] + 2))
+                    out["truth"].append(row.get("truth", {}).get(target, math.nan))
+                    out["y"].append(today[risk_model._INDEX[target]])
+
+            start = time.perf_counter_ns()
+            risk_model.update(state, row)
+            update_ns.append(time.perf_counter_ns() - start)
+        sizes.append(len(json.dumps(state, separators=(",", ":"))))
+
+    fit_started = time.perf_counter()
+    for rows in histories:
+        risk_model.fit(rows)
+    fit_ms = (time.perf_counter() - fit_started) * 1000 / users
+
+    targets = {}
+    for target, out in preds.items():
+        y = np.asarray(out["y"])
+        model = np.asarray(out["model"])
+        row = {
+            "pairs": int(len(y)),
+            "positive_rate": round(float(y.mean()), 3) if len(y) else None,
+            "model": _scores(model, y),
+            "base_rate": _scores(np.asarray(out["base_rate"]), y),
+        }
+        truth = np.asarray(out["truth"])
+        if not null:
+            row["truth"] = _scores(truth, y)
+            row["mean_abs_error_vs_truth"] = round(float(np.mean(np.abs(model - truth))), 4)
+        row["reliability"] = _reliability(model, y)[1]
+        targets[target] = row
+
+    ns = np.asarray(update_ns)
+    return {
+        "config": {"users": users, "days": days, "seed": seed, "histories": "null" if null else "planted",
+                   "entries": entries, "min_examples": risk_model.MIN_EXAMPLES},
+        "targets": targets,
+        "cost": {
+            "update_us_mean": round(float(ns.mean()) / 1000, 2),
+            "update_us_p99": round(float(np.percentile(ns, 99)) / 1000, 2),
+            "fit_ms_per_user": round(fit_ms, 2),
+            "state_bytes_mean": round(float(np.mean(sizes))),
+            "state_bytes_max": int(max(sizes)),
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=3)
+    parser.add_argument("--null", action="store_true", help="histories with no next-day structure")
+    args = parser.parse_args(sys.argv[1:])
+    print(json.dumps(run(args.users, args.days, args.seed, args.null), indent=2))
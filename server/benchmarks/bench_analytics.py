@@ -0,0 +1,170 @@
+"""
+Microbenchmark: dict-per-row _compute_patterns/_compute_stats (the original
+implementation, kept verbatim below) vs. the columnar NumPy path now used
+by main.py. Also checks both paths produce identical output.
+
+Run from server/:
+    python -m benchmarks.bench_analytics
+"""
+import os
+import json
+import time
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "offline")
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+
+import main
+from benchmarks.synthetic import synthetic_entries
+
+SIZES = [60, 10_000, 100_000]
+
+
+# ── Original row-at-a-time implementation ─────────────────────────────────────
+def _legacy_compute_patterns(entries: list[dict]) -> list[dict]:
+    """Analyze extracted_json fields across entries to find correlations."""
+    patterns = []
+
+    # Build per-entry flags
+    rows = []
+    for e in entries:
+        d = e.get("extracted_json") or {}
+        rows.append({
+            "low_sleep": d.get("sleep") == "low" or (d.get("sleep_hours") is not None and d.get("sleep_hours", 99) < 6),
+            "high_stress": d.get("stress") == "high",
+            "exercise": bool(d.get("exercise")),
+            "good_mood": d.get("mood") == "good",
+            "bad_mood": d.get("mood") == "bad",
+            "headache": "headache" in [s.lower() for s in (d.get("symptoms") or [])],
+            "fatigue": "fatigue" in [s.lower() for s in (d.get("symptoms") or [])],
+            "high_sleep": d.get("sleep") == "high" or (d.get("sleep_hours") is not None and d.get("sleep_hours", 0) >= 7),
+            "low_stress": d.get("stress") == "low",
+        })
+
+    # Define cause → effect rules to check
+    rules = [
+        ("low_sleep", "headache", "Sleeping < 6h", "Headache"),
+        ("low_sleep", "fatigue", "Sleeping < 6h", "Fatigue"),
+        ("low_sleep", "bad_mood", "Sleeping < 6h", "Bad mood"),
+        ("high_stress", "headache", "High stress", "Headache"),
+        ("high_stress", "bad_mood", "High stress", "Bad mood"),
+        ("high_stress", "low_sleep", "High stress", "Poor sleep"),
+        ("exercise", "good_mood", "Exercise", "Good mood"),
+        ("exercise", "high_sleep", "Exercise", "Better sleep"),
+        ("high_sleep", "good_mood", "Good sleep (7h+)", "Good mood"),
+        ("low_stress", "good_mood", "Low stress", "Good mood"),
+    ]
+
+    for cause_key, effect_key, cause_label, effect_label in rules:
+        cause_rows = [r for r in rows if r[cause_key]]
+        if len(cause_rows) < 2:
+            continue
+        both = sum(1 for r in cause_rows if r[effect_key])
+        pct = round(both / len(cause_rows) * 100)
+        if pct < 40:
+            continue
+
+        # Determine strength
+        is_positive = cause_key in ("exercise", "high_sleep", "low_stress")
+        if is_positive:
+            strength = "positive"
+        elif pct >= 75:
+            strength = "high"
+        else:
+            strength = "med"
+
+        patterns.append({
+            "cause": cause_label,
+            "effect": effect_label,
+            "occurrences": both,
+            "total": len(cause_rows),
+            "percentage": pct,
+            "strength": strength,
+        })
+
+    # Sort by percentage descending, take top 5
+    patterns.sort(key=lambda p: p["percentage"], reverse=True)
+    return patterns[:5]
+
+
+def _legacy_compute_stats(entries: list[dict]) -> dict:
+    """Compute summary statistics from entries."""
+    total = len(entries)
+    moods = {"good": 0, "neutral": 0, "bad": 0}
+    sleep_hours_list = []
+    exercise_count = 0
+    stress_counts = {"low": 0, "medium": 0, "high": 0}
+    all_symptoms = {}
+
+    for e in entries:
+        d = e.get("extracted_json") or {}
+        mood = d.get("mood", "neutral")
+        moods[mood] = moods.get(mood, 0) + 1
+
+        sh = d.get("sleep_hours")
+        if sh is not None:
+            sleep_hours_list.append(sh)
+
+        if d.get("exercise"):
+            exercise_count += 1
+
+        stress = d.get("stress", "medium")
+        stress_counts[stress] = stress_counts.get(stress, 0) + 1
+
+        for s in (d.get("symptoms") or []):
+            sl = s.lower()
+            all_symptoms[sl] = all_symptoms.get(sl, 0) + 1
+
+    avg_sleep = round(sum(sleep_hours_list) / len(sleep_hours_list), 1) if sleep_hours_list else None
+    top_symptoms = sorted(all_symptoms.items(), key=lambda x: x[1], reverse=True)[:5]
+
+    return {
+        "total_entries": total,
+        "mood_distribution": moods,
+        "avg_sleep_hours": avg_sleep,
+        "exercise_rate": round(exercise_count / total * 100) if total > 0 else 0,
+        "stress_distribution": stress_counts,
+        "top_symptoms": [{"name": s, "count": c} for s, c in top_symptoms],
+    }
+
+
+# ── Condition chart configs ────────────────────────────────────────────────────
+
+
+# ── Driver ────────────────────────────────────────────────────────────────────
+def _columnar(entries):
+    cols = main.decode_entries(entries)  # decoded once, shared by both
+    return main._compute_patterns(cols), main._compute_stats(cols)
+
+
+def _best_of(fn, entries, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(entries)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run() -> list[dict]:
+    results = []
+    for n in SIZES:
+        entries = synthetic_entries(n)
+        repeat = 20 if n <= 1000 else 3
+
+        assert main._compute_patterns(entries) == _legacy_compute_patterns(entries)
+        assert main._compute_stats(entries) == _legacy_compute_stats(entries)
+
+        legacy_ms = _best_of(lambda e: (_legacy_compute_patterns(e), _legacy_compute_stats(e)), entries, repeat)
+        columnar_ms = _best_of(_columnar, entries, repeat)
+        results.append({
+            "entries": n,
+            "legacy_ms": round(legacy_ms, 3),
+            "columnar_ms": round(columnar_ms, 3),
+            "speedup": round(legacy_ms / columnar_ms, 2),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,102 @@
+"""
+Load benchmark: GET /entries latency while slow drafts are in flight.
+
+Gemini is replaced by a fake that takes GEMINI_LATENCY seconds per call and
+Supabase by an in-memory table with a small per-query delay (or, with
+`sqlite`, storage is a real temporary SQLite database). We measure
+GET /entries/{user_id} latency first on an idle server, then while DRAFTS
+slow extractions are running concurrently. With the async I/O path the two
+p99s should be roughly the same.
+
+Run from server/:
+    python -m benchmarks.bench_event_loop [sqlite]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import asyncio
+import statistics
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "offline")
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+
+import httpx
+
+import main
+from benchmarks.fakes import FakeGemini, FakeSupabase
+from storage import SQLiteStorage, SupabaseStorage
+
+GEMINI_LATENCY = 2.0
+DB_LATENCY = 0.005
+DRAFTS = 8
+READS = 200
+USER_ID = "bench-user"
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+async def _timed_reads(client: httpx.AsyncClient, n: int) -> list[float]:
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        resp = await client.get(f"/entries/{USER_ID}")
+        resp.raise_for_status()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def _draft(client: httpx.AsyncClient, i: int):
+    resp = await client.post("/entries/draft", json={
+        "user_id": USER_ID,
+        "text": f"Slept 5 hours, headache, two coffees ({i})",
+        "date": f"2026-01-{(i % 28) + 1:02d}",
+    }, timeout=60)
+    resp.raise_for_status()
+
+
+def _summary(samples: list[float]) -> dict:
+    return {
+        "n": len(samples),
+        "p50_ms": round(statistics.median(samples), 2),
+        "p99_ms": round(_percentile(samples, 99), 2),
+        "max_ms": round(max(samples), 2),
+    }
+
+
+async def run(backend: str = "fake") -> dict:
+    main.gemini = FakeGemini(latency=GEMINI_LATENCY)
+    if backend == "sqlite":
+        main.storage = SQLiteStorage(os.path.join(tempfile.mkdtemp(), "bench.sqlite3"))
+    else:
+        main.storage = SupabaseStorage(FakeSupabase(latency=DB_LATENCY))
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Seed a little history so the read path does real work
+        await asyncio.gather(*(_draft(client, i) for i in range(30)))
+
+        idle = await _timed_reads(client, READS)
+
+        drafts = [asyncio.create_task(_draft(client, i)) for i in range(DRAFTS)]
+        await asyncio.sleep(0.05)  # let the drafts reach their Gemini await
+        loaded = await _timed_reads(client, READS)
+        await asyncio.gather(*drafts)
+
+    return {
+        "storage": main.storage.name if backend == "sqlite" else "fake supabase",
+        "gemini_latency_s": GEMINI_LATENCY,
+        "drafts_in_flight": DRAFTS,
+        "idle": _summary(idle),
+        "under_load": _summary(loaded),
+    }
+
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(run(*sys.argv[1:2])), indent=2))
@@ -0,0 +1,270 @@
+"""
+Load test: every HTTP endpoint under concurrent requests, fully offline.
+
+The app runs in-process (httpx ASGI transport, with its lifespan so the
+extraction workers are up) against FakeGemini and either the in-memory
+FakeSupabase or a temporary SQLite database. A reader's history of
+HISTORY synthetic entries is seeded first; writes go to a separate user so
+they don't invalidate the read caches mid-run.
+
+Each scenario gets one unmeasured warm-up request (first-read builds of
+aggregates / search index / metric series are not what we're timing), then
+REQUESTS requests from CONCURRENCY workers. Reported per scenario:
+throughput, p50/p95/p99/max latency and status counts. Gemini and Supabase
+failures can be injected to see how the error paths behave under load.
+
+Run from server/:
+    python -m benchmarks.bench_load [--backend sqlite] [--requests 200] [--concurrency 16]
+                                    [--gemini-error-rate 0.1] [--db-error-rate 0.01] [--only timeline,search]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import itertools
+import contextlib
+
+_workdir = tempfile.mkdtemp(prefix="koru-bench-")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "offline")
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+os.environ.setdefault("GEMINI_RPM", "1000000")   # the fake has no quota — don't let the scheduler throttle it
+os.environ.setdefault("GEMINI_TPM", "1000000000")
+for _var, _file in (("DATA_VERSION_PATH", "versions"), ("JOB_QUEUE_PATH", "jobs"), ("SEARCH_INDEX_PATH", "search"),
+                     ("IDEMPOTENCY_PATH", "idempotency"), ("INSIGHTS_PATH", "insights")):
+    os.environ.setdefault(_var, os.path.join(_workdir, f"{_file}.sqlite3"))
+
+import httpx
+
+import main
+import telemetry
+from benchmarks.fakes import DEFAULT_EXTRACTION, FakeGemini, FakeSupabase
+from benchmarks.synthetic import synthetic_entries
+from storage import SQLiteStorage, SupabaseStorage
+
+READ_USER = "bench-reader"
+WRITE_USER = "bench-writer"
+LOCAL_TEXTS = ["slept 7h, yoga, salad, relaxed, happy", "slept 9 hours, swam, pasta, relaxed, great day"]
+
+
+def _respond(prompt: str):
+    """Single extraction, or one per item for the bulk batch prompt."""
+    n = prompt.count('{"index": ')
+    return [{"index": i, **DEFAULT_EXTRACTION} for i in range(n)] if n else DEFAULT_EXTRACTION
+
+
+def _gemini_text(i: int) -> str:
+    return f"Long strange day number {i}, the aura came back and I left the office early"
+
+
+# ── Scenarios ─────────────────────────────────────────────────────────────────
+# Each is async (client, ctx, i) -> response. ctx carries ids between scenarios.
+async def _draft_queued(client, ctx, i):
+    resp = await client.post("/entries/draft", json={"user_id": WRITE_USER, "text": _gemini_text(i), "date": "2026-01-15"})
+    if resp.status_code < 300:
+        ctx["queued"].append(resp.json()["entry_id"])
+    return resp
+
+
+async def _draft_status(client, ctx, i):
+    return await client.get(f"/entries/draft/{ctx['queued'][i % len(ctx['queued'])]}")
+
+
+async def _stream(client, ctx, i):
+    resp = await client.post("/entries/draft/stream", json={
+        "user_id": WRITE_USER, "text": _gemini_text(100_000 + i), "date": "2026-01-16",
+    })
+    if "event: done" not in resp.text:
+        resp.status_code = 599  # the error arrives in-band as an SSE event
+    return resp
+
+
+async def _bulk(client, ctx, i):
+    return await client.post("/entries/bulk", json={"entries": [
+        {"user_id": WRITE_USER, "text": _gemini_text(200_000 + i * 20 + k), "date": "2025-06-01"} for k in range(20)
+    ]})
+
+
+async def _confirm(client, ctx, i):
+    entry_id = ctx["confirmable"][i % len(ctx["confirmable"])]
+    return await client.patch(f"/entries/{entry_id}/confirm", json={"extracted_data": {**DEFAULT_EXTRACTION, "mood": "good"}})
+
+
+SCENARIOS = {
+    # Reads
+    "root": lambda c, ctx, i: c.get("/"),
+    "health": lambda c, ctx, i: c.get("/health"),
+    "prometheus": lambda c, ctx, i: c.get("/metrics"),
+    "timeline": lambda c, ctx, i: c.get(f"/entries/{READ_USER}?limit=50"),
+    "timeline_month": lambda c, ctx, i: c.get(f"/entries/{READ_USER}?month=2023-0{i % 9 + 1}"),
+    "timeline_tag": lambda c, ctx, i: c.get(f"/entries/{READ_USER}?tag=headache&limit=50"),
+    "search": lambda c, ctx, i: c.get(f"/entries/{READ_USER}/search", params={"q": ["stress high", "slept 5h", "entr*"][i % 3]}),
+    "patterns": lambda c, ctx, i: c.get(f"/patterns/{READ_USER}"),
+    "associations": lambda c, ctx, i: c.get(f"/patterns/{READ_USER}/associations"),
+    "metric_series": lambda c, ctx, i: c.get(f"/series/{READ_USER}/glucose"),
+    "export": lambda c, ctx, i: c.get(f"/entries/{READ_USER}/export", params={"format": ("ndjson", "csv", "parquet")[i % 3]}),
+    # Writes
+    "draft_local": lambda c, ctx, i: c.post("/entries/draft", json={
+        "user_id": WRITE_USER, "text": LOCAL_TEXTS[i % 2], "date": "2026-01-14",
+    }),
+    "draft_queued": _draft_queued,
+    "draft_status": _draft_status,
+    "draft_stream": _stream,
+    "bulk_import": _bulk,
+    "confirm": _confirm,
+}
+
+
+# ── Driver ────────────────────────────────────────────────────────────────────
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def _drive(client, scenario, ctx, requests: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    indexes = itertools.count()
+
+    async def worker():
+        for i in iter(lambda: next(indexes), None):
+            if i >= requests:
+                return
+            start = time.perf_counter()
+            try:
+                status = str((await scenario(client, ctx, i)).status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    ok = sum(n for s, n in statuses.items() if s.isdigit() and int(s) < 400)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "throughput_rps": round(requests / wall, 1),
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+        "error_rate": round(1 - ok / requests, 4),
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+async def _seed(history: int) -> dict:
+    rows = synthetic_entries(history, user_id=READ_USER)
+    for row in rows:
+        row.update(main._derived_columns(row["extracted_json"]))
+    for c in range(0, len(rows), 500):
+        await main.storage.insert_entries(rows[c:c + 500])
+
+    writable = synthetic_entries(50, seed=11, user_id=WRITE_USER)
+    for row in writable:
+        row.pop("id")
+        row.update(main._derived_columns(row["extracted_json"]))
+    inserted = await main.storage.insert_entries(writable)
+    return {"queued": [], "confirmable": [r["id"] for r in inserted]}
+
+
+async def run(
+    backend: str = "fake",
+    history: int = 2_000,
+    requests: int = 200,
+    concurrency: int = 16,
+    gemini_latency: float = 0.05,
+    db_latency: float = 0.002,
+    gemini_error_rate: float = 0.0,
+    gemini_429_rate: float = 0.0,
+    db_error_rate: float = 0.0,
+    only: list[str] | None = None,
+) -> dict:
+    fake_db = None
+    if backend == "sqlite":
+        inner = SQLiteStorage(os.path.join(_workdir, "bench.sqlite3"))
+    else:
+        inner = SupabaseStorage(fake_db := FakeSupabase(latency=db_latency, seed=1))
+    main.storage = telemetry.InstrumentedStorage(inner)
+    main.gemini = FakeGemini(latency=gemini_latency, response=_respond, seed=2)
+
+    ctx = await _seed(history)
+    # Failures start after seeding so every run begins from the same data
+    main.gemini.error_rate = gemini_error_rate
+    main.gemini.rate_limit_rate = gemini_429_rate
+    if fake_db is not None:
+        fake_db.error_rate = db_error_rate
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for name, scenario in SCENARIOS.items():
+                if only and name not in only:
+                    continue
+                if name == "draft_status" and not ctx["queued"]:
+                    await _draft_queued(client, ctx, -1)
+                try:
+                    await scenario(client, ctx, requests)  # warm-up, not measured
+                except Exception:
+                    pass
+                results[name] = await _drive(client, scenario, ctx, requests, concurrency)
+                print(f"  {name:<16} {results[name]['throughput_rps']:>8} req/s   "
+                      f"p50 {results[name]['p50_ms']:>8} ms   p99 {results[name]['p99_ms']:>8} ms", file=sys.stderr)
+
+    return {
+        "config": {
+            "storage": inner.name if backend == "sqlite" else "fake supabase",
+            "history": history,
+            "requests": requests,
+            "concurrency": concurrency,
+            "gemini_latency_s": gemini_latency,
+            "db_latency_s": db_latency if backend != "sqlite" else None,
+            "gemini_error_rate": gemini_error_rate,
+            "gemini_429_rate": gemini_429_rate,
+            "db_error_rate": db_error_rate if backend != "sqlite" else None,
+        },
+        "scenarios": results,
+        "gemini_calls": main.gemini.calls,
+    }
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=["fake", "sqlite"], default="fake")
+    parser.add_argument("--history", type=int, default=2_000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--gemini-latency", type=float, default=0.05)
+    parser.add_argument("--db-latency", type=float, default=0.002)
+    parser.add_argument("--gemini-error-rate", type=float, default=0.0)
+    parser.add_argument("--gemini-429-rate", type=float, default=0.0)
+    parser.add_argument("--db-error-rate", type=float, default=0.0)
+    parser.add_argument("--only", default="", help="comma-separated scenario names")
+    return parser.parse_args(argv)
+
+
+def run_from_args(args: argparse.Namespace) -> dict:
+    with contextlib.redirect_stdout(sys.stderr):  # the app's logging; stdout is for the report
+        return asyncio.run(run(
+            backend=args.backend,
+            history=args.history,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            gemini_latency=args.gemini_latency,
+            db_latency=args.db_latency,
+            gemini_error_rate=args.gemini_error_rate,
+            gemini_429_rate=args.gemini_429_rate,
+            db_error_rate=args.db_error_rate,
+            only=[s for s in args.only.split(",") if s] or None,
+        ))
+
+
+if __name__ == "__main__":
+    print(json.dumps(run_from_args(parse_args(sys.argv[1:])), indent=2))
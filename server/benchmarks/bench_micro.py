@@ -0,0 +1,75 @@
+"""
+Microbenchmarks for the per-request analytics helpers in main.py:
+_compute_patterns, _compute_stats, _extract_tags (over every entry) and
+_compute_condition_chart, on deterministic synthetic histories from 60 to
+100k entries.
+
+Each case is repeated until it has run for ~MIN_SECONDS (at least 3 runs)
+and reports the best and median time. `output_hash` fingerprints the result,
+so a speedup that changes the answer shows up when comparing runs.
+
+Run from server/:
+    python -m benchmarks.bench_micro [--sizes 60,1000,10000,100000]
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import statistics
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "offline")
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+
+import main
+from benchmarks.synthetic import synthetic_entries
+
+SIZES = [60, 1_000, 10_000, 100_000]
+MIN_SECONDS = 0.5
+MAX_RUNS = 50
+
+CASES = {
+    "compute_patterns": lambda entries: main._compute_patterns(entries),
+    "compute_stats": lambda entries: main._compute_stats(entries),
+    "extract_tags": lambda entries: [main._extract_tags(e["extracted_json"]) for e in entries],
+    "compute_condition_chart": lambda entries: main._compute_condition_chart(entries),
+}
+
+
+def _fingerprint(result) -> str:
+    return hashlib.sha256(json.dumps(result, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+def _measure(fn, entries) -> dict:
+    samples = []
+    result = None
+    started = time.perf_counter()
+    while len(samples) < 3 or (time.perf_counter() - started < MIN_SECONDS and len(samples) < MAX_RUNS):
+        start = time.perf_counter()
+        result = fn(entries)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "runs": len(samples),
+        "best_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "us_per_entry": round(min(samples) * 1000 / len(entries), 3),
+        "output_hash": _fingerprint(result),
+    }
+
+
+def run(sizes: list[int] = SIZES) -> list[dict]:
+    results = []
+    for n in sizes:
+        entries = synthetic_entries(n)
+        for name, fn in CASES.items():
+            results.append({"case": name, "entries": n, **_measure(fn, entries)})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)))
+    args = parser.parse_args(sys.argv[1:])
+    print(json.dumps(run([int(s) for s in args.sizes.split(",")]), indent=2))
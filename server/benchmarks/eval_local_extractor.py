@@ -0,0 +1,91 @@
+"""
+Evaluation: local rule-based extractor vs. reference extractions.
+
+The fixture corpus holds check-in texts with hand-labelled extractions in
+the EXTRACTION_PROMPT schema. Reports how many texts take the fast path at
+the configured threshold, per-field agreement (all texts and fast-path
+texts only) and local latency. With --live, each text is also sent to
+Gemini so agreement is measured against the real model and its latency.
+
+Run from server/:
+    python -m benchmarks.eval_local_extractor [--live] [--threshold 0.8]
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "offline")
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+
+from local_extractor import extract_local
+
+CORPUS = os.path.join(os.path.dirname(__file__), "fixtures", "extraction_corpus.json")
+FIELDS = ["symptoms", "sleep", "sleep_hours", "food", "stress", "exercise", "mood"]
+
+
+def _same(field: str, a, b) -> bool:
+    if field in ("symptoms", "food"):
+        return sorted(x.lower() for x in a or []) == sorted(x.lower() for x in b or [])
+    return a == b
+
+
+def _agreement(pairs: list[tuple[dict, dict]]) -> dict:
+    if not pairs:
+        return {}
+    per_field = {f: round(sum(_same(f, got.get(f), ref.get(f)) for got, ref in pairs) / len(pairs), 3) for f in FIELDS}
+    exact = sum(all(_same(f, got.get(f), ref.get(f)) for f in FIELDS) for got, ref in pairs)
+    return {"items": len(pairs), "exact_match": round(exact / len(pairs), 3), "fields": per_field}
+
+
+async def _gemini_references(texts: list[str]) -> tuple[list[dict], float]:
+    import main
+
+    results, elapsed = [], []
+    for text in texts:
+        start = time.perf_counter()
+        results.append(await main.call_gemini(main.EXTRACTION_PROMPT.format(text=text)))
+        elapsed.append(time.perf_counter() - start)
+    return results, sum(elapsed) / len(elapsed) * 1000
+
+
+def run(threshold: float, live: bool = False) -> dict:
+    with open(CORPUS) as f:
+        corpus = json.load(f)
+    texts = [item["text"] for item in corpus]
+
+    start = time.perf_counter()
+    for _ in range(100):
+        local = [extract_local(t) for t in texts]
+    local_ms = (time.perf_counter() - start) / (100 * len(texts)) * 1000
+
+    references = [item["reference"] for item in corpus]
+    report = {"threshold": threshold, "reference": "fixture"}
+    if live:
+        references, gemini_ms = asyncio.run(_gemini_references(texts))
+        report["reference"] = "gemini"
+        report["gemini_ms_per_text"] = round(gemini_ms, 1)
+
+    pairs = [(got, ref) for (got, _), ref in zip(local, references)]
+    confident = [(got, ref) for (got, c), ref in zip(local, references) if c >= threshold]
+    report.update({
+        "texts": len(texts),
+        "fast_path_rate": round(len(confident) / len(texts), 3),
+        "local_ms_per_text": round(local_ms, 4),
+        "agreement_all": _agreement(pairs),
+        "agreement_fast_path": _agreement(confident),
+    })
+    if live:
+        report["speedup"] = round(report["gemini_ms_per_text"] / local_ms)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--live", action="store_true", help="compare against real Gemini calls")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("LOCAL_EXTRACTION_THRESHOLD", "0.8")))
+    args = parser.parse_args(sys.argv[1:])
+    print(json.dumps(run(args.threshold, args.live), indent=2))
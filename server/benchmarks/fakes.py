@@ -0,0 +1,304 @@
+"""
+In-memory stand-ins for the Supabase table API and the Gemini client.
+
+Only the surface main.py actually uses is implemented. Latency is injected
+with time.sleep() on the Supabase side (the real client is synchronous) and
+asyncio.sleep() on the Gemini side (main.py uses the async client).
+
+Both can also fail on purpose: `error_rate` (and, for Gemini,
+`rate_limit_rate`) makes that share of calls raise FakeAPIError, drawn from
+a seeded RNG so a run is reproducible.
+"""
+import json
+import time
+import uuid
+import random
+import asyncio
+from types import SimpleNamespace
+
+
+DEFAULT_EXTRACTION = {
+    "symptoms": ["headache"],
+    "sleep": "low",
+    "sleep_hours": 5,
+    "food": ["coffee"],
+    "stress": "high",
+    "exercise": False,
+    "mood": "bad",
+}
+
+
+class FakeAPIError(Exception):
+    """Upstream failure carrying an HTTP status in `.code`, like the real SDKs' errors."""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+# ── Supabase ──────────────────────────────────────────────────────────────────
+class FakeQuery:
+    def __init__(self, db: "FakeSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._op = "select"
+        self._columns = None
+        self._payload = None
+        self._filters = []
+        self._order = []
+        self._limit = None
+        self._offset = 0
+        self._on_conflict = None
+
+    def select(self, columns: str = "*"):
+        self._op = "select"
+        self._columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, payload):
+        self._op = "insert"
+        self._payload = payload
+        return self
+
+    def upsert(self, payload, on_conflict: str = "id"):
+        self._op = "upsert"
+        self._payload = payload
+        self._on_conflict = on_conflict
+        return self
+
+    def delete(self):
+        self._op = "delete"
+        return self
+
+    def update(self, payload: dict):
+        self._op = "update"
+        self._payload = payload
+        return self
+
+    def eq(self, col, val):
+        self._filters.append(lambda r: r.get(col) == val)
+        return self
+
+    def gt(self, col, val):
+        self._filters.append(lambda r: r.get(col) is not None and r.get(col) > val)
+        return self
+
+    def gte(self, col, val):
+        self._filters.append(lambda r: r.get(col) is not None and r.get(col) >= val)
+        return self
+
+    def lte(self, col, val):
+        self._filters.append(lambda r: r.get(col) is not None and r.get(col) <= val)
+        return self
+
+    def in_(self, col, values: list):
+        self._filters.append(lambda r: r.get(col) in values)
+        return self
+
+    def contains(self, col, values: list):
+        self._filters.append(lambda r: set(values) <= set(r.get(col) or []))
+        return self
+
+    def is_(self, col, val: str):
+        self._filters.append(lambda r: r.get(col) is None if val == "null" else r.get(col) is not None)
+        return self
+
+    def order(self, col, desc: bool = False):
+        self._order.append((col, desc))
+        return self
+
+    def or_(self, filters: str):
+        self._filters.append(_parse_or(filters))
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def range(self, start: int, end: int):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def execute(self):
+        if self._db.latency:
+            time.sleep(self._db.latency)
+        if self._db.error_rate and self._db.rng.random() < self._db.error_rate:
+            self._db.errors += 1
+            raise FakeAPIError(503, "injected Supabase failure")
+        rows = self._db.tables.setdefault(self._table, [])
+
+        if self._op == "insert":
+            items = self._payload if isinstance(self._payload, list) else [self._payload]
+            inserted = []
+            for item in items:
+                row = {"id": str(uuid.uuid4()), **json.loads(json.dumps(item))}
+                rows.append(row)
+                inserted.append(dict(row))
+            return SimpleNamespace(data=inserted)
+
+        if self._op == "upsert":
+            items = self._payload if isinstance(self._payload, list) else [self._payload]
+            written = []
+            for item in items:
+                item = json.loads(json.dumps(item))
+                existing = next((r for r in rows if r.get(self._on_conflict) == item.get(self._on_conflict)), None)
+                if existing is None:
+                    existing = {"id": str(uuid.uuid4())}
+                    rows.append(existing)
+                existing.update(item)
+                written.append(dict(existing))
+            return SimpleNamespace(data=written)
+
+        matched = [r for r in rows if all(f(r) for f in self._filters)]
+
+        if self._op == "delete":
+            self._db.tables[self._table] = [r for r in rows if r not in matched]
+            return SimpleNamespace(data=[dict(r) for r in matched])
+
+        if self._op == "update":
+            for r in matched:
+                r.update(json.loads(json.dumps(self._payload)))
+            return SimpleNamespace(data=[dict(r) for r in matched])
+
+        for col, desc in reversed(self._order):
+            matched.sort(key=lambda r: r.get(col) or "", reverse=desc)
+        if self._limit is not None:
+            matched = matched[self._offset : self._offset + self._limit]
+        elif self._offset:
+            matched = matched[self._offset :]
+        if self._columns:
+            matched = [{c: r.get(c) for c in self._columns} for r in matched]
+        else:
+            matched = [dict(r) for r in matched]
+        return SimpleNamespace(data=matched)
+
+
+_OPS = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "lt": lambda a, b: a is not None and a < b,
+    "lte": lambda a, b: a is not None and a <= b,
+    "gt": lambda a, b: a is not None and a > b,
+    "gte": lambda a, b: a is not None and a >= b,
+}
+
+
+def _split_top_level(expr: str) -> list[str]:
+    parts, depth, quoted, current = [], 0, False, ""
+    for ch in expr:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += ch
+    parts.append(current)
+    return parts
+
+
+def _parse_or(expr: str, combine=any):
+    """Parse PostgREST or=(...) / and(...) filter syntax into a row predicate."""
+    terms = []
+    for part in _split_top_level(expr):
+        part = part.strip()
+        if part.startswith(("and(", "or(")):
+            inner = part[part.index("(") + 1 : -1]
+            terms.append(_parse_or(inner, all if part.startswith("and(") else any))
+            continue
+        col, op, value = part.split(".", 2)
+        value = value.strip('"')
+        terms.append(lambda r, col=col, op=op, value=value: _OPS[op](r.get(col), value))
+    return lambda r: combine(t(r) for t in terms)
+
+
+class FakeSupabase:
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.errors = 0
+        self.tables: dict[str, list[dict]] = {}
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+
+# ── Gemini ────────────────────────────────────────────────────────────────────
+def _usage(prompt: str, text: str) -> SimpleNamespace:
+    """Rough stand-in for the SDK's usage_metadata (~4 chars per token)."""
+    prompt_tokens, output_tokens = len(prompt) // 4, len(text) // 4
+    return SimpleNamespace(
+        prompt_token_count=prompt_tokens,
+        candidates_token_count=output_tokens,
+        thoughts_token_count=None,
+        total_token_count=prompt_tokens + output_tokens,
+    )
+
+
+class _FakeAsyncModels:
+    def __init__(self, client: "FakeGemini"):
+        self._client = client
+
+    async def generate_content(self, model, contents, config=None):
+        self._client.calls += 1
+        if self._client.latency:
+            await asyncio.sleep(self._client.latency)
+        self._client.maybe_fail()
+        text = json.dumps(self._client.respond(contents))
+        return SimpleNamespace(text=text, usage_metadata=_usage(contents, text))
+
+    async def generate_content_stream(self, model, contents, config=None):
+        self._client.calls += 1
+        self._client.maybe_fail()
+        text = json.dumps(self._client.respond(contents))
+        size = self._client.stream_chunk_chars
+
+        async def chunks():
+            for i in range(0, len(text), size):
+                if self._client.latency:
+                    await asyncio.sleep(self._client.latency * size / len(text))
+                last = i + size >= len(text)
+                yield SimpleNamespace(text=text[i : i + size], usage_metadata=_usage(contents, text) if last else None)
+
+        return chunks()
+
+
+class FakeGemini:
+    """`response` is the reply for every prompt, or a callable(prompt) -> reply."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        response=None,
+        stream_chunk_chars: int = 16,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.stream_chunk_chars = stream_chunk_chars
+        self.response = response if response is not None else DEFAULT_EXTRACTION
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+        self.aio = SimpleNamespace(models=_FakeAsyncModels(self))
+
+    def respond(self, prompt: str):
+        return self.response(prompt) if callable(self.response) else self.response
+
+    def maybe_fail(self):
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            self.errors += 1
+            raise FakeAPIError(429, "RESOURCE_EXHAUSTED (injected)")
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.errors += 1
+            raise FakeAPIError(500, "INTERNAL (injected)")
@@ -0,0 +1,119 @@
+"""
+Run the micro and load benchmarks and the risk model backtest, and keep the numbers.
+
+Results go to benchmarks/results/<UTC timestamp>-<git sha>.json together with
+the machine they ran on, so runs before and after a change can be compared:
+
+    python -m benchmarks.run_all [--quick]
+    python -m benchmarks.run_all --compare results/OLD.json [results/NEW.json]
+
+--compare prints the % change of every latency / throughput figure the two
+files share (for latency, negative is better; for req/s, positive is) and
+flags microbenchmarks whose output hash changed.
+"""
+import os
+import sys
+import json
+import platform
+import argparse
+import subprocess
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks import backtest_risk, bench_load, bench_micro
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+QUICK_SIZES = [60, 1_000, 10_000]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def _meta() -> dict:
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+
+def _flatten(results: dict) -> dict[str, float]:
+    """Comparable figures: micro "<case>/<n>/<stat>", load "<scenario>/<stat>" and "risk/<target>/<stat>"."""
+    flat = {}
+    for row in results.get("micro", []):
+        for stat in ("best_ms", "median_ms"):
+            flat[f"micro/{row['case']}/{row['entries']}/{stat}"] = row[stat]
+    for name, row in results.get("load", {}).get("scenarios", {}).items():
+        for stat in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            flat[f"load/{name}/{stat}"] = row[stat]
+    risk = results.get("risk_backtest")
+    if risk:
+        for target, row in risk["targets"].items():
+            for stat in ("log_loss", "brier", "ece"):
+                flat[f"risk/{target}/{stat}"] = row["model"][stat]
+        flat["risk/update_us_mean"] = risk["cost"]["update_us_mean"]
+    return flat
+
+
+def compare(old: dict, new: dict) -> list[str]:
+    before, after = _flatten(old), _flatten(new)
+    lines = [f"{old['meta']['git_commit']} → {new['meta']['git_commit']}"]
+    for key in sorted(before.keys() & after.keys()):
+        if before[key]:
+            change = (after[key] - before[key]) / before[key] * 100
+            lines.append(f"  {key:<55} {before[key]:>10} → {after[key]:>10}  {change:+7.1f}%")
+
+    hashes = {(r["case"], r["entries"]): r["output_hash"] for r in old.get("micro", [])}
+    for row in new.get("micro", []):
+        previous = hashes.get((row["case"], row["entries"]))
+        if previous and previous != row["output_hash"]:
+            lines.append(f"  ⚠️ {row['case']} at {row['entries']} entries returns a different result")
+    return lines
+
+
+def _latest() -> str:
+    runs = sorted(f for f in os.listdir(RESULTS_DIR) if f.endswith(".json"))
+    return os.path.join(RESULTS_DIR, runs[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true", help="smaller histories and fewer requests")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--compare", nargs="+", metavar="RESULTS.json",
+                        help="compare OLD [NEW] (NEW defaults to the latest run)")
+    args, load_argv = parser.parse_known_args(sys.argv[1:])
+
+    if args.compare:
+        old_path = args.compare[0]
+        new_path = args.compare[1] if len(args.compare) > 1 else _latest()
+        with open(old_path) as f_old, open(new_path) as f_new:
+            print("\n".join(compare(json.load(f_old), json.load(f_new))))
+        sys.exit(0)
+
+    results = {"meta": _meta()}
+    print("⏱️  Microbenchmarks", file=sys.stderr)
+    results["micro"] = bench_micro.run(QUICK_SIZES if args.quick else bench_micro.SIZES)
+    print("⏱️  Risk model backtest", file=sys.stderr)
+    results["risk_backtest"] = backtest_risk.run(users=50 if args.quick else 200)
+    if not args.skip_load:
+        print("⏱️  Load test", file=sys.stderr)
+        load_args = bench_load.parse_args((["--requests", "50"] if args.quick else []) + load_argv)
+        results["load"] = bench_load.run_from_args(load_args)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = os.path.join(RESULTS_DIR, f"{stamp}-{results['meta']['git_commit']}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to {path}")
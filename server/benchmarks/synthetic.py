@@ -0,0 +1,42 @@
+"""Deterministic synthetic journal histories for benchmarks."""
+import random
+from datetime import date, timedelta
+
+SYMPTOMS = ["headache", "Fatigue", "nausea", "back pain", "dizziness", "insomnia", "bloating"]
+FOODS = ["coffee", "pizza", "salad", "wine", "chocolate", "pasta", "fruit", "fast food"]
+
+
+def synthetic_entries(n: int, seed: int = 7, condition: str | None = "diabetes", user_id: str = "bench-user") -> list[dict]:
+    """n entry rows (id, user_id, date, raw_text, extracted_json, status), oldest first."""
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    rows = []
+    for i in range(n):
+        day = start + timedelta(days=i * 365 * 5 // max(n, 1))
+        hours = rng.choice([None, 4, 5, 6, 7, 8, 9])
+        stress = rng.choice(["low", "medium", "high"])
+        extracted = {
+            "symptoms": rng.sample(SYMPTOMS, rng.choice([0, 0, 1, 1, 2])),
+            "sleep": "low" if hours and hours < 6 else rng.choice(["low", "medium", "high"]),
+            "sleep_hours": hours,
+            "food": rng.sample(FOODS, rng.randint(0, 3)),
+            "stress": stress,
+            "exercise": rng.random() < 0.35,
+            "mood": rng.choice(["good", "neutral", "bad"]),
+        }
+        if condition and rng.random() < 0.6:
+            extracted["condition"] = condition
+            extracted["condition_data"] = (
+                {"glucose": str(rng.randint(60, 240)), "insulin": rng.random() < 0.5, "carbs": rng.choice(["low", "high", ""])}
+                if condition == "diabetes"
+                else {"bp": f"{rng.randint(100, 170)}/{rng.randint(60, 110)}", "heart_rate": str(rng.randint(55, 110)), "medication": rng.random() < 0.5}
+            )
+        rows.append({
+            "id": f"e{i:07d}",
+            "user_id": user_id,
+            "date": day.isoformat(),
+            "raw_text": f"Entry {i}: slept {hours}h, stress {stress}.",
+            "extracted_json": extracted,
+            "status": "confirmed",
+        })
+    return rows
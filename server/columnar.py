@@ -0,0 +1,161 @@
+"""
+Columnar decoding of entries for vectorized pattern/stat analytics.
+
+Each entry's extracted_json is walked exactly once and decoded into NumPy
+columns (categorical codes, float hours, a symptom incidence list). Every
+pattern flag is then a boolean mask over those columns, all cause → effect
+rules are counted with a single flag-matrix product, and histograms are
+bincounts — so the cost per extra rule or per extra year of history is a
+vector op, not another Python pass over the rows.
+"""
+import numpy as np
+
+NAN = float("nan")
+
+
+class EntryColumns:
+    __slots__ = (
+        "n",
+        "mood", "mood_vocab",
+        "stress", "stress_vocab",
+        "sleep", "sleep_vocab",
+        "sleep_hours",
+        "exercise",
+        "symptom_rows", "symptom_ids", "symptom_vocab",
+    )
+
+
+def _code(vocab: dict, value) -> int:
+    code = vocab.get(value)
+    if code is None:
+        code = vocab[value] = len(vocab)
+    return code
+
+
+def _hours(value) -> float:
+    if value is None:
+        return NAN
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return NAN
+
+
+def decode_entries(entries: list[dict]) -> EntryColumns:
+    """Decode entries' extracted_json into columns in one pass."""
+    # Defaults first so histograms keep the same key order as the dict-based stats
+    mood_vocab = {"good": 0, "neutral": 1, "bad": 2}
+    stress_vocab = {"low": 0, "medium": 1, "high": 2}
+    sleep_vocab = {None: 0}
+    symptom_vocab: dict[str, int] = {}
+
+    mood: list[int] = []
+    stress: list[int] = []
+    sleep: list[int] = []
+    sleep_hours: list[float] = []
+    exercise: list[bool] = []
+    symptom_rows: list[int] = []
+    symptom_ids: list[int] = []
+
+    for i, e in enumerate(entries):
+        d = e.get("extracted_json") or {}
+        value = d.get("mood", "neutral")
+        mood.append(mood_vocab[value] if value in mood_vocab else _code(mood_vocab, value))
+        value = d.get("stress", "medium")
+        stress.append(stress_vocab[value] if value in stress_vocab else _code(stress_vocab, value))
+        value = d.get("sleep")
+        sleep.append(sleep_vocab[value] if value in sleep_vocab else _code(sleep_vocab, value))
+        value = d.get("sleep_hours")
+        sleep_hours.append(NAN if value is None else _hours(value))
+        exercise.append(bool(d.get("exercise")))
+        symptoms = d.get("symptoms")
+        if symptoms:
+            for s in symptoms:
+                symptom_rows.append(i)
+                symptom_ids.append(_code(symptom_vocab, s.lower()))
+
+    cols = EntryColumns()
+    cols.n = len(entries)
+    cols.mood, cols.mood_vocab = np.asarray(mood, dtype=np.int32), mood_vocab
+    cols.stress, cols.stress_vocab = np.asarray(stress, dtype=np.int32), stress_vocab
+    cols.sleep, cols.sleep_vocab = np.asarray(sleep, dtype=np.int32), sleep_vocab
+    cols.sleep_hours = np.asarray(sleep_hours, dtype=np.float64)
+    cols.exercise = np.asarray(exercise, dtype=bool)
+    cols.symptom_rows = np.asarray(symptom_rows, dtype=np.int64)
+    cols.symptom_ids = np.asarray(symptom_ids, dtype=np.int64)
+    cols.symptom_vocab = symptom_vocab
+    return cols
+
+
+def _is(column: np.ndarray, vocab: dict, value) -> np.ndarray:
+    code = vocab.get(value)
+    if code is None:
+        return np.zeros(column.shape[0], dtype=bool)
+    return column == code
+
+
+def has_symptom(cols: EntryColumns, name: str) -> np.ndarray:
+    mask = np.zeros(cols.n, dtype=bool)
+    sid = cols.symptom_vocab.get(name)
+    if sid is not None:
+        mask[cols.symptom_rows[cols.symptom_ids == sid]] = True
+    return mask
+
+
+def flag_columns(cols: EntryColumns) -> dict[str, np.ndarray]:
+    """Boolean per-entry flags used by the pattern rules."""
+    hours = cols.sleep_hours  # NaN compares False, i.e. "unknown"
+    return {
+        "low_sleep": _is(cols.sleep, cols.sleep_vocab, "low") | (hours < 6),
+        "high_stress": _is(cols.stress, cols.stress_vocab, "high"),
+        "exercise": cols.exercise,
+        "good_mood": _is(cols.mood, cols.mood_vocab, "good"),
+        "bad_mood": _is(cols.mood, cols.mood_vocab, "bad"),
+        "headache": has_symptom(cols, "headache"),
+        "fatigue": has_symptom(cols, "fatigue"),
+        "high_sleep": _is(cols.sleep, cols.sleep_vocab, "high") | (hours >= 7),
+        "low_stress": _is(cols.stress, cols.stress_vocab, "low"),
+    }
+
+
+def rule_counts(flags: dict[str, np.ndarray], rules: list[tuple]) -> tuple[dict[str, int], dict[str, int]]:
+    """
+    Count cause and cause∧effect entries for every (cause, effect, ...) rule
+    with one co-occurrence product F.T @ F over the flag matrix.
+    """
+    names = list(dict.fromkeys(name for rule in rules for name in rule[:2]))
+    index = {name: i for i, name in enumerate(names)}
+    n = len(next(iter(flags.values()))) if flags else 0
+
+    # float32 so the product goes through BLAS; counts stay exact below 2**24 rows
+    matrix = np.zeros((n, len(names)), dtype=np.float32)
+    for name, i in index.items():
+        matrix[:, i] = flags[name]
+    co = (matrix.T @ matrix).round().astype(np.int64)
+
+    cause_counts = {rule[0]: int(co[index[rule[0]], index[rule[0]]]) for rule in rules}
+    pair_counts = {
+        f"{cause}>{effect}": int(co[index[cause], index[effect]])
+        for cause, effect, *_ in rules
+    }
+    return cause_counts, pair_counts
+
+
+def _histogram(codes: np.ndarray, vocab: dict) -> dict:
+    counts = np.bincount(codes, minlength=len(vocab))
+    return {key: int(counts[code]) for key, code in vocab.items()}
+
+
+def stats_aggregates(cols: EntryColumns) -> dict:
+    """Summary-stat counters in the same shape as main._empty_aggregates()."""
+    known_hours = cols.sleep_hours[~np.isnan(cols.sleep_hours)]
+    symptom_counts = np.bincount(cols.symptom_ids, minlength=len(cols.symptom_vocab))
+    return {
+        "total": cols.n,
+        "moods": _histogram(cols.mood, cols.mood_vocab),
+        "stress": _histogram(cols.stress, cols.stress_vocab),
+        "symptoms": {s: int(symptom_counts[i]) for s, i in cols.symptom_vocab.items()},
+        "exercise": int(cols.exercise.sum()),
+        "sleep_hours_sum": float(known_hours.sum()),
+        "sleep_hours_count": int(known_hours.size),
+    }
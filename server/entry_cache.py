@@ -0,0 +1,276 @@
+"""
+Per-user hot cache of entries and aggregates, in process.
+
+Timeline and Patterns reads for an active user are served from memory: the
+user's whole confirmed history as compact records, sorted on (date, id),
+and their aggregates row. Writes go through — update_aggregates hands the
+cache every entry it adds or removes and every aggregates row it saves —
+so a check-in updates the user's slot instead of throwing it away.
+
+Each slot remembers the data version (http_cache.DataVersionStore) it
+reflects. Those versions live in a SQLite file every uvicorn worker on the
+host shares, and every write bumps them, so they double as the
+invalidation channel between workers: a read whose current version no
+longer matches drops the slot and reloads it. After a local write,
+`advance` moves the slot to the new version only when nobody else bumped
+in between; otherwise the slot is dropped.
+
+A fill races with writes in the same process: a read that fetched rows
+before a write landed must not cache them once the write has gone through
+(and `advance` would then carry them to the new version). Readers take a
+`ticket()` before fetching and hand it to put_*; a fill is refused if the
+user was written — apply, set_aggregates, drop — after the ticket.
+
+Slots are evicted least recently used first to stay under max_bytes
+(sizes are estimates). Users with more than max_user_entries confirmed
+entries are left to storage.
+"""
+import sys
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+
+RECORD_OVERHEAD = 100   # a slotted record, roughly
+RECENT_WRITES = 4096    # users whose last write time is remembered for refusing stale fills
+
+
+def _sizeof(value) -> int:
+    """Rough deep size of JSON-like data."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_sizeof(v) for v in value)
+    return size
+
+
+def _key(entry: "CachedEntry") -> tuple[str, str]:
+    return entry.date, entry.id
+
+
+def _date(entry: "CachedEntry") -> str:
+    return entry.date
+
+
+class CachedEntry:
+    """One confirmed entry's timeline columns; reads like the row dict it came from."""
+
+    __slots__ = ("id", "date", "raw_text", "tags", "mood", "extracted_json", "size")
+
+    def __init__(self, row: dict):
+        self.id = str(row["id"])
+        self.date = str(row["date"])[:10]
+        self.raw_text = row.get("raw_text")
+        self.tags = tuple(row.get("tags") or ())
+        self.mood = row.get("mood")
+        self.extracted_json = row.get("extracted_json") or {}
+        self.size = (RECORD_OVERHEAD + _sizeof(self.id) + _sizeof(self.raw_text)
+                     + _sizeof(self.tags) + _sizeof(self.extracted_json))
+
+    def __getitem__(self, column: str):
+        return getattr(self, column)
+
+    def get(self, column: str, default=None):
+        return getattr(self, column, default)
+
+
+class _Slot:
+    __slots__ = ("version", "entries", "aggregates", "size")
+
+    def __init__(self, version: int):
+        self.version = version
+        self.entries: list[CachedEntry] | None = None   # (date, id) order, oldest first
+        self.aggregates: dict | None = None
+        self.size = 0
+
+
+class EntryCache:
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_user_entries: int = 2000):
+        self.max_bytes = max_bytes
+        self.max_user_entries = max_user_entries
+        self._slots: OrderedDict[str, _Slot] = OrderedDict()
+        self._size = 0
+        self._oversize: set[str] = set()
+        self._clock = 0                                   # bumped on every write
+        self._written: OrderedDict[str, int] = OrderedDict()  # user → clock of their last write
+        self._forgotten = 0                               # newest clock evicted from _written
+        self.hits = 0
+        self.misses = 0
+
+    # ── Reads ─────────────────────────────────────────────────────────────────
+    def _current(self, user_id: str, version: int) -> _Slot | None:
+        slot = self._slots.get(user_id)
+        if slot is not None and slot.version != version:
+            self._evict(user_id)  # another worker wrote since
+            return None
+        if slot is not None:
+            self._slots.move_to_end(user_id)
+        return slot
+
+    def entries(self, user_id: str, version: int) -> list[CachedEntry] | None:
+        slot = self._current(user_id, version)
+        if slot is None or slot.entries is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return slot.entries
+
+    def aggregates(self, user_id: str, version: int) -> dict | None:
+        slot = self._current(user_id, version)
+        if slot is None or slot.aggregates is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return slot.aggregates
+
+    def admits(self, user_id: str) -> bool:
+        """False for users whose history was too long to keep — don't load it again."""
+        return user_id not in self._oversize
+
+    # ── Fills (after a miss) ──────────────────────────────────────────────────
+    def ticket(self) -> int:
+        """Take before fetching a fill from storage; pass to put_*."""
+        return self._clock
+
+    def _stale(self, user_id: str, ticket: int) -> bool:
+        """Was the user written after `ticket` was taken?"""
+        written = self._written.get(user_id)
+        if written is None:
+            return ticket < self._forgotten  # their last write may have been forgotten since
+        return written > ticket
+
+    def _slot_for(self, user_id: str, version: int, ticket: int) -> _Slot | None:
+        """The slot to fill with data read at `version`, or None if the data may already be stale."""
+        if self._stale(user_id, ticket):
+            return None
+        slot = self._slots.get(user_id)
+        if slot is not None and slot.version > version:
+            return None
+        if slot is None or slot.version != version:
+            self._evict(user_id)
+            slot = self._slots[user_id] = _Slot(version)
+        return slot
+
+    def put_entries(self, user_id: str, version: int, rows: list[dict], ticket: int) -> list[CachedEntry] | None:
+        """Cache a user's confirmed history (oldest first) read at `version`. None if it is too long."""
+        if len(rows) > self.max_user_entries:
+            self._oversize.add(user_id)
+            return None
+        entries = [CachedEntry(row) for row in rows]
+        slot = self._slot_for(user_id, version, ticket)
+        if slot is None:
+            return entries
+        self._resize(user_id, slot, -sum(e.size for e in slot.entries or ()))
+        slot.entries = entries
+        self._resize(user_id, slot, sum(e.size for e in entries))
+        return entries
+
+    def put_aggregates(self, user_id: str, version: int, aggregates: dict, ticket: int):
+        slot = self._slot_for(user_id, version, ticket)
+        if slot is not None:
+            self._set_aggregates(user_id, slot, aggregates)
+
+    # ── Write-through ─────────────────────────────────────────────────────────
+    def apply(self, user_id: str, add: list[dict] = (), remove: list[dict] = ()):
+        """Entries that became confirmed (`add`) or stopped being (`remove`) — rows already in storage."""
+        self._wrote(user_id)
+        slot = self._slots.get(user_id)
+        if slot is None or slot.entries is None:
+            return
+        gone = {str(row["id"]) for row in remove} | {str(row["id"]) for row in add}
+        delta = 0
+        if gone:
+            kept = [e for e in slot.entries if e.id not in gone]
+            delta -= sum(e.size for e in slot.entries) - sum(e.size for e in kept)
+            slot.entries = kept
+        for row in add:
+            entry = CachedEntry(row)
+            insort(slot.entries, entry, key=_key)
+            delta += entry.size
+        if len(slot.entries) > self.max_user_entries:
+            self._oversize.add(user_id)
+            self._evict(user_id)
+            return
+        self._resize(user_id, slot, delta)
+
+    def set_aggregates(self, user_id: str, aggregates: dict):
+        """The aggregates row just saved for a user."""
+        self._wrote(user_id)
+        slot = self._slots.get(user_id)
+        if slot is not None:
+            self._set_aggregates(user_id, slot, aggregates)
+
+    def advance(self, user_id: str, version: int):
+        """A write here bumped the user to `version`: keep the slot only if that was the only bump."""
+        slot = self._slots.get(user_id)
+        if slot is None:
+            return
+        if slot.version == version - 1:
+            slot.version = version
+        else:
+            self._evict(user_id)
+
+    def drop(self, user_id: str):
+        """Forget a user whose stored data changed outside apply/set_aggregates."""
+        self._wrote(user_id)
+        self._evict(user_id)
+
+    # ── Bookkeeping ───────────────────────────────────────────────────────────
+    def _wrote(self, user_id: str):
+        self._clock += 1
+        self._written[user_id] = self._clock
+        self._written.move_to_end(user_id)
+        if len(self._written) > RECENT_WRITES:
+            _, self._forgotten = self._written.popitem(last=False)
+
+    def _evict(self, user_id: str):
+        slot = self._slots.pop(user_id, None)
+        if slot is not None:
+            self._size -= slot.size
+
+    def _set_aggregates(self, user_id: str, slot: _Slot, aggregates: dict):
+        old = _sizeof(slot.aggregates) if slot.aggregates is not None else 0
+        slot.aggregates = aggregates
+        self._resize(user_id, slot, _sizeof(aggregates) - old)
+
+    def _resize(self, user_id: str, slot: _Slot, delta: int):
+        slot.size += delta
+        self._size += delta
+        if slot.size > self.max_bytes:
+            self._evict(user_id)
+            return
+        while self._size > self.max_bytes:
+            oldest = next(iter(self._slots))
+            self._evict(oldest)
+
+    def stats(self) -> dict:
+        return {"users": len(self._slots), "bytes": self._size, "hits": self.hits, "misses": self.misses}
+
+
+def page(
+    entries: list[CachedEntry],
+    start: str | None = None,
+    end: str | None = None,
+    before: tuple[str, str] | None = None,
+    tag: str | None = None,
+    mood: str | None = None,
+    limit: int | None = None,
+) -> list[CachedEntry]:
+    """Storage.list_entries over a cached history: newest first, same filters and keyset."""
+    out = []
+    stop = len(entries)
+    if end is not None:
+        stop = bisect_right(entries, end, key=_date)
+    if before is not None:
+        stop = min(stop, bisect_left(entries, tuple(before), key=_key))
+    for i in range(stop - 1, -1, -1):
+        entry = entries[i]
+        if start is not None and entry.date < start:
+            break
+        if tag is not None and tag not in entry.tags:
+            continue
+        if mood is not None and entry.mood != mood:
+            continue
+        out.append(entry)
+        if limit is not None and len(out) >= limit:
+            break
+    return out
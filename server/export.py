@@ -0,0 +1,230 @@
+"""
+Full-history export: one flat row per entry, encoded a page at a time.
+
+extracted_json is flattened into fixed columns so every format shares one
+schema that is known before the first row — CSV needs its header and
+Parquet its schema up front, and the export never holds more than a page:
+
+    id, date, created_at, raw_text,
+    symptoms, sleep, sleep_hours, food, stress, exercise, mood, condition,
+    condition_data.<key>        one per key in CONDITION_CHART_CONFIGS
+    extraction.source, extraction.confidence,
+    extra                       any other extracted_json keys, as JSON
+
+Writers turn a page of rows into bytes (`write`) and finish the file
+(`close`). Lists stay lists in NDJSON and Parquet; CSV joins them with "; ".
+"""
+import io
+import csv
+import json
+
+try:
+    import pyarrow as pa  # optional — only needed for format=parquet
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# (column, type) — type is one of "string", "float", "bool", "list"
+BASE_COLUMNS = (
+    ("id", "string"), ("date", "string"), ("created_at", "string"), ("raw_text", "string"),
+    ("symptoms", "list"), ("sleep", "string"), ("sleep_hours", "float"), ("food", "list"),
+    ("stress", "string"), ("exercise", "bool"), ("mood", "string"), ("condition", "string"),
+)
+EXTRACTION_COLUMNS = (("extraction.source", "string"), ("extraction.confidence", "float"))
+ROW_KEYS = ("id", "date", "created_at", "raw_text")
+LIST_SEPARATOR = "; "
+PARQUET_ROW_GROUP_ROWS = 10_000
+
+
+def schema(condition_configs: dict) -> list[tuple[str, str]]:
+    """Export columns; condition_data gets one per configured key (toggles are bools)."""
+    columns = list(BASE_COLUMNS)
+    seen = set()
+    for cfg in condition_configs.values():
+        keys = [(cfg["primary"]["key"], "string")]
+        keys += [(ind["key"], "bool" if ind["type"] == "toggle" else "string") for ind in cfg.get("indicators", [])]
+        for key, kind in keys:
+            if key not in seen:
+                seen.add(key)
+                columns.append((f"condition_data.{key}", kind))
+    return columns + list(EXTRACTION_COLUMNS) + [("extra", "string")]
+
+
+def _cast(value, kind: str):
+    if value is None or value == "":
+        return None
+    if kind == "string" and type(value) is str:
+        return value
+    if kind == "list":
+        return [str(v) for v in value] if isinstance(value, list) else [str(value)]
+    if kind == "bool":
+        return value if isinstance(value, bool) else str(value).lower() in ("true", "yes", "1")
+    if kind == "float":
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    if isinstance(value, list):  # several readings that day, e.g. "glucose": ["95", "160"]
+        return LIST_SEPARATOR.join(str(v) for v in value)
+    if hasattr(value, "isoformat"):  # date / created_at from Postgres
+        return value.isoformat()
+    return str(value)
+
+
+def _plan(columns: list[tuple[str, str]]) -> list[tuple[str, str, str, str]]:
+    """(column, source, key, type) per column — worked out once per export, not per row."""
+    plan = []
+    for name, kind in columns:
+        if name in ROW_KEYS:
+            plan.append((name, "row", name, kind))
+        elif name.startswith("condition_data."):
+            plan.append((name, "condition_data", name[len("condition_data."):], kind))
+        elif name.startswith("extraction."):
+            plan.append((name, "extraction", name[len("extraction."):], kind))
+        elif name != "extra":
+            plan.append((name, "extracted", name, kind))
+    return plan
+
+
+def flatten(row: dict, plan: list[tuple[str, str, str, str]]) -> dict:
+    """One entry row (id, date, created_at, raw_text, extracted_json) → a flat export row."""
+    d = dict(row.get("extracted_json") or {})
+    cdata = d.pop("condition_data", None)
+    sources = {
+        "row": row,
+        "extracted": d,
+        "condition_data": dict(cdata) if isinstance(cdata, dict) else {},
+        "extraction": {},
+    }
+    extraction = d.pop("extraction", None)
+    if isinstance(extraction, dict):
+        sources["extraction"] = extraction
+
+    out = {}
+    for name, source, key, kind in plan:
+        value = sources[source].get(key) if source in ("row", "extraction") else sources[source].pop(key, None)
+        out[name] = _cast(value, kind)
+
+    # Whatever the fixed columns didn't take is kept, so the export is lossless
+    if sources["condition_data"]:
+        d["condition_data"] = sources["condition_data"]
+    out["extra"] = json.dumps(d, ensure_ascii=False, default=str) if d else None
+    return out
+
+
+# ── Writers ───────────────────────────────────────────────────────────────────
+class NDJSONWriter:
+    media_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def __init__(self, columns: list[tuple[str, str]]):
+        self.columns = columns
+        self._plan = _plan(columns)
+
+    def write(self, rows: list[dict]) -> bytes:
+        return "".join(
+            json.dumps(flatten(row, self._plan), ensure_ascii=False, separators=(",", ":")) + "\n" for row in rows
+        ).encode("utf-8")
+
+    def close(self) -> bytes:
+        return b""
+
+
+class CSVWriter:
+    media_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def __init__(self, columns: list[tuple[str, str]]):
+        self.columns = columns
+        self._plan = _plan(columns)
+        self._started = False
+
+    def _cell(self, value):
+        if value is None:
+            return ""
+        if isinstance(value, list):
+            return LIST_SEPARATOR.join(value)
+        if isinstance(value, bool):
+            return "true" if value else "false"
+        return value
+
+    def write(self, rows: list[dict]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if not self._started:
+            writer.writerow([name for name, _ in self.columns])
+            self._started = True
+        for row in rows:
+            flat = flatten(row, self._plan)
+            writer.writerow([self._cell(flat[name]) for name, _ in self.columns])
+        return buffer.getvalue().encode("utf-8")
+
+    def close(self) -> bytes:
+        return b"" if self._started else self.write([])
+
+
+class _Chunks(io.RawIOBase):
+    """Write-only sink that hands out what was written so far; tell() keeps counting."""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class ParquetWriter:
+    """Pages are buffered as Arrow tables into row groups of ~row_group_rows; close() writes the footer."""
+
+    media_type = "application/vnd.apache.parquet"
+    extension = "parquet"
+
+    def __init__(self, columns: list[tuple[str, str]], row_group_rows: int = PARQUET_ROW_GROUP_ROWS):
+        if pa is None:
+            raise RuntimeError("Parquet export needs pyarrow installed.")
+        types = {"string": pa.string(), "float": pa.float64(), "bool": pa.bool_(), "list": pa.list_(pa.string())}
+        self.columns = columns
+        self._plan = _plan(columns)
+        self.schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        self.row_group_rows = row_group_rows
+        self._pending: list = []
+        self._pending_rows = 0
+        self._sink = _Chunks()
+        self._writer = pq.ParquetWriter(self._sink, self.schema, compression="zstd")
+
+    def _flush(self):
+        if self._pending:
+            self._writer.write_table(pa.concat_tables(self._pending), row_group_size=self._pending_rows)
+            self._pending, self._pending_rows = [], 0
+
+    def write(self, rows: list[dict]) -> bytes:
+        flat = [flatten(row, self._plan) for row in rows]
+        self._pending.append(pa.Table.from_pydict(
+            {name: [r[name] for r in flat] for name, _ in self.columns}, schema=self.schema,
+        ))
+        self._pending_rows += len(rows)
+        if self._pending_rows >= self.row_group_rows:
+            self._flush()
+        return self._sink.take()
+
+    def close(self) -> bytes:
+        self._flush()
+        self._writer.close()
+        return self._sink.take()
+
+
+WRITERS = {"ndjson": NDJSONWriter, "csv": CSVWriter, "parquet": ParquetWriter}
@@ -0,0 +1,136 @@
+"""
+Content-addressed cache for Gemini extraction results.
+
+Extraction is deterministic (temperature=0.0, fixed model), so the same
+normalized text under the same model + prompt version always maps to the
+same JSON. Two tiers:
+
+  1. In-process LRU with a TTL — always on.
+  2. Optional SQLite file — survives restarts, shared by workers on one host.
+
+A hit in either tier skips the Gemini round-trip entirely.
+"""
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize_text(text: str) -> str:
+    """Fold case, unicode forms and whitespace so trivial resubmits share a key."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    return " ".join(text.split())
+
+
+def cache_key(text: str, model: str, prompt_version: str) -> str:
+    payload = "\x1f".join((model, prompt_version, normalize_text(text)))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 7 * 24 * 3600, db_path: str | None = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS extraction_cache ("
+                "  key TEXT PRIMARY KEY,"
+                "  value TEXT NOT NULL,"
+                "  expires_at REAL NOT NULL"
+                ")"
+            )
+            self._db.commit()
+
+    # ── Memory tier ───────────────────────────────────────────────────────────
+    def _memory_get(self, key: str) -> str | None:
+        with self._lock:
+            item = self._memory.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return value
+
+    def _memory_put(self, key: str, value: str, expires_at: float):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    # ── Persistent tier ───────────────────────────────────────────────────────
+    def _db_get(self, key: str) -> tuple[float, str] | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT expires_at, value FROM extraction_cache WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            ).fetchone()
+        return row
+
+    def _db_put(self, key: str, value: str, expires_at: float):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO extraction_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            self._db.commit()
+
+    # ── Public API ────────────────────────────────────────────────────────────
+    async def get(self, key: str) -> dict | list | None:
+        """Return a fresh copy of the cached result, or None on a miss."""
+        value = self._memory_get(key)
+        if value is not None:
+            self.hits += 1
+            return json.loads(value)
+
+        if self._db is not None:
+            row = await asyncio.to_thread(self._db_get, key)
+            if row is not None:
+                expires_at, value = row
+                self._memory_put(key, value, expires_at)
+                self.hits += 1
+                self.persistent_hits += 1
+                return json.loads(value)
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, result: dict | list):
+        value = json.dumps(result)
+        expires_at = time.time() + self.ttl_seconds
+        self._memory_put(key, value, expires_at)
+        if self._db is not None:
+            await asyncio.to_thread(self._db_put, key, value, expires_at)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "persistent": self._db is not None,
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
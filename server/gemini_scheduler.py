@@ -0,0 +1,276 @@
+"""
+Shared scheduler in front of every Gemini call.
+
+  • Token buckets sized to the model's RPM and TPM quota; a 429 empties them
+    so every caller backs off together instead of each retrying blindly.
+  • A priority queue — interactive check-ins are dispatched ahead of bulk
+    imports, which go ahead of background work.
+  • Single-flight: identical prompts already in flight share one call.
+  • A circuit breaker that fails fast after repeated upstream errors and
+    lets one probe through after a cooldown.
+
+Counters (queued, in flight, coalesced, rejected, throttled, latency) are
+exposed through stats() for /health.
+"""
+import time
+import heapq
+import random
+import asyncio
+import hashlib
+import itertools
+from collections import deque
+from contextlib import asynccontextmanager
+
+INTERACTIVE = 0
+BULK = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk", BACKGROUND: "background"}
+
+
+class SchedulerRejected(Exception):
+    """Raised when a call is refused up front (breaker open or queue full)."""
+
+
+def error_status(e: Exception) -> int | None:
+    """HTTP status of an upstream error, if it carries one."""
+    for attr in ("code", "status_code"):
+        value = getattr(e, attr, None)
+        if isinstance(value, int):
+            return value
+    return 429 if "429" in str(e) else None
+
+
+class TokenBucket:
+    """Refills `per_minute` tokens per minute, holding at most one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost: float) -> float:
+        """Seconds until `cost` tokens are available (0 if they are now)."""
+        self._refill()
+        cost = min(cost, self.capacity)
+        return 0.0 if self.tokens >= cost else (cost - self.tokens) / self.rate
+
+    def take(self, cost: float):
+        self._refill()
+        self.tokens -= min(cost, self.capacity)
+
+    def drain(self):
+        self._refill()
+        self.tokens = min(self.tokens, 0.0)
+
+
+class CircuitBreaker:
+    """closed → open after `threshold` consecutive failures → half-open after `cooldown` s."""
+
+    def __init__(self, threshold: int = 5, cooldown: float = 30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record(self, ok: bool):
+        self.probing = False
+        if ok:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.failures >= self.threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+
+class GeminiScheduler:
+    def __init__(
+        self,
+        call,
+        rpm: int,
+        tpm: int,
+        max_concurrency: int = 8,
+        max_queue: int = 500,
+        breaker: CircuitBreaker | None = None,
+        output_tokens: int = 300,
+    ):
+        self._call = call  # async (prompt) -> response text
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.breaker = breaker or CircuitBreaker()
+        self.output_tokens = output_tokens
+
+        self._waiting: list[tuple[int, int, float, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._wakeup = asyncio.Event()
+        self._dispatcher: asyncio.Task | None = None
+        self._flights: dict[str, asyncio.Future] = {}
+
+        self.counters = {
+            "submitted": 0, "calls": 0, "coalesced": 0, "rejected": 0, "throttled": 0, "failed": 0, "retries": 0,
+        }
+        self._latencies: deque[float] = deque(maxlen=500)
+        self._queue_waits: deque[float] = deque(maxlen=500)
+
+    def estimate_tokens(self, prompt: str) -> float:
+        return len(prompt) / 4 + self.output_tokens
+
+    # ── Dispatch ──────────────────────────────────────────────────────────────
+    async def _dispatch(self):
+        while self._waiting:
+            priority, _, cost, granted = self._waiting[0]
+            if granted.done():  # caller gave up
+                heapq.heappop(self._waiting)
+                continue
+            if self._in_flight >= self.max_concurrency:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(cost))
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue  # re-peek — something more urgent may have arrived
+            heapq.heappop(self._waiting)
+            self.requests.take(1)
+            self.tokens.take(cost)
+            self._in_flight += 1
+            granted.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = INTERACTIVE, cost: float = 0.0):
+        """Hold one rate-limited, breaker-guarded slot — for calls that can't go through run()."""
+        if len(self._waiting) >= self.max_queue:  # before allow() — a rejected call mustn't take the probe
+            self.counters["rejected"] += 1
+            raise SchedulerRejected("Gemini request queue is full.")
+        if not self.breaker.allow():
+            self.counters["rejected"] += 1
+            raise SchedulerRejected("Gemini circuit breaker is open.")
+        probe = self.breaker.state == "half_open"  # this call is the one probe let through
+
+        granted = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._seq), cost, granted))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        enqueued = time.monotonic()
+        try:
+            await granted
+        except asyncio.CancelledError:
+            if probe:  # a probe that never ran — let the next call take it
+                self.breaker.probing = False
+            if not granted.cancel():  # granted just as we were cancelled — hand the slot back
+                self._in_flight -= 1
+                self._wakeup.set()
+            raise
+        self._queue_waits.append(time.monotonic() - enqueued)
+
+        self.counters["calls"] += 1
+        start = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            if probe:
+                self.breaker.probing = False
+            raise
+        except Exception as e:
+            status = error_status(e)
+            if status == 429:
+                self.counters["throttled"] += 1
+                self.requests.drain()
+                self.tokens.drain()
+                self.breaker.record(True)  # quota, not an outage
+            else:
+                self.counters["failed"] += 1
+                self.breaker.record(status is not None and 400 <= status < 500)
+            raise
+        else:
+            self.breaker.record(True)
+            self._latencies.append(time.monotonic() - start)
+        finally:
+            self._in_flight -= 1
+            self._wakeup.set()
+
+    async def _attempt(self, prompt: str, priority: int, retries: int) -> str:
+        cost = self.estimate_tokens(prompt)
+        for attempt in range(retries):
+            try:
+                async with self.slot(priority, cost):
+                    return await self._call(prompt)
+            except Exception as e:
+                if error_status(e) != 429 or attempt == retries - 1:
+                    raise
+                wait = random.uniform(0, 2 ** (attempt + 2))
+                self.counters["retries"] += 1
+                print(f"⚠️  Gemini rate limited, retrying in {wait:.1f}s (attempt {attempt + 1}/{retries})...")
+                await asyncio.sleep(wait)
+
+    async def run(self, prompt: str, priority: int = INTERACTIVE, retries: int = 2) -> str:
+        """Response text for `prompt`; identical prompts in flight share one call."""
+        self.counters["submitted"] += 1
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(flight)
+
+        flight = asyncio.ensure_future(self._attempt(prompt, priority, retries))
+        self._flights[key] = flight
+        flight.add_done_callback(lambda f: self._land(key, f))
+        return await asyncio.shield(flight)
+
+    def _land(self, key: str, flight: asyncio.Future):
+        self._flights.pop(key, None)
+        if not flight.cancelled():
+            flight.exception()  # mark retrieved even if every waiter went away
+
+    # ── Stats ─────────────────────────────────────────────────────────────────
+    @staticmethod
+    def _summary(values) -> dict:
+        if not values:
+            return {"avg_ms": 0.0, "p95_ms": 0.0}
+        ordered = sorted(values)
+        return {
+            "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+            "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+        }
+
+    def stats(self) -> dict:
+        queued: dict[str, int] = {}
+        for priority, _, _, granted in self._waiting:
+            if not granted.done():
+                name = PRIORITY_NAMES.get(priority, str(priority))
+                queued[name] = queued.get(name, 0) + 1
+        return {
+            **self.counters,
+            "queued": queued,
+            "in_flight": self._in_flight,
+            "breaker": self.breaker.state,
+            "latency": self._summary(self._latencies),
+            "queue_wait": self._summary(self._queue_waits),
+        }
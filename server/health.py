@@ -0,0 +1,143 @@
+"""
+Dependency health, checked in the background instead of per probe.
+
+A single task runs every registered probe each `interval` seconds (each
+bounded by `timeout`) and keeps the last result per dependency. The health
+endpoints only read those results, so an orchestrator probing every few
+seconds across many replicas costs one query per replica per interval, not
+one per probe:
+
+  • live()   — the process is serving and the monitor loop is still turning.
+               Never depends on a dependency: restarting won't fix Supabase.
+  • ready()  — every critical dependency passed a check within `stale_after`.
+
+A probe is `async () -> None | str`: returning None means ok, a string means
+degraded (working, with a reason), raising means down.
+
+LazyClient defers building an SDK client — and importing its package — until
+first use, so startup doesn't pay for clients a process may never touch.
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class LazyClient:
+    """Stands in for the client `factory()` returns, building it on first attribute access."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def built(self) -> bool:
+        return self._client is not None
+
+    def _build(self):
+        with self._lock:
+            if self._client is None:
+                self._client = self._factory()
+        return self._client
+
+    async def warm(self):
+        """Build the client on a thread, keeping the import off the event loop."""
+        await asyncio.to_thread(self._build)
+
+    def __getattr__(self, name):
+        return getattr(self._client if self._client is not None else self._build(), name)
+
+
+class HealthMonitor:
+    def __init__(self, interval: float = 10.0, timeout: float = 3.0, stale_after: float | None = None):
+        self.interval = interval
+        self.timeout = timeout
+        self.stale_after = stale_after or 3 * interval
+        self.probes: dict[str, tuple] = {}     # name -> (probe, critical)
+        self.results: dict[str, dict] = {}
+        self.started_at = time.monotonic()
+        self.last_round: float | None = None
+        self.draining = False
+        self._task: asyncio.Task | None = None
+
+    def add(self, name: str, probe, critical: bool = True):
+        self.probes[name] = (probe, critical)
+
+    async def check(self, name: str) -> dict:
+        probe, critical = self.probes[name]
+        start = time.monotonic()
+        try:
+            detail = await asyncio.wait_for(probe(), self.timeout)
+            status = "ok" if detail is None else "degraded"
+        except asyncio.TimeoutError:
+            status, detail = "error", f"timed out after {self.timeout:g}s"
+        except Exception as e:
+            status, detail = "error", str(e) or type(e).__name__
+
+        previous = self.results.get(name)
+        if previous is None or previous["status"] != status:
+            icon = {"ok": "✅", "degraded": "⚠️"}.get(status, "❌")
+            print(f"{icon} Health         — {name}: {status}" + (f" ({detail})" if detail else ""))
+        failures = 0 if status == "ok" else (previous["consecutive_failures"] if previous else 0) + 1
+
+        self.results[name] = {
+            "status": status,
+            "detail": detail,
+            "critical": critical,
+            "latency_ms": round((time.monotonic() - start) * 1000, 2),
+            "checked_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "consecutive_failures": failures,
+            "_checked": time.monotonic(),
+        }
+        return self.results[name]
+
+    async def run_once(self):
+        await asyncio.gather(*(self.check(name) for name in self.probes))
+        self.last_round = time.monotonic()
+
+    async def _loop(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        self.draining = True  # readiness fails from here on, so traffic drains before exit
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    # ── Reads (no I/O) ────────────────────────────────────────────────────────
+    def snapshot(self) -> dict[str, dict]:
+        now = time.monotonic()
+        out = {}
+        for name, result in self.results.items():
+            age = now - result["_checked"]
+            out[name] = {k: v for k, v in result.items() if not k.startswith("_")}
+            out[name]["age_s"] = round(age, 1)
+            out[name]["stale"] = age > self.stale_after
+        return out
+
+    def live(self) -> tuple[bool, dict]:
+        """A crashed or wedged monitor loop means the process is stuck — worth a restart."""
+        if self._task is None or self._task.done():
+            return False, {"monitor": "stopped"}
+        age = time.monotonic() - (self.last_round or self.started_at)
+        return age <= self.stale_after, {"last_round_age_s": round(age, 1)}
+
+    def ready(self) -> tuple[bool, dict]:
+        if self.draining:
+            return False, {"status": "draining"}
+        snapshot = self.snapshot()
+        failing = {
+            name: "not checked yet" if name not in snapshot
+            else "stale" if snapshot[name]["stale"]
+            else snapshot[name]["detail"]
+            for name, (_, critical) in self.probes.items()
+            if critical and (name not in snapshot or snapshot[name]["stale"] or snapshot[name]["status"] == "error")
+        }
+        return not failing, {"failing": failing}
@@ -0,0 +1,112 @@
+"""
+HTTP caching for per-user read endpoints.
+
+Every user has a data version that is bumped on each write (draft, confirm,
+bulk import). Read responses carry a strong ETag derived from that version
+plus the request path/query, so a client revalidating with If-None-Match
+gets a 304 without us touching Supabase or recomputing anything. Bodies are
+also kept in a small server-side cache keyed on the ETag.
+
+Versions live in a local SQLite file so all uvicorn workers on a host agree
+on them. The file also stores a random epoch that is part of every ETag —
+if the file is ever lost, versions restart from 0 without colliding with
+ETags handed out before.
+"""
+import uuid
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class DataVersionStore:
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS versions (user_id TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        self._db.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)", (uuid.uuid4().hex[:12],))
+        self.epoch = self._db.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0]
+
+    def get(self, user_id: str) -> int:
+        with self._lock:
+            row = self._db.execute("SELECT version FROM versions WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, user_id: str) -> int:
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO versions (user_id, version) VALUES (?, 1) "
+                "ON CONFLICT(user_id) DO UPDATE SET version = version + 1",
+                (user_id,),
+            )
+            return self._db.execute("SELECT version FROM versions WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def bump_many(self, user_ids: list[str]):
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT INTO versions (user_id, version) VALUES (?, 1) "
+                "ON CONFLICT(user_id) DO UPDATE SET version = version + 1",
+                [(user_id,) for user_id in user_ids],
+            )
+            self._db.execute("COMMIT")
+
+    def tag(self, user_id: str) -> str:
+        return f"{self.epoch}.{self.get(user_id)}"
+
+    def close(self):
+        self._db.close()
+
+
+def make_etag(version_tag: str, path: str, query: str) -> str:
+    digest = hashlib.sha1(f"{path}?{query}".encode()).hexdigest()[:16]
+    return f'"{version_tag}-{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (t.strip() for t in if_none_match.split(","))
+
+
+class ResponseCache:
+    """LRU of encoded response bodies keyed by ETag, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag: str) -> bytes | None:
+        with self._lock:
+            body = self._items.get(etag)
+            if body is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(etag)
+            self.hits += 1
+            return body
+
+    def put(self, etag: str, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(etag, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[etag] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._items), "bytes": self._size, "hits": self.hits, "misses": self.misses}
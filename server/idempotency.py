@@ -0,0 +1,105 @@
+"""
+Idempotency keys for check-in writes, backed by a local SQLite file.
+
+A client that times out on POST /entries/draft can't tell whether the
+entry was saved, so it retries — which used to mean a second Gemini call
+and a duplicate row. With an `Idempotency-Key` header the first request
+reserves (user_id, key) here before doing any work and stores its
+response when it finishes; a retry with the same key gets that response
+back without extracting or inserting anything.
+
+    begin()  → ("new", None)              go ahead, then finish() or release()
+               ("replay", (status, body)) the stored response
+               ("in_progress", None)      the first request is still running → 409
+               ("mismatch", None)         same key, different request → 422
+
+A reservation whose request died without finishing is taken over after
+`lease_seconds`. Keys are kept for `ttl_seconds` (purged on startup), and
+the file is shared by every uvicorn worker on the host.
+"""
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+def fingerprint(path: str, payload: dict) -> str:
+    """Stable hash of what a key was first used for — the endpoint plus its JSON body."""
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{path}\n{body}".encode()).hexdigest()
+
+
+class IdempotencyStore:
+    def __init__(self, db_path: str, lease_seconds: float = 120.0, ttl_seconds: float = 24 * 3600):
+        self.lease_seconds = lease_seconds
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency ("
+            "  user_id TEXT NOT NULL,"
+            "  key TEXT NOT NULL,"
+            "  fingerprint TEXT NOT NULL,"
+            "  started_at REAL NOT NULL,"
+            "  status_code INTEGER,"          # NULL while the first request is still running
+            "  body TEXT,"
+            "  PRIMARY KEY (user_id, key)"
+            ")"
+        )
+
+    def begin(self, user_id: str, key: str, fingerprint: str) -> tuple[str, tuple[int, dict] | None]:
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT fingerprint, started_at, status_code, body FROM idempotency WHERE user_id = ? AND key = ?",
+                    (user_id, key),
+                ).fetchone()
+                if row is None or (row[2] is None and row[1] < now - self.lease_seconds and row[0] == fingerprint):
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO idempotency (user_id, key, fingerprint, started_at) VALUES (?, ?, ?, ?)",
+                        (user_id, key, fingerprint, now),
+                    )
+                    self._db.execute("COMMIT")
+                    return "new", None
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+        stored_fingerprint, _, status_code, body = row
+        if stored_fingerprint != fingerprint:
+            return "mismatch", None
+        if status_code is None:
+            return "in_progress", None
+        return "replay", (status_code, json.loads(body))
+
+    def finish(self, user_id: str, key: str, status_code: int, body: dict):
+        with self._lock:
+            self._db.execute(
+                "UPDATE idempotency SET status_code = ?, body = ? WHERE user_id = ? AND key = ?",
+                (status_code, json.dumps(body, ensure_ascii=False, default=str), user_id, key),
+            )
+
+    def release(self, user_id: str, key: str):
+        """Drop an unfinished reservation (the request failed), so a retry runs again."""
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM idempotency WHERE user_id = ? AND key = ? AND status_code IS NULL", (user_id, key),
+            )
+
+    def purge(self) -> int:
+        """Drop keys older than the TTL."""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM idempotency WHERE started_at < ?", (time.time() - self.ttl_seconds,),
+            )
+        return cursor.rowcount
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,86 @@
+"""
+Generated narrative insights, kept in a local SQLite file.
+
+GET /insights/{user_id} asks Gemini for insights on a digest of the user's
+history. The result is stored here with the user's data version and a hash
+of the digest it came from, so every uvicorn worker on the host serves it
+until new entries land — and even then only a changed digest costs another
+Gemini call.
+
+One row per (user, condition) key. `claim` is a lease: the worker that gets
+it regenerates in the background while everyone else keeps serving the
+previous insights. A failed attempt keeps its lease until it expires, which
+doubles as the retry backoff.
+"""
+import json
+import time
+import sqlite3
+import threading
+
+
+class InsightStore:
+    def __init__(self, db_path: str, lease_seconds: float = 120.0):
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS insights ("
+            "  key TEXT PRIMARY KEY,"
+            "  version INTEGER,"               # data version the insights are current for
+            "  digest_hash TEXT,"
+            "  body TEXT,"                     # {"summary", "insights"} — NULL until the first success
+            "  prompt_tokens INTEGER,"
+            "  generated_at REAL,"
+            "  claimed_at REAL,"               # a worker is regenerating since then
+            "  error TEXT"
+            ")"
+        )
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM insights WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        state = dict(row)
+        state["body"] = json.loads(state["body"]) if state["body"] else None
+        state["claimed"] = state["claimed_at"] is not None and state["claimed_at"] > time.time() - self.lease_seconds
+        return state
+
+    def claim(self, key: str) -> bool:
+        """Take the right to regenerate `key`; False while another attempt's lease runs."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO insights (key) VALUES (?)", (key,))
+            cursor = self._db.execute(
+                "UPDATE insights SET claimed_at = ?, error = NULL WHERE key = ? AND (claimed_at IS NULL OR claimed_at < ?)",
+                (now, key, now - self.lease_seconds),
+            )
+        return cursor.rowcount == 1
+
+    def save(self, key: str, version: int, digest_hash: str, body: dict, prompt_tokens: int):
+        """Store a generation (unless one for a newer version got there first) and free the lease."""
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.execute(
+                "UPDATE insights SET version = ?, digest_hash = ?, body = ?, prompt_tokens = ?, generated_at = ?, "
+                "error = NULL WHERE key = ? AND (version IS NULL OR version <= ?)",
+                (version, digest_hash, json.dumps(body, ensure_ascii=False), prompt_tokens, time.time(), key, version),
+            )
+            self._db.execute("UPDATE insights SET claimed_at = NULL WHERE key = ?", (key,))
+            self._db.execute("COMMIT")
+
+    def touch(self, key: str, version: int):
+        """New entries, same digest: the stored insights are current for `version` too."""
+        with self._lock:
+            self._db.execute("UPDATE insights SET version = ? WHERE key = ? AND version < ?", (version, key, version))
+
+    def fail(self, key: str, error: str):
+        with self._lock:
+            self._db.execute("UPDATE insights SET error = ? WHERE key = ?", (error, key))
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,265 @@
+"""
+Nightly batch: recompute every user's /patterns aggregates from their full
+confirmed history, on every core.
+
+/patterns serves the materialized `user_aggregates` row that writes keep up
+to date; a user without one is rebuilt from their whole history on the
+request path. This job precomputes all of them ahead of time — backfilling
+users who have no row, repairing any drift in the incremental counters and
+refitting risk models that back-dated writes left stale.
+
+  • The parent reads per-user entry counts — no entry bodies — and cuts the
+    user_id space into ranges of about CHUNK_ENTRIES entries. A user's
+    history is never split across ranges.
+  • Each range goes to a process pool worker, which reads its users'
+    entries, runs _aggregates_from_entries (the same code the request path
+    uses, so the output is identical) and writes the result. Reads, JSON
+    decoding, compute and writes all run in parallel.
+  • Results are compared with the stored rows and only changed ones are
+    bulk-upserted; the parent bumps those users' data versions so cached
+    /patterns responses refresh. A row a live write touched after the
+    worker read that user's entries is left alone — it is already newer.
+
+Progress is checkpointed to a local SQLite file as ranges complete, in
+order (the last user_id done). A killed or failed run picks up from there
+next time; --fresh starts over.
+
+Run from server/ (uses the same env as the API — STORAGE_BACKEND etc.):
+    python insights_batch.py [--workers 8] [--fresh]
+"""
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import main
+
+PAGE_SIZE = int(os.getenv("INSIGHTS_PAGE_SIZE", "1000"))            # entries per storage read
+CHUNK_ENTRIES = int(os.getenv("INSIGHTS_CHUNK_ENTRIES", "20000"))   # entries per pool task
+WRITE_BATCH = 200                                                   # users per bulk upsert
+PROGRESS_EVERY = 10.0                                               # seconds
+
+
+class Checkpoints:
+    """Batch runs and how far each got, in a local SQLite file."""
+
+    def __init__(self, db_path: str):
+        self._db = sqlite3.connect(db_path, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "  id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            "  started_at TEXT NOT NULL,"
+            "  finished_at TEXT,"
+            "  cursor TEXT,"                   # last user_id fully written
+            "  users INTEGER NOT NULL DEFAULT 0,"
+            "  entries INTEGER NOT NULL DEFAULT 0,"
+            "  written INTEGER NOT NULL DEFAULT 0,"
+            "  skipped INTEGER NOT NULL DEFAULT 0,"
+            "  failed INTEGER NOT NULL DEFAULT 0"
+            ")"
+        )
+
+    def open_run(self, fresh: bool = False) -> dict:
+        """The latest unfinished run (to resume), or a new one."""
+        row = self._db.execute("SELECT * FROM runs ORDER BY id DESC LIMIT 1").fetchone()
+        if row is not None and row["finished_at"] is None and not fresh:
+            return dict(row)
+        started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        run_id = self._db.execute("INSERT INTO runs (started_at) VALUES (?)", (started_at,)).lastrowid
+        return dict(self._db.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone())
+
+    def save(self, run: dict):
+        self._db.execute(
+            "UPDATE runs SET cursor = ?, users = ?, entries = ?, written = ?, skipped = ?, failed = ?, "
+            "finished_at = ? WHERE id = ?",
+            (run["cursor"], run["users"], run["entries"], run["written"], run["skipped"], run["failed"],
+             run["finished_at"], run["id"]),
+        )
+
+    def close(self):
+        self._db.close()
+
+
+# ── Reading ───────────────────────────────────────────────────────────────────
+async def user_histories(after_user: str | None, last_user: str | None = None, page_size: int = PAGE_SIZE):
+    """Yield (user_id, entries oldest first) for users in (after_user, last_user], in order."""
+    after = None
+    current, rows = None, []
+    while True:
+        page = await main.storage.confirmed_page(page_size, after=after, after_user=after_user)
+        for row in page:
+            if last_user is not None and row["user_id"] > last_user:
+                page = []
+                break
+            if row["user_id"] != current:
+                if rows:
+                    yield current, rows
+                current, rows = row["user_id"], []
+            rows.append(row)
+        if not page:
+            break
+        last = page[-1]
+        after = (last["user_id"], last["date"], last["id"])
+    if rows:
+        yield current, rows
+
+
+async def user_ranges(after_user: str | None, chunk_entries: int = CHUNK_ENTRIES):
+    """Cut users after `after_user` into (after_user, last_user, users, entries) ranges of ~chunk_entries."""
+    start, users, entries = after_user, 0, 0
+    cursor = after_user
+    while counts := await main.storage.confirmed_counts(PAGE_SIZE, after_user=cursor):
+        for user_id, n in counts:
+            users += 1
+            entries += n
+            if entries >= chunk_entries:
+                yield start, user_id, users, entries
+                start, users, entries = user_id, 0, 0
+        cursor = counts[-1][0]
+    if users:
+        yield start, cursor, users, entries
+
+
+# ── Writing ───────────────────────────────────────────────────────────────────
+def _normalized(agg: dict) -> dict:
+    # Float sums kept incrementally differ from a fresh sum in the last bits
+    return json.loads(json.dumps(agg), parse_float=lambda s: round(float(s), 6))
+
+
+async def write_results(results: list[tuple[str, dict]], read_at: datetime) -> tuple[list[str], int]:
+    """Upsert the aggregates that changed. Returns (user_ids written, skipped as touched mid-run)."""
+    written, skipped = [], 0
+    for i in range(0, len(results), WRITE_BATCH):
+        batch = results[i:i + WRITE_BATCH]
+        stored = await main.storage.aggregates_many([user_id for user_id, _ in batch])
+        changed = []
+        for user_id, agg in batch:
+            row = stored.get(user_id)
+            if row is None:
+                changed.append((user_id, agg))
+            elif datetime.fromisoformat(str(row["updated_at"])) > read_at:
+                skipped += 1
+            elif _normalized(row["aggregates"]) != _normalized(agg):
+                changed.append((user_id, agg))
+        if changed:
+            users = await main.storage.save_aggregates_many(changed, read_at)
+            skipped += len(changed) - len(users)
+            written += users
+    return written, skipped
+
+
+# ── Worker side ───────────────────────────────────────────────────────────────
+_worker_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _init_worker():
+    # One loop per process for its whole life — asyncpg pools are bound to the loop that made them
+    global _worker_loop
+    _worker_loop = asyncio.new_event_loop()
+
+
+async def _process_range(after_user: str | None, last_user: str) -> dict:
+    read_at = datetime.now(timezone.utc)
+    results, failed = [], 0
+    async for user_id, rows in user_histories(after_user, last_user):
+        try:
+            results.append((user_id, main._aggregates_from_entries(rows)))
+        except Exception as e:
+            print(f"⚠️  Aggregates failed for {user_id}, leaving it as it is: {e}")
+            failed += 1
+    written, skipped = await write_results(results, read_at)
+    return {"written": written, "skipped": skipped, "failed": failed}
+
+
+def process_range(after_user: str | None, last_user: str) -> dict:
+    """Read, compute and write one range of users — runs in a pool process."""
+    return _worker_loop.run_until_complete(_process_range(after_user, last_user))
+
+
+# ── Run ───────────────────────────────────────────────────────────────────────
+async def run(workers: int, fresh: bool = False, checkpoint_path: str | None = None) -> dict:
+    checkpoints = Checkpoints(checkpoint_path or os.getenv("INSIGHTS_CHECKPOINT_PATH", "insights_batch.sqlite3"))
+    state = checkpoints.open_run(fresh)
+    if state["cursor"]:
+        print(f"↩️  Resuming run {state['id']} after user {state['cursor']} ({state['users']} users done)")
+    else:
+        print(f"🌙 Insights batch run {state['id']} — {workers} processes")
+
+    loop = asyncio.get_running_loop()
+    # spawn: the parent has threads (storage pools), which fork would copy mid-state
+    pool = ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker,
+    )
+    tasks: asyncio.Queue = asyncio.Queue(maxsize=2 * workers)  # ranges handed out ahead of the checkpoint
+    started = time.perf_counter()
+    users_at_start = state["users"]
+
+    async def produce():
+        try:
+            async for after_user, last_user, n_users, n_entries in user_ranges(state["cursor"]):
+                future = loop.run_in_executor(pool, process_range, after_user, last_user)
+                await tasks.put((future, last_user, n_users, n_entries))
+        finally:
+            await tasks.put(None)
+
+    producer = asyncio.create_task(produce())
+    last_report = time.perf_counter()
+    try:
+        # Ranges finish out of order; the checkpoint only moves past a range once all before it are done
+        while (task := await tasks.get()) is not None:
+            future, last_user, n_users, n_entries = task
+            try:
+                result = await future
+            except Exception as e:
+                print(f"❌ Range ending at user {last_user} failed, stopping (resume picks up here): {e}")
+                raise
+            await asyncio.to_thread(main.data_versions.bump_many, result["written"])
+
+            state["cursor"] = last_user
+            state["users"] += n_users
+            state["entries"] += n_entries
+            state["written"] += len(result["written"])
+            state["skipped"] += result["skipped"]
+            state["failed"] += result["failed"]
+            checkpoints.save(state)
+
+            if time.perf_counter() - last_report >= PROGRESS_EVERY:
+                last_report = time.perf_counter()
+                rate = (state["users"] - users_at_start) / (last_report - started)
+                print(f"⏳ {state['users']:,} users, {state['entries']:,} entries "
+                      f"({state['written']:,} updated) — {rate:,.0f} users/s")
+        await producer  # surfaces a read error
+    finally:
+        producer.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    state["finished_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    checkpoints.save(state)
+    checkpoints.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Insights batch done — {state['users']:,} users, {state['entries']:,} entries, "
+          f"{state['written']:,} updated, {state['skipped']:,} skipped (written to meanwhile), "
+          f"{state['failed']:,} failed, in {elapsed:.1f}s")
+    return state
+
+
+async def _main(args):
+    try:
+        return await run(args.workers, args.fresh)
+    finally:
+        await main.storage.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--fresh", action="store_true", help="ignore an unfinished run's checkpoint")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,174 @@
+"""
+Durable extraction job queue backed by a local SQLite file.
+
+POST /entries/draft inserts a `pending` entry, enqueues a job here and
+returns 202 straight away; a pool of worker tasks in main.py claims jobs,
+runs the extraction and fills the entry in. Because jobs live on disk they
+survive restarts, and every uvicorn worker on the host shares one queue.
+
+A claimed job holds a lease — if its worker dies mid-job the lease expires
+and another worker picks it up. Failures are retried with jittered
+exponential backoff until max_attempts, then the job is marked failed.
+"""
+import json
+import time
+import uuid
+import random
+import sqlite3
+import threading
+
+
+def backoff_delay(attempt: int, base: float = 2.0, cap: float = 300.0) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class JobQueue:
+    def __init__(self, db_path: str, lease_seconds: float = 300.0, max_attempts: int = 5):
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "  id TEXT PRIMARY KEY,"
+            "  entry_id TEXT NOT NULL UNIQUE,"
+            "  payload TEXT NOT NULL,"
+            "  status TEXT NOT NULL,"          # queued | running | done | failed
+            "  attempts INTEGER NOT NULL DEFAULT 0,"
+            "  run_after REAL NOT NULL,"
+            "  enqueued_at REAL NOT NULL,"
+            "  started_at REAL,"
+            "  finished_at REAL,"
+            "  result TEXT,"
+            "  error TEXT"
+            ")"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, run_after)")
+
+    def enqueue(self, entry_id: str, payload: dict) -> str:
+        """Queue a job for an entry; an entry's finished job is replaced (it is being re-extracted)."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, entry_id, payload, status, run_after, enqueued_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?) "
+                "ON CONFLICT(entry_id) DO UPDATE SET id = excluded.id, payload = excluded.payload, "
+                "status = 'queued', attempts = 0, run_after = excluded.run_after, enqueued_at = excluded.enqueued_at, "
+                "started_at = NULL, finished_at = NULL, result = NULL, error = NULL "
+                "WHERE jobs.status IN ('done', 'failed')",
+                (job_id, entry_id, json.dumps(payload), now, now),
+            )
+        return job_id
+
+    def claim(self) -> dict | None:
+        """Atomically take the next ready job (or one whose lease expired)."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT * FROM jobs WHERE (status = 'queued' AND run_after <= ?) "
+                    "OR (status = 'running' AND started_at < ?) ORDER BY run_after LIMIT 1",
+                    (now, now - self.lease_seconds),
+                ).fetchone()
+                if row is None:
+                    self._db.execute("COMMIT")
+                    return None
+                self._db.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ? WHERE id = ?",
+                    (now, row["id"]),
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["attempts"] += 1
+        job["started_at"] = now
+        return job
+
+    def complete(self, job_id: str, result: dict):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, result = ?, error = NULL WHERE id = ?",
+                (time.time(), json.dumps(result), job_id),
+            )
+
+    def fail(self, job: dict, error: str) -> float | None:
+        """Reschedule with backoff and return the delay, or mark failed (None) once out of attempts."""
+        with self._lock:
+            if job["attempts"] >= self.max_attempts:
+                self._db.execute(
+                    "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                    (time.time(), error, job["id"]),
+                )
+                return None
+            delay = backoff_delay(job["attempts"])
+            self._db.execute(
+                "UPDATE jobs SET status = 'queued', run_after = ?, error = ? WHERE id = ?",
+                (time.time() + delay, error, job["id"]),
+            )
+            return delay
+
+    def get(self, entry_id: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT entry_id, status, attempts, enqueued_at, started_at, finished_at, result, error "
+                "FROM jobs WHERE entry_id = ?",
+                (entry_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def purge(self, older_than_seconds: float) -> int:
+        """Drop finished jobs older than the retention window."""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (time.time() - older_than_seconds,),
+            )
+        return cursor.rowcount
+
+    def stats(self, window: int = 500) -> dict:
+        """Queue depth plus wait/processing times (ms) over the last `window` finished jobs."""
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = self._db.execute("SELECT MIN(enqueued_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            recent = self._db.execute(
+                "SELECT started_at - enqueued_at, finished_at - started_at FROM jobs "
+                "WHERE status = 'done' ORDER BY finished_at DESC LIMIT ?",
+                (window,),
+            ).fetchall()
+
+        def summary(values: list[float]) -> dict:
+            if not values:
+                return {"avg_ms": 0.0, "p95_ms": 0.0}
+            values = sorted(values)
+            return {
+                "avg_ms": round(sum(values) / len(values) * 1000, 1),
+                "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))] * 1000, 1),
+            }
+
+        return {
+            "depth": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "oldest_queued_s": round(time.time() - oldest, 1) if oldest else 0.0,
+            "wait": summary([r[0] for r in recent]),
+            "processing": summary([r[1] for r in recent]),
+        }
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,230 @@
+"""
+Rule-based fast-path extractor for short, formulaic check-ins.
+
+Produces the same schema as EXTRACTION_PROMPT from a keyword/regex lexicon
+("slept 7h, yoga, salad, relaxed, happy") plus the structured phrases the
+DailyCheckin form appends ("Stress level: 4/5", "Did exercise today").
+Alongside the result it returns a confidence in [0, 1]; callers only skip
+Gemini when that confidence is high.
+
+Confidence is the share of meaningful words the lexicon accounted for,
+discounted for every field that had to be inferred rather than read off
+the text, for every negated stress or mood word, and for long free-form
+texts. A single inferred field is enough to fall below the default
+threshold: only check-ins that state every field skip the model.
+"""
+import re
+
+SYMPTOMS = {
+    "headache": ["headache", "head ache", "head hurts", "migraine"],
+    "fatigue": ["fatigue", "fatigued", "tired", "exhausted", "drained", "sleepy", "low energy"],
+    "nausea": ["nausea", "nauseous", "queasy", "sick to my stomach"],
+    "stomach ache": ["stomach ache", "stomachache", "stomach pain", "tummy ache"],
+    "back pain": ["back pain", "backache", "back hurts", "sore back"],
+    "dizziness": ["dizzy", "dizziness", "lightheaded", "light-headed"],
+    "bloating": ["bloated", "bloating"],
+    "insomnia": ["insomnia", "couldn't sleep", "could not sleep", "can't sleep"],
+    "anxiety": ["anxiety", "anxious", "panic"],
+    "cramps": ["cramps", "cramping"],
+    "sore throat": ["sore throat"],
+    "cough": ["cough", "coughing"],
+    "congestion": ["congestion", "congested", "stuffy nose", "runny nose"],
+    "joint pain": ["joint pain", "joints hurt", "knee pain"],
+    "muscle pain": ["muscle pain", "sore muscles", "muscles hurt"],
+}
+
+FOODS = [
+    "coffee", "espresso", "tea", "green tea", "water", "soda", "coke", "energy drink", "juice",
+    "wine", "beer", "alcohol", "cocktail", "whiskey", "milk",
+    "pizza", "pasta", "burger", "fries", "fast food", "sandwich", "salad", "soup", "rice",
+    "bread", "toast", "cereal", "oatmeal", "eggs", "chicken", "fish", "salmon", "steak",
+    "tacos", "sushi", "ramen", "noodles", "fruit", "banana", "apple", "vegetables", "yogurt",
+    "chocolate", "candy", "dessert", "cake", "ice cream", "cookies", "chips", "sugar",
+]
+
+EXERCISE_WORDS = [
+    "exercise", "exercised", "workout", "worked out", "gym", "run", "ran", "running", "jog",
+    "jogged", "jogging", "yoga", "pilates", "swim", "swam", "swimming", "hike", "hiked",
+    "bike", "biked", "cycling", "walk", "walked", "lifted", "weights", "training", "trained",
+]
+NO_EXERCISE = ["no exercise", "didn't exercise", "did not exercise", "no workout", "skipped the gym", "skipped gym"]
+
+STRESS_WORDS = {
+    "high": ["stressed", "stressful", "very stressed", "overwhelmed", "high stress", "under pressure", "burned out", "burnt out"],
+    "medium": ["a bit stressed", "somewhat stressed", "little stressed", "kind of stressed", "medium stress"],
+    "low": ["relaxed", "calm", "chill", "low stress", "no stress", "stress-free", "peaceful"],
+}
+
+MOOD_WORDS = {
+    "good": ["happy", "great", "good day", "good mood", "amazing", "awesome", "productive", "excited", "cheerful", "fantastic"],
+    "neutral": ["okay", "ok", "fine", "meh", "normal day", "average"],
+    "bad": ["sad", "bad day", "bad mood", "awful", "terrible", "down", "irritable", "grumpy", "upset", "miserable", "depressed", "cranky"],
+}
+
+SLEEP_WORDS = {
+    "high": ["slept well", "slept great", "great sleep", "good sleep", "well rested", "well-rested", "slept like a baby"],
+    "low": ["slept badly", "slept poorly", "bad sleep", "poor sleep", "barely slept", "didn't sleep", "no sleep", "woke up a lot", "restless night"],
+}
+
+SLEEP_HOURS_RE = re.compile(
+    r"(?:slept|sleep|got|had)\s+(?:about|around|only|like|~|maybe)?\s*(\d+(?:\.\d+)?)\s*(?:h|hrs?|hours?)\b"
+    r"|(\d+(?:\.\d+)?)\s*(?:h|hrs?|hours?)\s+(?:of\s+)?sleep",
+)
+# Structured phrases appended by the DailyCheckin form
+LEVEL_RE = re.compile(r"(sleep quality|stress level|mood level|tension level|focus level):\s*(\d)\s*/\s*5")
+NEGATION_RE = re.compile(r"\b(no|not|without|never|didn't have|did not have|skipped)\s+(?:\w+\s+){0,2}$")
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "so", "then", "i", "im", "i'm", "me", "my", "was", "is", "am",
+    "had", "have", "has", "got", "get", "some", "two", "one", "three", "today", "day", "this", "that",
+    "it", "of", "for", "to", "at", "in", "on", "with", "after", "before", "very", "really", "bit",
+    "little", "pretty", "quite", "just", "also", "too", "last", "night", "morning", "evening",
+    "afternoon", "lunch", "dinner", "breakfast", "ate", "drank", "did", "felt", "feel", "feeling",
+    "cups", "cup", "glass", "glasses", "lot", "lots", "level", "quality", "about", "around", "only",
+    "went", "go", "going", "done", "made",
+}
+
+TOKEN_RE = re.compile(r"[a-z][a-z'\-]*|\d+(?:\.\d+)?")
+
+
+def _find(text: str, phrase: str) -> list[tuple[int, int]]:
+    return [m.span() for m in re.finditer(rf"\b{re.escape(phrase)}(?:s|es)?\b", text)]
+
+
+def _negated(text: str, start: int) -> bool:
+    return NEGATION_RE.search(text[max(0, start - 30):start]) is not None
+
+
+def extract_local(text: str) -> tuple[dict, float]:
+    """Return (extracted_json in the EXTRACTION_PROMPT schema, confidence 0..1)."""
+    lowered = text.lower()
+    covered: list[tuple[int, int]] = []
+    defaulted = 0
+    negated = 0
+
+    def hits(phrases) -> list[tuple[int, int]]:
+        spans = []
+        for phrase in phrases:
+            spans += _find(lowered, phrase)
+        return spans
+
+    def claim(spans):
+        covered.extend(spans)
+        return spans
+
+    # Structured form levels win over free text
+    levels = {m.group(1): int(m.group(2)) for m in LEVEL_RE.finditer(lowered)}
+    claim([m.span() for m in LEVEL_RE.finditer(lowered)])
+
+    # Symptoms
+    symptoms = []
+    for name, phrases in SYMPTOMS.items():
+        spans = [s for s in hits(phrases) if not _negated(lowered, s[0])]
+        covered.extend(hits(phrases))
+        if spans:
+            symptoms.append(name)
+
+    # Food
+    food = []
+    for item in FOODS:
+        spans = hits([item])
+        covered.extend(spans)
+        if any(not _negated(lowered, s[0]) for s in spans):
+            food.append(item)
+    # Drop items contained in a longer match ("tea" inside "green tea")
+    food = [f for f in food if not any(f != g and f in g for g in food)]
+
+    # Sleep
+    sleep_hours = None
+    match = SLEEP_HOURS_RE.search(lowered)
+    if match:
+        claim([match.span()])
+        sleep_hours = round(float(match.group(1) or match.group(2)))
+    sleep = None
+    if sleep_hours is not None:
+        sleep = "low" if sleep_hours < 6 else "medium" if sleep_hours < 7 else "high"
+    elif "sleep quality" in levels:
+        q = levels["sleep quality"]
+        sleep = "low" if q <= 2 else "medium" if q == 3 else "high"
+    else:
+        for quality, phrases in SLEEP_WORDS.items():
+            if claim(hits(phrases)):
+                sleep = quality
+                break
+    if sleep is None:
+        sleep = "medium"
+        defaulted += 1
+
+    # Stress
+    stress = None
+    if "stress level" in levels:
+        q = levels["stress level"]
+        stress = "low" if q <= 2 else "medium" if q == 3 else "high"
+    else:
+        for level in ("medium", "high", "low"):  # "a bit stressed" before "stressed"
+            spans = claim(hits(STRESS_WORDS[level]))
+            if spans:
+                if any(not _negated(lowered, s[0]) for s in spans):
+                    stress = level
+                else:  # "not stressed" reads low, "not relaxed" doesn't
+                    stress = "medium" if level == "low" else "low"
+                    negated += 1
+                break
+
+    # Exercise
+    exercise = False
+    if claim(hits(NO_EXERCISE)) or "no exercise today" in lowered:
+        exercise = False
+    elif "did exercise today" in lowered:
+        exercise = True
+        claim(_find(lowered, "did exercise today"))
+    else:
+        spans = claim(hits(EXERCISE_WORDS))
+        exercise = any(not _negated(lowered, s[0]) for s in spans)
+
+    # Mood
+    mood = None
+    if "mood level" in levels:
+        q = levels["mood level"]
+        mood = "bad" if q <= 2 else "neutral" if q == 3 else "good"
+    else:
+        for label in ("bad", "good", "neutral"):
+            spans = claim(hits(MOOD_WORDS[label]))
+            if any(not _negated(lowered, s[0]) for s in spans):
+                mood = label
+                break
+            if spans:  # "not happy" says what the mood isn't — leave it to inference
+                negated += 1
+
+    # Fields nobody stated are inferred from the rest, like Gemini reads tone
+    if mood is None:
+        defaulted += 1
+        negatives = bool(symptoms) + (stress == "high") + (sleep == "low")
+        positives = exercise + (stress == "low") + (sleep == "high")
+        mood = "bad" if negatives > positives else "good" if positives > negatives else "neutral"
+    if stress is None:
+        defaulted += 1
+        stress = "high" if "anxiety" in symptoms else "low" if mood == "good" else "medium"
+
+    extracted = {
+        "symptoms": symptoms,
+        "sleep": sleep,
+        "sleep_hours": sleep_hours,
+        "food": food,
+        "stress": stress,
+        "exercise": exercise,
+        "mood": mood,
+    }
+
+    # Coverage: meaningful tokens that fall inside a lexicon match
+    tokens = [m for m in TOKEN_RE.finditer(lowered) if m.group() not in STOPWORDS]
+    if not tokens:
+        return extracted, 0.0
+    explained = sum(1 for t in tokens if any(a <= t.start() < b for a, b in covered))
+    confidence = explained / len(tokens)
+    confidence *= 0.75 ** defaulted
+    confidence *= 0.75 ** negated
+    if len(tokens) > 30:
+        confidence *= 0.7
+
+    return extracted, round(confidence, 3)
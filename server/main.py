@@ -1,26 +1,150 @@
 import os
 import json
-import time
+import asyncio
+import weakref
+import base64
+import hashlib
 import calendar
-from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException
+from time import perf_counter
+from datetime import date, datetime, timezone
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field
 from typing import Optional
-from supabase import create_client, Client
 from dotenv import load_dotenv
-from google import genai
-from google.genai import types
+
+try:
+    from brotli_asgi import BrotliMiddleware  # optional — adds br, falls back to gzip
+except ImportError:
+    BrotliMiddleware = None
+from extraction_cache import ExtractionCache, cache_key
+from columnar import EntryColumns, decode_entries, flag_columns, rule_counts, stats_aggregates
+from mining import mine_associations
+from http_cache import DataVersionStore, ResponseCache, etag_matches, make_etag
+from local_extractor import extract_local
+from job_queue import JobQueue
+from idempotency import IdempotencyStore, fingerprint
+from gemini_scheduler import GeminiScheduler, CircuitBreaker, INTERACTIVE, BULK, PRIORITY_NAMES, error_status
+from storage import open_storage
+from search_index import SearchIndex
+from insight_store import InsightStore
+from entry_cache import EntryCache, page as cached_page
+from health import HealthMonitor, LazyClient
+import export
+import timeseries
+import telemetry
+import risk_model
 
 load_dotenv()
 
 # ── Clients ───────────────────────────────────────────────────────────────────
-supabase: Client = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+# Entries and aggregates live behind a Storage backend — Supabase by default,
+# or a local SQLite file / direct Postgres (STORAGE_BACKEND, see storage.py).
+# Every call is timed for /metrics. Network clients (and their SDK imports)
+# are built on first use — in practice by the health monitor's first check,
+# off the event loop — so a cold start only pays for FastAPI.
+storage = telemetry.InstrumentedStorage(open_storage())
+
+
+def _gemini_client():
+    from google import genai
 
-gemini = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    return genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+
+
+gemini = LazyClient(_gemini_client)
 GEMINI_MODEL = "gemini-2.5-flash"
 
 
+# Extraction results are deterministic per (text, model, prompt) — cache them.
+# Set EXTRACTION_CACHE_PATH to a local file to keep the cache across restarts.
+extraction_cache = ExtractionCache(
+    max_entries=int(os.getenv("EXTRACTION_CACHE_SIZE", "2048")),
+    ttl_seconds=float(os.getenv("EXTRACTION_CACHE_TTL", str(7 * 24 * 3600))),
+    db_path=os.getenv("EXTRACTION_CACHE_PATH") or None,
+)
+
+
+# Per-user data versions (shared by workers on this host) back the read ETags
+data_versions = DataVersionStore(os.getenv("DATA_VERSION_PATH", "data_versions.sqlite3"))
+response_cache = ResponseCache(max_bytes=int(os.getenv("RESPONSE_CACHE_BYTES", str(64 * 1024 * 1024))))
+
+
+# Drafts that need Gemini are extracted by background workers off a durable
+# local queue, so POST /entries/draft never waits on the model.
+job_queue = JobQueue(
+    os.getenv("JOB_QUEUE_PATH", "jobs.sqlite3"),
+    lease_seconds=float(os.getenv("JOB_LEASE_SECONDS", "300")),
+    max_attempts=int(os.getenv("JOB_MAX_ATTEMPTS", "5")),
+)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_POLL_INTERVAL = 1.0          # idle workers re-check the queue this often (other processes enqueue too)
+JOB_RETENTION = 24 * 3600        # finished jobs are kept this long for polling
+DRAFT_MAX_WAIT = 30.0            # longest long-poll on GET /entries/draft/{entry_id}
+
+
+# Per-user inverted index over raw_text for GET /entries/{user_id}/search
+search_index = SearchIndex(os.getenv("SEARCH_INDEX_PATH", "search_index.sqlite3"))
+
+
+# Active users' confirmed entries and aggregates, in memory; invalidated through data_versions
+entry_cache = EntryCache(
+    max_bytes=int(os.getenv("ENTRY_CACHE_BYTES", str(64 * 1024 * 1024))),
+    max_user_entries=int(os.getenv("ENTRY_CACHE_USER_ENTRIES", "2000")),
+)
+ENTRY_CACHE_COLUMNS = ("id", "date", "raw_text", "tags", "mood", "extracted_json")
+
+
+# Gemini insights from GET /insights/{user_id}, kept per data version for every worker on this host
+insight_store = InsightStore(
+    os.getenv("INSIGHTS_PATH", "insights.sqlite3"),
+    lease_seconds=float(os.getenv("INSIGHTS_LEASE", "120")),  # one regeneration (or a failed one's backoff)
+)
+
+
+# Idempotency-Key replays for POST /entries/draft(/stream), shared by workers on this host
+idempotency = IdempotencyStore(
+    os.getenv("IDEMPOTENCY_PATH", "idempotency.sqlite3"),
+    ttl_seconds=float(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600))),
+)
+IDEMPOTENCY_KEY_MAX = 255
+
+# One entry per user per date: a second check-in for a day replaces the first instead of adding a row
+ENTRY_PER_DAY = os.getenv("ENTRY_PER_DAY", "").lower() in ("1", "true", "yes")
+
+
+async def bump_version(user_id: str):
+    """Call after any write that changes what a user's read endpoints return."""
+    version = await asyncio.to_thread(data_versions.bump, user_id)
+    entry_cache.advance(user_id, version)
+
+
+async def cached_read(request: Request, user_id: str, load) -> Response:
+    """
+    Serve a per-user GET under a strong ETag built from the user's data
+    version: 304 if the client already has it, else the cached body, else
+    `await load()` — only the last case touches Supabase.
+    """
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    etag = make_etag(await asyncio.to_thread(data_versions.tag, user_id), request.url.path, query)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    body = response_cache.get(etag)
+    if body is None:
+        payload = jsonable_encoder(await load())
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        response_cache.put(etag, body)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 # ── Startup Connection Checks ─────────────────────────────────────────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -30,15 +154,17 @@ async def lifespan(app: FastAPI):
 
     print("✅ FastAPI        — running")
 
-    # Supabase ping
-    try:
-        supabase.table("entries").select("id").limit(1).execute()
-        print("✅ Supabase       — connected")
-    except Exception as e:
-        print(f"❌ Supabase       — FAILED: {e}")
+    # Dependencies are checked in the background; startup doesn't wait on the network
+    health_monitor.start()
+    print(f"✅ Health monitor — {', '.join(health_monitor.probes)} every {health_monitor.interval:g}s "
+          f"(ready once {storage.name} answers)")
+    print(f"✅ Metrics        — /metrics (tracing {'on' if telemetry.TRACING_ENABLED else 'off'})")
 
-    # Skip Gemini ping to save API quota
-    print("✅ Gemini API     — configured (skipping ping to save quota)")
+    # Extraction workers
+    await asyncio.to_thread(job_queue.purge, JOB_RETENTION)
+    await asyncio.to_thread(idempotency.purge)
+    workers = [asyncio.create_task(_extraction_worker()) for _ in range(JOB_WORKERS)]
+    print(f"✅ Job queue      — {JOB_WORKERS} workers, {job_queue.stats()['depth']} queued")
 
     print("═" * 50)
     print("  All checks done. Server is ready 🌿")
@@ -46,6 +172,18 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    await health_monitor.stop()
+    background = [*workers, *_insight_tasks, *_entry_fills.values()]
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await storage.close()
+    extraction_cache.close()
+    data_versions.close()
+    job_queue.close()
+    search_index.close()
+    idempotency.close()
+    insight_store.close()
     print("\n🛑 Kōru API shutting down.")
 
 
@@ -60,6 +198,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses (timelines get large); Brotli when available, else gzip
+if BrotliMiddleware is not None:
+    app.add_middleware(BrotliMiddleware, minimum_size=1000, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+# Outermost, so latency includes compression
+app.add_middleware(telemetry.MetricsMiddleware)
+
 
 # ── Pydantic Models ───────────────────────────────────────────────────────────
 class CheckInRequest(BaseModel):
@@ -72,8 +219,14 @@ class CheckInRequest(BaseModel):
 class ConfirmRequest(BaseModel):
     extracted_data: dict
 
+class BulkImportRequest(BaseModel):
+    entries: list[CheckInRequest] = Field(min_length=1, max_length=5000)
+
 
 # ── Prompts ───────────────────────────────────────────────────────────────────
+# Bump whenever EXTRACTION_PROMPT changes so cached extractions are not reused.
+EXTRACTION_PROMPT_VERSION = "1"
+
 EXTRACTION_PROMPT = """
 Extract health variables from the following user text.
 Return ONLY a valid JSON object with this exact structure:
@@ -99,53 +252,198 @@ Rules:
 User text: "{text}"
 """
 
+# Bump whenever PATTERNS_PROMPT changes so stored insights are regenerated.
+PATTERNS_PROMPT_VERSION = "2"
+
 PATTERNS_PROMPT = """
-You are analyzing a user's health journal entries to find meaningful patterns.
-Given these entries (JSON array), identify cause-effect correlations.
+You are writing short, supportive insights for a user of a health journal app.
+You get a summary of their journal that was computed from every entry — not the
+entries themselves. All the numbers you need are in it; don't invent others.
+
+Summary sections: "overall" (whole history), "recent" (last {recent} entries),
+"patterns" (cause → effect rates), "associations" (co-occurring variables;
+lag_days 1 means the effect came the next day, lift > 1 means more often than
+chance), "condition" (their condition readings, if any), "tomorrow" (next-day
+risk vs their usual rate, if any).
+
+Return ONLY a valid JSON object with this exact structure:
+{{
+  "summary": "One or two sentences on how things have been going lately.",
+  "insights": [
+    {{
+      "title": "Stress and sleep",
+      "detail": "On high-stress days your sleep was poor 58% of the time.",
+      "kind": "warning",
+      "source": "patterns"
+    }}
+  ]
+}}
+
+Rules:
+- kind: "warning" (seems to make things worse), "positive" (seems to help), "trend" (recent vs overall)
+- source: the summary section the insight comes from
+- 3 to 5 insights, most useful first; each detail at most 2 sentences and quoting the numbers
+- Things that happen together are not proof of cause: say "tends to come with", not "causes"
+- No diagnoses and no medication advice
+- If the summary is too thin to say anything useful return {{"summary": "", "insights": []}}
+
+Summary: {digest}
+"""
 
-Return ONLY a valid JSON array with this exact structure:
+BATCH_EXTRACTION_PROMPT = """
+Extract health variables from EACH of the numbered user texts below.
+Return ONLY a valid JSON array with exactly one object per text, in the same order,
+each with this exact structure:
 [
   {{
-    "cause": "Sleeping < 6h",
-    "effect": "Headache",
-    "occurrences": 3,
-    "total": 4,
-    "percentage": 75,
-    "strength": "high"
+    "index": 0,
+    "symptoms": ["headache", "fatigue"],
+    "sleep": "low | medium | high",
+    "sleep_hours": 5,
+    "food": ["pizza", "coffee"],
+    "stress": "low | medium | high",
+    "exercise": true,
+    "mood": "bad | neutral | good"
   }}
 ]
 
 Rules:
-- strength: "high" (>75% correlation, negative), "med" (50-75%, negative), "positive" (any %, beneficial)
-- Only include patterns with at least 2 occurrences
-- Maximum 5 patterns, sorted by percentage descending
-- percentage must be an integer
-- If not enough data return an empty array []
+- index: the index of the text the object was extracted from
+- symptoms: array of strings, empty [] if none mentioned
+- sleep: infer quality from context if hours not explicit
+- sleep_hours: integer or null if unknown
+- food: array of foods/drinks mentioned, empty [] if none
+- stress: infer from context if not explicit
+- exercise: true/false, false if not mentioned
+- mood: infer from overall tone
+- Treat every text independently
 
-Entries: {entries}
+Texts (JSON array): {texts}
 """
 
 
 # ── Gemini helper ─────────────────────────────────────────────────────────────
-def call_gemini(prompt: str, retries: int = 2) -> dict | list:
-    for attempt in range(retries):
-        try:
-            response = gemini.models.generate_content(
-                model=GEMINI_MODEL,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    response_mime_type="application/json",
-                    temperature=0.0,
-                ),
-            )
-            return json.loads(response.text.strip())
-        except Exception as e:
-            if "429" in str(e) and attempt < retries - 1:
-                wait = (attempt + 1) * 10
-                print(f"⚠️  Gemini rate limited, retrying in {wait}s (attempt {attempt + 1}/{retries})...")
-                time.sleep(wait)
-            else:
-                raise
+GEMINI_JSON_CONFIG = {  # GenerateContentConfig as a dict, so google.genai isn't imported up front
+    "response_mime_type": "application/json",
+    "temperature": 0.0,
+}
+
+
+GEMINI_LATENCY = telemetry.histogram("koru_gemini_request_duration_seconds", "Gemini call latency.", ("kind",))
+GEMINI_ERRORS = telemetry.counter("koru_gemini_errors_total", "Failed Gemini calls by HTTP status or exception type.",
+                                  ("kind", "error"))
+GEMINI_TOKENS = telemetry.counter("koru_gemini_tokens_total", "Tokens billed, from Gemini's usage metadata.", ("type",))
+USAGE_FIELDS = (("prompt", "prompt_token_count"), ("output", "candidates_token_count"), ("thoughts", "thoughts_token_count"))
+
+
+@contextmanager
+def _gemini_call(kind: str):
+    """Time (and trace) one Gemini request; failures are counted by status or exception type."""
+    start = perf_counter()
+    try:
+        with telemetry.span(f"gemini.{kind}", model=GEMINI_MODEL):
+            yield
+    except Exception as e:
+        status = error_status(e)
+        GEMINI_ERRORS.inc(kind, str(status) if status is not None else type(e).__name__)
+        raise
+    finally:
+        GEMINI_LATENCY.observe(perf_counter() - start, kind)
+
+
+def _record_usage(usage):
+    if usage is None:
+        return
+    for label, field in USAGE_FIELDS:
+        count = getattr(usage, field, None)
+        if count:
+            GEMINI_TOKENS.inc(label, amount=count)
+
+
+async def _generate(prompt: str) -> str:
+    with _gemini_call("generate"):
+        response = await gemini.aio.models.generate_content(
+            model=GEMINI_MODEL,
+            contents=prompt,
+            config=GEMINI_JSON_CONFIG,
+        )
+    _record_usage(getattr(response, "usage_metadata", None))
+    return response.text
+
+
+# Every Gemini call goes through one scheduler: RPM/TPM buckets, priorities,
+# single-flight for identical prompts and a circuit breaker.
+gemini_scheduler = GeminiScheduler(
+    _generate,
+    rpm=int(os.getenv("GEMINI_RPM", "10")),
+    tpm=int(os.getenv("GEMINI_TPM", "250000")),
+    max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")),
+    max_queue=int(os.getenv("GEMINI_MAX_QUEUE", "500")),
+    breaker=CircuitBreaker(
+        threshold=int(os.getenv("GEMINI_BREAKER_THRESHOLD", "5")),
+        cooldown=float(os.getenv("GEMINI_BREAKER_COOLDOWN", "30")),
+    ),
+)
+
+
+async def call_gemini(prompt: str, retries: int = 2, priority: int = INTERACTIVE) -> dict | list:
+    text = await gemini_scheduler.run(prompt, priority=priority, retries=retries)
+    return json.loads(text.strip())
+
+
+# Short, formulaic check-ins are read by the local rule-based extractor and
+# never reach Gemini. Raise LOCAL_EXTRACTION_THRESHOLD above 1 to turn it off.
+LOCAL_EXTRACTION_THRESHOLD = float(os.getenv("LOCAL_EXTRACTION_THRESHOLD", "0.8"))
+extraction_sources = {"local": 0, "gemini": 0}
+
+
+def local_extraction(text: str) -> dict | None:
+    """Local extraction if it is confident enough, else None."""
+    extracted, confidence = extract_local(text)
+    if confidence < LOCAL_EXTRACTION_THRESHOLD:
+        return None
+    extraction_sources["local"] += 1
+    extracted["extraction"] = {"source": "local", "confidence": confidence}
+    return extracted
+
+
+def _from_gemini(extracted: dict) -> dict:
+    extraction_sources["gemini"] += 1
+    extracted["extraction"] = {"source": "gemini"}
+    return extracted
+
+
+async def extract_entry(text: str, retries: int = 2, priority: int = INTERACTIVE) -> dict:
+    """Extract health variables from text — locally, from the cache, or via Gemini."""
+    local = local_extraction(text)
+    if local is not None:
+        return local
+
+    key = cache_key(text, GEMINI_MODEL, EXTRACTION_PROMPT_VERSION)
+    cached = await extraction_cache.get(key)
+    if cached is not None:
+        return cached
+
+    extracted = _from_gemini(await call_gemini(EXTRACTION_PROMPT.format(text=text), retries=retries, priority=priority))
+    await extraction_cache.put(key, extracted)
+    return extracted
+
+
+async def extract_batch(texts: list[str]) -> list[dict]:
+    """Extract several texts with a single Gemini call. Raises if the reply doesn't line up."""
+    payload = json.dumps([{"index": i, "text": t} for i, t in enumerate(texts)], ensure_ascii=False)
+    results = await call_gemini(BATCH_EXTRACTION_PROMPT.format(texts=payload), priority=BULK)
+
+    if not isinstance(results, list) or len(results) != len(texts):
+        raise ValueError("Gemini batch reply does not match the number of texts.")
+    if all(isinstance(r, dict) and isinstance(r.get("index"), int) for r in results):
+        results = sorted(results, key=lambda r: r["index"])
+        if [r["index"] for r in results] != list(range(len(texts))):
+            raise ValueError("Gemini batch reply has missing or duplicate indexes.")
+
+    for r in results:
+        r.pop("index", None)
+    return results
 
 
 # ═════════════════════════════════════════════════════════════════════════════
@@ -156,79 +454,624 @@ def read_root():
     return {"status": "ok", "message": "Kōru API is running 🌿"}
 
 
+# Dependencies are probed by one background task; every endpoint below reads
+# its cached results and answers without I/O. Storage is critical (nothing
+# works without it). Gemini is not — drafts queue and the local extractor
+# still runs — and is judged from the circuit breaker rather than pinged, to
+# save API quota.
+health_monitor = HealthMonitor(
+    interval=float(os.getenv("HEALTH_INTERVAL", "10")),
+    timeout=float(os.getenv("HEALTH_TIMEOUT", "3")),
+)
+
+
+async def _storage_health():
+    await storage.ping()
+
+
+async def _gemini_health():
+    if isinstance(gemini, LazyClient) and not gemini.built:
+        if not os.getenv("GEMINI_API_KEY"):
+            raise RuntimeError("GEMINI_API_KEY is not set")
+        await gemini.warm()
+    breaker = gemini_scheduler.breaker.state
+    if breaker != "closed":
+        return f"circuit breaker {breaker.replace('_', '-')}"
+
+
+health_monitor.add("storage", _storage_health)
+health_monitor.add("gemini", _gemini_health, critical=False)
+
+
+@app.get("/health/live")
+def liveness(response: Response):
+    """Liveness probe — the process is serving and its background loop isn't wedged."""
+    ok, detail = health_monitor.live()
+    response.status_code = 200 if ok else 503
+    return {"status": "ok" if ok else "stuck", **detail}
+
+
+@app.get("/health/ready")
+def readiness(response: Response):
+    """Readiness probe — critical dependencies passed a recent background check."""
+    ok, detail = health_monitor.ready()
+    response.status_code = 200 if ok else 503
+    return {"status": "ready" if ok else "not ready", **detail}
+
+
 @app.get("/health")
 async def health_check():
-    """Live check — hit http://localhost:8000/health anytime to verify all services."""
-    results = {"fastapi": "ok", "supabase": "unknown", "gemini": "configured"}
+    """Full status — hit http://localhost:8000/health anytime to see every service (from the last check)."""
+    dependencies = health_monitor.snapshot()
+    results = {"fastapi": "ok"}
+    for name, probe in ((storage.name, "storage"), ("gemini", "gemini")):
+        result = dependencies.get(probe)
+        if result is None:
+            results[name] = "unknown"
+        elif result["detail"] is None:
+            results[name] = result["status"]
+        else:
+            results[name] = f"{result['status']}: {result['detail']}"
 
-    try:
-        supabase.table("entries").select("id").limit(1).execute()
-        results["supabase"] = "ok"
-    except Exception as e:
-        results["supabase"] = f"error: {str(e)}"
+    ready, _ = health_monitor.ready()
+    if not ready:
+        raise HTTPException(status_code=503, detail={"services": results, "dependencies": dependencies})
+
+    return {
+        "status": "all systems go 🌿",
+        "services": results,
+        "dependencies": dependencies,
+        "extraction_cache": extraction_cache.stats(),
+        "extraction_sources": extraction_sources,
+        "response_cache": response_cache.stats(),
+        "job_queue": await asyncio.to_thread(job_queue.stats),
+        "gemini_scheduler": gemini_scheduler.stats(),
+    }
 
-    # Don't ping Gemini here — it wastes API quota
-    # Gemini connectivity is validated when users actually make requests
 
-    all_ok = all(v != "unknown" for v in results.values())
-    if not all_ok:
-        raise HTTPException(status_code=503, detail=results)
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+DEPENDENCY_UP = {"ok": 1, "degraded": 0.5, "error": 0}
+
+
+@telemetry.REGISTRY.collector
+def _service_metrics() -> list:
+    """Scrape-time view of counters the scheduler and caches already keep."""
+    sched = gemini_scheduler.stats()
+    return [
+        ("koru_gemini_scheduler_events_total", "counter", "Gemini scheduler events (calls, 429s, retries, coalesced…).",
+         [({"event": k}, sched[k]) for k in gemini_scheduler.counters]),
+        ("koru_gemini_scheduler_queued", "gauge", "Gemini calls waiting for a slot, by priority.",
+         [({"priority": name}, sched["queued"].get(name, 0)) for name in PRIORITY_NAMES.values()]),
+        ("koru_gemini_scheduler_in_flight", "gauge", "Gemini calls holding a slot.", [({}, sched["in_flight"])]),
+        ("koru_gemini_breaker_state", "gauge", "Circuit breaker: 0 closed, 1 half-open, 2 open.",
+         [({}, BREAKER_STATES[sched["breaker"]])]),
+        ("koru_extractions_total", "counter", "Extractions by source.",
+         [({"source": k}, v) for k, v in extraction_sources.items()]),
+        ("koru_dependency_up", "gauge", "Last background check: 1 ok, 0.5 degraded, 0 down.",
+         [({"dependency": name}, DEPENDENCY_UP.get(r["status"], 0)) for name, r in health_monitor.results.items()]),
+        ("koru_dependency_check_age_seconds", "gauge", "Seconds since the dependency was last checked.",
+         [({"dependency": name}, r["age_s"]) for name, r in health_monitor.snapshot().items()]),
+        ("koru_cache_lookups_total", "counter", "Cache lookups by cache and result.", [
+            ({"cache": "extraction", "result": "hit"}, extraction_cache.hits),
+            ({"cache": "extraction", "result": "miss"}, extraction_cache.misses),
+            ({"cache": "response", "result": "hit"}, response_cache.hits),
+            ({"cache": "response", "result": "miss"}, response_cache.misses),
+            ({"cache": "entries", "result": "hit"}, entry_cache.hits),
+            ({"cache": "entries", "result": "miss"}, entry_cache.misses),
+        ]),
+        ("koru_entry_cache_bytes", "gauge", "Estimated size of the in-process entry cache.",
+         [({}, entry_cache.stats()["bytes"])]),
+    ]
+
 
-    return {"status": "all systems go 🌿", "services": results}
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (text exposition format)."""
+    jobs = await asyncio.to_thread(job_queue.stats)
+    collected = [
+        ("koru_job_queue_jobs", "gauge", "Extraction jobs in the local queue by status.",
+         [({"status": "queued"}, jobs["depth"])] + [({"status": k}, jobs[k]) for k in ("running", "done", "failed")]),
+        ("koru_job_queue_oldest_queued_seconds", "gauge", "Age of the oldest queued job.", [({}, jobs["oldest_queued_s"])]),
+    ]
+    return Response(telemetry.REGISTRY.render(collected), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 # ═════════════════════════════════════════════════════════════════════════════
 # STEP 1 — Extract + save as draft
 # POST /entries/draft
+#   200 {entry_id, status: "done", extracted_data}   local fast path / cache hit
+#   202 {entry_id, status: "queued"}                 poll GET /entries/draft/{entry_id}
+# With an Idempotency-Key header a retry gets the first response back
+# (Idempotent-Replayed: true) — 409 while that is still running, 422 if the
+# key was used for a different check-in.
 # ═════════════════════════════════════════════════════════════════════════════
-@app.post("/entries/draft")
-async def create_draft(request: CheckInRequest):
+@app.post("/entries/draft", status_code=202)
+async def create_draft(
+    request: CheckInRequest,
+    response: Response,
+    idempotency_key: str | None = Header(None, max_length=IDEMPOTENCY_KEY_MAX),
+):
+    if idempotency_key:
+        replay = await _idempotency_begin(request, idempotency_key, "/entries/draft")
+        if replay is not None:
+            return replay
+
     try:
-        extracted_json = call_gemini(EXTRACTION_PROMPT.format(text=request.text))
-
-        # Merge condition-specific structured data into extracted_json
-        if request.condition and request.condition_data:
-            extracted_json["condition"] = request.condition
-            extracted_json["condition_data"] = request.condition_data
-
-        db_response = supabase.table("entries").insert({
-            "user_id": request.user_id,
-            "date": request.date,
-            "raw_text": request.text,
-            "extracted_json": extracted_json,
-            "status": "confirmed",
-        }).execute()
+        status_code, body = await _create_draft(request)
+    except Exception as e:
+        if idempotency_key:
+            await asyncio.to_thread(idempotency.release, request.user_id, idempotency_key)
+        if isinstance(e, HTTPException):
+            raise
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if idempotency_key:
+        await asyncio.to_thread(idempotency.finish, request.user_id, idempotency_key, status_code, body)
+    response.status_code = status_code
+    return body
+
 
-        inserted_row = db_response.data[0]
+async def _create_draft(request: CheckInRequest) -> tuple[int, dict]:
+    """Save a check-in inline, or park it for the extraction workers. Returns (status code, body)."""
+    existing = await _entry_for_day(request) if ENTRY_PER_DAY else None
 
-        return {
-            "entry_id": inserted_row["id"],
-            "extracted_data": extracted_json,
+    # No model call needed — answer inline
+    extracted_json = local_extraction(request.text) or await extraction_cache.get(
+        cache_key(request.text, GEMINI_MODEL, EXTRACTION_PROMPT_VERSION)
+    )
+    if extracted_json is not None:
+        saved_row = await _save_entry(request, extracted_json, existing)
+        return 200, {
+            "entry_id": saved_row["id"],
+            "status": "done",
+            "extracted_data": saved_row["extracted_json"],
         }
 
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=500, detail="Gemini returned invalid JSON.")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Otherwise park a pending row and let a worker extract it
+    pending = {**_entry_row(request, {}), "status": "pending"}
+    if existing is not None:
+        # The day's entry is re-extracted in place; it leaves the aggregates until the worker fills it in
+        entry_id = existing["id"]
+        await storage.update_entry(entry_id, pending)
+        if existing["status"] == "confirmed":
+            await update_aggregates(request.user_id, remove=[existing])
+            await record_metrics(request.user_id, [{**existing, "extracted_json": {}}], replace=True)
+            await bump_version(request.user_id)
+    else:
+        entry_id = (await storage.insert_entries([pending]))[0]["id"]
+    await asyncio.to_thread(job_queue.enqueue, entry_id, request.model_dump())
+    _job_wakeup.set()
+
+    return 202, {"entry_id": entry_id, "status": "queued"}
+
+
+async def _idempotency_begin(request: CheckInRequest, key: str, path: str) -> JSONResponse | None:
+    """Reserve an Idempotency-Key for this check-in. Returns the stored response on a replay, else None."""
+    outcome, stored = await asyncio.to_thread(
+        idempotency.begin, request.user_id, key, fingerprint(path, request.model_dump()),
+    )
+    if outcome == "mismatch":
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different check-in.")
+    if outcome == "in_progress":
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed.")
+    if outcome == "replay":
+        status_code, body = stored
+        return JSONResponse(body, status_code=status_code, headers={"Idempotent-Replayed": "true"})
+    return None
+
+
+async def _entry_for_day(request: CheckInRequest) -> dict | None:
+    """ENTRY_PER_DAY: the entry this check-in replaces (the day's confirmed one first), if any."""
+    rows = await storage.entries_on(request.user_id, request.date, "id, user_id, date, extracted_json, status")
+    if any(row["status"] == "pending" for row in rows):
+        raise HTTPException(status_code=409, detail="This day's entry is still being extracted. Try again shortly.")
+    rows.sort(key=lambda row: row["status"] != "confirmed")
+    return rows[0] if rows else None
+
+
+@app.get("/entries/draft/{entry_id}")
+async def get_draft(entry_id: str, wait: float = 0):
+    """Status of a queued draft; `wait` long-polls (up to 30s) until it finishes."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + min(max(wait, 0.0), DRAFT_MAX_WAIT)
+    while True:
+        job = await asyncio.to_thread(job_queue.get, entry_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="No queued draft with that id.")
+        if job["status"] in ("done", "failed") or loop.time() >= deadline:
+            break
+        await asyncio.sleep(0.25)
+
+    body = {"entry_id": entry_id, "status": job["status"], "attempts": job["attempts"]}
+    if job["status"] == "done":
+        body["extracted_data"] = job["result"]
+    elif job["error"]:
+        body["error"] = job["error"]
+    return body
+
+
+# ── Extraction workers ────────────────────────────────────────────────────────
+_job_wakeup = asyncio.Event()
+JOB_ATTEMPTS = telemetry.counter("koru_extraction_jobs_total", "Extraction job attempts by outcome (done / retry / failed).",
+                                 ("outcome",))
+JOB_DURATION = telemetry.histogram("koru_extraction_job_duration_seconds", "Time to run one extraction job attempt.")
+
+
+async def _run_job(job: dict) -> dict:
+    """Extract a queued draft and fill in its pending row. Returns the extracted_json."""
+    request = CheckInRequest(**job["payload"])
+    # One Gemini attempt per claim — retries go back through the queue's backoff
+    extracted_json = await extract_entry(request.text, retries=1)
+    row = _entry_row(request, extracted_json)
+
+    updated = await storage.update_entry(
+        job["entry_id"],
+        {"extracted_json": row["extracted_json"], "status": row["status"], **_derived_columns(row["extracted_json"])},
+        expect_status="pending",  # a re-run after an expired lease must not count it twice
+    )
+    if updated is not None:
+        await update_aggregates(request.user_id, add=[updated])
+        await index_entries(request.user_id, [updated])
+        await record_metrics(request.user_id, [updated])
+        await bump_version(request.user_id)
+    return row["extracted_json"]
+
+
+async def _extraction_worker():
+    while True:
+        job = await asyncio.to_thread(job_queue.claim)
+        if job is None:
+            try:
+                await asyncio.wait_for(_job_wakeup.wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            _job_wakeup.clear()
+            continue
+
+        start = perf_counter()
+        try:
+            result = await _run_job(job)
+            await asyncio.to_thread(job_queue.complete, job["id"], result)
+            JOB_ATTEMPTS.inc("done")
+        except Exception as e:
+            delay = await asyncio.to_thread(job_queue.fail, job, str(e))
+            JOB_ATTEMPTS.inc("retry" if delay is not None else "failed")
+            if delay is not None:
+                print(f"⚠️  Extraction for entry {job['entry_id']} failed (attempt {job['attempts']}), "
+                      f"retrying in {delay:.1f}s: {e}")
+                continue
+            print(f"❌ Extraction for entry {job['entry_id']} gave up after {job['attempts']} attempts: {e}")
+            try:
+                await storage.update_entry(job["entry_id"], {"status": "failed"})
+            except Exception:
+                pass
+        finally:
+            JOB_DURATION.observe(perf_counter() - start)
+
+
+async def _save_entry(request: CheckInRequest, extracted_json: dict, existing: dict | None = None) -> dict:
+    """
+    Insert one check-in — or overwrite `existing` (ENTRY_PER_DAY) — and fold it
+    into the user's aggregates. Returns the stored row.
+    """
+    row = _entry_row(request, extracted_json)
+    saved_row = await storage.update_entry(existing["id"], row) if existing is not None else None
+    replaced = [existing] if saved_row is not None and existing["status"] == "confirmed" else []
+    if saved_row is None:
+        saved_row = (await storage.insert_entries([row]))[0]
+
+    await update_aggregates(request.user_id, add=[saved_row], remove=replaced)
+    await index_entries(request.user_id, [saved_row])
+    await record_metrics(request.user_id, [saved_row], replace=existing is not None)
+    await bump_version(request.user_id)
+    return saved_row
+
+
+def _entry_row(request: CheckInRequest, extracted_json: dict) -> dict:
+    """Build the `entries` row for a check-in and its extraction."""
+    # Merge condition-specific structured data into extracted_json
+    if request.condition and request.condition_data:
+        extracted_json["condition"] = request.condition
+        extracted_json["condition_data"] = request.condition_data
+
+    return {
+        "user_id": request.user_id,
+        "date": request.date,
+        "raw_text": request.text,
+        "extracted_json": extracted_json,
+        "status": "confirmed",
+        **_derived_columns(extracted_json),
+    }
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# STEP 1 (streaming) — Extract over Server-Sent Events + save
+# POST /entries/draft/stream
+#   event: field  data: {"key": "symptoms", "value": [...]}   (one per field, as soon as it parses)
+#   event: done   data: {"entry_id": ..., "extracted_data": {...}}
+#   event: error  data: {"detail": "..."}
+# ═════════════════════════════════════════════════════════════════════════════
+class PartialObjectParser:
+    """Incrementally parse a streamed JSON object, returning each top-level field once it is complete."""
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._started = False
+        self._decoder = json.JSONDecoder()
+
+    def _skip(self, pos: int, chars: str = " \t\r\n") -> int:
+        while pos < len(self.buffer) and self.buffer[pos] in chars:
+            pos += 1
+        return pos
+
+    def feed(self, text: str) -> list[tuple[str, object]]:
+        self.buffer += text
+        fields = []
+        while True:
+            pos = self._skip(self._pos)
+            if not self._started:
+                if self.buffer[pos:pos + 1] != "{":
+                    return fields
+                self._started = True
+                self._pos = pos + 1
+                continue
+
+            pos = self._skip(pos, " \t\r\n,")
+            if pos >= len(self.buffer) or self.buffer[pos] == "}":
+                return fields
+            try:
+                key, pos = self._decoder.raw_decode(self.buffer, pos)
+                pos = self._skip(pos)
+                if self.buffer[pos:pos + 1] != ":":
+                    return fields
+                value, end = self._decoder.raw_decode(self.buffer, self._skip(pos + 1))
+            except json.JSONDecodeError:
+                return fields
+
+            # A number is only final once a delimiter follows it ("12" may become "120" or "12.5")
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                if end >= len(self.buffer) or self.buffer[end] not in " \t\r\n,}":
+                    return fields
+
+            fields.append((key, value))
+            self._pos = end
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/entries/draft/stream")
+async def create_draft_stream(
+    request: CheckInRequest,
+    idempotency_key: str | None = Header(None, max_length=IDEMPOTENCY_KEY_MAX),
+):
+    # A replay re-sends the finished entry; conflicts are plain HTTP errors, before any event
+    replay = await _idempotency_begin(request, idempotency_key, "/entries/draft/stream") if idempotency_key else None
+    try:
+        existing = await _entry_for_day(request) if ENTRY_PER_DAY and replay is None else None
+    except Exception:
+        if idempotency_key:
+            await asyncio.to_thread(idempotency.release, request.user_id, idempotency_key)
+        raise
+
+    async def replayed():
+        done = json.loads(replay.body)
+        for field, value in done["extracted_data"].items():
+            yield _sse("field", {"key": field, "value": value})
+        yield _sse("done", done)
+
+    async def events():
+        finished = False
+        try:
+            key = cache_key(request.text, GEMINI_MODEL, EXTRACTION_PROMPT_VERSION)
+            extracted_json = local_extraction(request.text) or await extraction_cache.get(key)
+
+            if extracted_json is not None:
+                for field, value in extracted_json.items():
+                    yield _sse("field", {"key": field, "value": value})
+            else:
+                parser = PartialObjectParser()
+                prompt = EXTRACTION_PROMPT.format(text=request.text)
+                fields: asyncio.Queue = asyncio.Queue()
+
+                async def upstream():
+                    # Drains Gemini on its own so the scheduler slot is freed when
+                    # Gemini finishes, not when a slow client has read every event
+                    usage = None
+                    try:
+                        async with gemini_scheduler.slot(INTERACTIVE, gemini_scheduler.estimate_tokens(prompt)):
+                            with _gemini_call("stream"):
+                                stream = await gemini.aio.models.generate_content_stream(
+                                    model=GEMINI_MODEL,
+                                    contents=prompt,
+                                    config=GEMINI_JSON_CONFIG,
+                                )
+                                async for chunk in stream:
+                                    usage = getattr(chunk, "usage_metadata", None) or usage  # running totals, last wins
+                                    for item in parser.feed(chunk.text or ""):
+                                        fields.put_nowait(item)
+                        _record_usage(usage)
+                    finally:
+                        fields.put_nowait(None)
+
+                reader = asyncio.create_task(upstream())
+                try:
+                    while (item := await fields.get()) is not None:
+                        yield _sse("field", {"key": item[0], "value": item[1]})
+                    await reader  # re-raises an upstream failure
+                finally:
+                    reader.cancel()  # client went away mid-stream
+
+                extracted_json = _from_gemini(json.loads(parser.buffer.strip()))
+                yield _sse("field", {"key": "extraction", "value": extracted_json["extraction"]})
+                await extraction_cache.put(key, extracted_json)
+
+            saved_row = await _save_entry(request, extracted_json, existing)
+            done = {"entry_id": saved_row["id"], "extracted_data": saved_row["extracted_json"]}
+            if idempotency_key:
+                await asyncio.to_thread(idempotency.finish, request.user_id, idempotency_key, 200, done)
+            finished = True
+            yield _sse("done", done)
+
+        except json.JSONDecodeError:
+            yield _sse("error", {"detail": "Gemini returned invalid JSON."})
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+        finally:
+            if idempotency_key and not finished:
+                # Inline: this also runs when a client disconnect cancels the stream
+                idempotency.release(request.user_id, idempotency_key)
+
+    return StreamingResponse(
+        replayed() if replay is not None else events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **({"Idempotent-Replayed": "true"} if replay else {})},
+    )
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# BULK IMPORT — Historical entries from other apps
+# POST /entries/bulk
+# ═════════════════════════════════════════════════════════════════════════════
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "10"))      # texts per Gemini call
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "4"))     # Gemini calls in flight
+BULK_INSERT_CHUNK = int(os.getenv("BULK_INSERT_CHUNK", "500"))  # rows per insert
+
+
+@app.post("/entries/bulk")
+async def bulk_import(request: BulkImportRequest):
+    items = request.entries
+    extracted: list[dict | None] = [None] * len(items)
+    errors: dict[int, str] = {}
+
+    # 1. Serve whatever we can locally or from the extraction cache
+    pending = []
+    local = 0
+    for i, item in enumerate(items):
+        extracted[i] = local_extraction(item.text)
+        if extracted[i] is not None:
+            local += 1
+            continue
+        cached = await extraction_cache.get(cache_key(item.text, GEMINI_MODEL, EXTRACTION_PROMPT_VERSION))
+        if cached is not None:
+            extracted[i] = cached
+        else:
+            pending.append(i)
+
+    # 2. Pack the rest into multi-text prompts, a few batches at a time
+    semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+
+    async def run_batch(indexes: list[int]):
+        async with semaphore:
+            try:
+                results = await extract_batch([items[i].text for i in indexes])
+            except Exception:
+                results = None
+
+        if results is not None:
+            for i, result in zip(indexes, results):
+                extracted[i] = _from_gemini(result)
+                await extraction_cache.put(cache_key(items[i].text, GEMINI_MODEL, EXTRACTION_PROMPT_VERSION), result)
+            return
+
+        # Batch reply was unusable — fall back to one call per text
+        for i in indexes:
+            async with semaphore:
+                try:
+                    extracted[i] = await extract_entry(items[i].text, priority=BULK)
+                except Exception as e:
+                    errors[i] = f"extraction failed: {e}"
+
+    batches = [pending[b:b + BULK_BATCH_SIZE] for b in range(0, len(pending), BULK_BATCH_SIZE)]
+    await asyncio.gather(*(run_batch(b) for b in batches))
+
+    # 3. Multi-row inserts, oldest first so the risk model learns each chunk online
+    ready = sorted((i for i in range(len(items)) if extracted[i] is not None), key=lambda i: items[i].date)
+    entry_ids: dict[int, str] = {}
+    for c in range(0, len(ready), BULK_INSERT_CHUNK):
+        chunk = ready[c:c + BULK_INSERT_CHUNK]
+        rows = [_entry_row(items[i], extracted[i]) for i in chunk]
+        try:
+            inserted = await storage.insert_entries(rows)
+        except Exception as e:
+            for i in chunk:
+                errors[i] = f"insert failed: {e}"
+            continue
+
+        by_user: dict[str, list[dict]] = {}
+        for i, row in zip(chunk, inserted):
+            entry_ids[i] = row["id"]
+            by_user.setdefault(row["user_id"], []).append(row)
+        for user_id, user_rows in by_user.items():
+            await update_aggregates(user_id, add=user_rows)
+            await index_entries(user_id, user_rows)
+            await record_metrics(user_id, user_rows)
+            await bump_version(user_id)
+
+    print(f"📥 Bulk import — {len(entry_ids)}/{len(items)} imported, "
+          f"{len(batches)} Gemini batches, {local} local, {len(items) - len(pending) - local} cached")
+
+    return {
+        "total": len(items),
+        "imported": len(entry_ids),
+        "failed": len(errors),
+        "local": local,
+        "cached": len(items) - len(pending) - local,
+        "gemini_batches": len(batches),
+        "entries": [{"index": i, "entry_id": entry_ids[i]} for i in sorted(entry_ids)],
+        "errors": [{"index": i, "detail": errors[i]} for i in sorted(errors)],
+    }
 
 
 # ═════════════════════════════════════════════════════════════════════════════
 # STEP 2 — Confirm entry
 # PATCH /entries/{entry_id}/confirm
+#   {message, entry_id, changed: [top-level extracted_data keys that changed]}
+# Re-confirming a confirmed entry unchanged writes nothing and recomputes nothing.
 # ═════════════════════════════════════════════════════════════════════════════
+METRIC_KEYS = ("condition", "condition_data")  # the extracted_json keys metric points come from
+_MISSING = object()
+
+
+def _changed_keys(before: dict, after: dict) -> list[str]:
+    return sorted(k for k in before.keys() | after.keys() if before.get(k, _MISSING) != after.get(k, _MISSING))
+
+
 @app.patch("/entries/{entry_id}/confirm")
 async def confirm_entry(entry_id: str, request: ConfirmRequest):
     try:
-        db_response = supabase.table("entries").update({
+        previous = await storage.get_entry(entry_id, "id, user_id, date, extracted_json, status")
+        if previous is None:
+            raise HTTPException(status_code=404, detail="Entry not found.")
+
+        was_confirmed = previous["status"] == "confirmed"
+        changed = _changed_keys(previous.get("extracted_json") or {}, request.extracted_data)
+        if was_confirmed and not changed:
+            return {"message": "Entry unchanged.", "entry_id": entry_id, "changed": []}
+
+        updated = await storage.update_entry(entry_id, {
             "extracted_json": request.extracted_data,
             "status": "confirmed",
-        }).eq("id", entry_id).execute()
+            **_derived_columns(request.extracted_data),
+        })
 
-        if not db_response.data:
+        if updated is None:
             raise HTTPException(status_code=404, detail="Entry not found.")
 
-        return {"message": "Entry confirmed.", "entry_id": entry_id}
+        user_id = updated["user_id"]
+        await update_aggregates(user_id, add=[updated], remove=[previous] if was_confirmed else [])
+        if not was_confirmed:
+            await index_entries(user_id, [updated])  # raw_text never changes here, so a confirmed entry is indexed already
+        if not was_confirmed or any(k in changed for k in METRIC_KEYS):
+            await record_metrics(user_id, [updated], replace=True)
+        await bump_version(user_id)
+
+        return {"message": "Entry confirmed.", "entry_id": entry_id, "changed": changed}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -237,40 +1080,167 @@ async def confirm_entry(entry_id: str, request: ConfirmRequest):
 # TIMELINE — Get confirmed entries
 # GET /entries/{user_id}?month=2026-02
 # ═════════════════════════════════════════════════════════════════════════════
-@app.get("/entries/{user_id}")
-async def get_entries(user_id: str, month: str | None = None):
+TIMELINE_FIELDS = ("id", "date", "raw_text", "excerpt", "tags", "mood", "extracted_json")
+TIMELINE_DEFAULT_FIELDS = ("id", "date", "raw_text", "tags", "mood", "extracted_json")
+TIMELINE_DEFAULT_LIMIT = 50
+TIMELINE_MAX_LIMIT = 200
+EXCERPT_CHARS = 80
+
+
+def _encode_cursor(row: dict) -> str:
+    raw = json.dumps([row["date"], row["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, str]:
+    """Cursor → (date, id) of the last row the client has seen. Raises 400 if malformed."""
     try:
-        query = (
-            supabase.table("entries")
-            .select("id, date, raw_text, extracted_json")
-            .eq("user_id", user_id)
-            .eq("status", "confirmed")
-            .order("date", desc=True)
-        )
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_date, cursor_id = json.loads(base64.urlsafe_b64decode(padded))
+        date.fromisoformat(cursor_date)
+        if '"' in str(cursor_id):
+            raise ValueError
+        return cursor_date, str(cursor_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+
+def _parse_fields(fields: str | None) -> tuple[str, ...]:
+    if not fields:
+        return TIMELINE_DEFAULT_FIELDS
+    requested = tuple(f.strip() for f in fields.split(",") if f.strip())
+    unknown = [f for f in requested if f not in TIMELINE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+def _timeline_row(row: dict, fields: tuple[str, ...]) -> dict:
+    out = {}
+    for f in fields:
+        if f == "tags":
+            out["tags"] = row.get("tags") or []
+        elif f == "mood":
+            out["mood"] = row.get("mood") or "neutral"
+        elif f == "excerpt":
+            text = row["raw_text"]
+            out["excerpt"] = text[:EXCERPT_CHARS] + ("..." if len(text) > EXCERPT_CHARS else "")
+        else:
+            out[f] = row[f]
+    return out
+
 
-        if month:
-            year, mon = map(int, month.split("-"))
-            last_day = calendar.monthrange(year, mon)[1]
-            query = query.gte("date", f"{month}-01").lte("date", f"{month}-{last_day:02d}")
-
-        db_response = query.execute()
-
-        entries = [
-            {
-                "id": row["id"],
-                "date": row["date"],
-                "raw_text": row["raw_text"],
-                "tags": _extract_tags(row["extracted_json"]),
-                "mood": row["extracted_json"].get("mood", "neutral"),
-                "extracted_json": row["extracted_json"],
+@app.get("/entries/{user_id}")
+async def get_entries(
+    request: Request,
+    user_id: str,
+    month: str | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+    fields: str | None = None,
+    tag: str | None = None,
+    mood: str | None = None,
+    start: str | None = None,
+    end: str | None = None,
+):
+    """
+    Timeline, newest first. Keyset-paginated on (date, id): pass the returned
+    next_cursor back as ?cursor= for the following page. A month filter with
+    no limit returns the whole month; otherwise pages default to 50 rows.
+    fields= projects the payload, e.g. ?fields=id,date,excerpt,tags,mood.
+    tag=, mood= and start=/end= (YYYY-MM-DD, inclusive) filter in the database,
+    e.g. ?tag=headache for every headache day.
+    """
+    selected = _parse_fields(fields)
+    after = _decode_cursor(cursor) if cursor else None
+    for value in (start, end):
+        if value is not None:
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+    if limit is None and (cursor or not month):
+        limit = TIMELINE_DEFAULT_LIMIT
+    if limit is not None:
+        limit = min(max(limit, 1), TIMELINE_MAX_LIMIT)
+
+    # Only pull the columns the projection needs (plus the keyset columns)
+    columns = ["id", "date"]
+    if {"raw_text", "excerpt"} & set(selected):
+        columns.append("raw_text")
+    for column in ("tags", "mood", "extracted_json"):
+        if column in selected:
+            columns.append(column)
+
+    async def load():
+        try:
+            first, last = start, end
+            if month:
+                year, mon = map(int, month.split("-"))
+                last_day = calendar.monthrange(year, mon)[1]
+                first = max(filter(None, (first, f"{month}-01")))
+                last = min(filter(None, (last, f"{month}-{last_day:02d}")))
+
+            # one extra row tells us whether there's a next page; a cache miss
+            # is served by that keyset query while the history loads behind it
+            page_limit = limit + 1 if limit is not None else None
+            hot = await _hot_entries(user_id, wait=False)
+            if hot is not None:
+                rows = cached_page(hot, start=first, end=last, before=after, tag=tag, mood=mood, limit=page_limit)
+            else:
+                rows = await storage.list_entries(
+                    user_id, columns, start=first, end=last, before=after, tag=tag, mood=mood, limit=page_limit,
+                )
+
+            next_cursor = None
+            if limit is not None and len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = _encode_cursor(rows[-1])
+
+            return {
+                "entries": [_timeline_row(row, selected) for row in rows],
+                "next_cursor": next_cursor,
             }
-            for row in db_response.data
-        ]
 
-        return {"entries": entries}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return await cached_read(request, user_id, load)
+
+
+_entry_fills: dict[str, asyncio.Task] = {}  # user_id → history loading into the entry cache in the background
 
+
+async def _hot_entries(user_id: str, wait: bool = True) -> list | None:
+    """
+    The user's confirmed history from the entry cache, loaded on a miss. None
+    if it is too long to keep — or, with wait=False, not cached yet: the load
+    then runs in the background and the caller reads storage directly.
+    """
+    # Read first: a write landing during the load then invalidates the fill
+    ticket = entry_cache.ticket()
+    version = await asyncio.to_thread(data_versions.get, user_id)
+    entries = entry_cache.entries(user_id, version)
+    if entries is None and entry_cache.admits(user_id):
+        if not wait:
+            if user_id not in _entry_fills:
+                _entry_fills[user_id] = task = asyncio.create_task(_fill_entries_later(user_id, version, ticket))
+                task.add_done_callback(lambda _: _entry_fills.pop(user_id, None))
+            return None
+        entries = await _fill_entries(user_id, version, ticket)
+    return entries
+
+
+async def _fill_entries(user_id: str, version: int, ticket: int) -> list | None:
+    rows = await storage.history(user_id, ENTRY_CACHE_COLUMNS, limit=entry_cache.max_user_entries + 1)
+    return entry_cache.put_entries(user_id, version, rows, ticket)
+
+
+async def _fill_entries_later(user_id: str, version: int, ticket: int):
+    try:
+        await _fill_entries(user_id, version, ticket)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        print(f"⚠️  Entry cache fill failed for {user_id}: {e}")
 
 
 def _extract_tags(extracted_json: dict) -> list[str]:
@@ -307,58 +1277,186 @@ def _extract_tags(extracted_json: dict) -> list[str]:
     return tags
 
 
+LEVELS = ("low", "medium", "high")
+
+
+def _derived_columns(extracted_json: dict) -> dict:
+    """Timeline columns denormalized from extracted_json at write time (indexed for filtering)."""
+    sleep = extracted_json.get("sleep")
+    if sleep not in LEVELS:
+        hours = extracted_json.get("sleep_hours")
+        sleep = None if not isinstance(hours, (int, float)) else "low" if hours < 6 else "medium" if hours < 7 else "high"
+    stress = extracted_json.get("stress")
+    return {
+        "tags": _extract_tags(extracted_json),
+        "mood": extracted_json.get("mood", "neutral"),
+        "sleep": sleep,
+        "stress": stress if stress in LEVELS else None,
+    }
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# SEARCH — Full-text search over what the user wrote
+# GET /entries/{user_id}/search?q=migraine after wine
+# ═════════════════════════════════════════════════════════════════════════════
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+
+async def index_entries(user_id: str, rows: list[dict]):
+    """Fold saved/confirmed entries into the search index. Never fails the write."""
+    try:
+        await asyncio.to_thread(search_index.add, rows)
+    except Exception as e:
+        # Forget the user so the next search rebuilds their index from storage
+        print(f"⚠️  Search index update failed for {user_id}, will rebuild: {e}")
+        await asyncio.to_thread(search_index.mark_indexed, user_id, False)
+
+
+async def _ensure_indexed(user_id: str):
+    """Build a user's index from their history the first time they search."""
+    if await asyncio.to_thread(search_index.is_indexed, user_id):
+        return
+    rows = await storage.history(user_id, "id, user_id, date, raw_text")
+    await asyncio.to_thread(search_index.add, rows)
+    await asyncio.to_thread(search_index.mark_indexed, user_id)
+
+
+@app.get("/entries/{user_id}/search")
+async def search_entries(request: Request, user_id: str, q: str, limit: int = SEARCH_DEFAULT_LIMIT, offset: int = 0):
+    """
+    BM25-ranked search over the user's confirmed entries. Words are stemmed;
+    "quoted phrases" must appear as written, word* matches prefixes. Snippets
+    are HTML-escaped with matches wrapped in <mark>. Page with next_offset.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Empty query.")
+    limit = min(max(limit, 1), SEARCH_MAX_LIMIT)
+    offset = max(offset, 0)
+
+    async def load():
+        try:
+            await _ensure_indexed(user_id)
+            result = await asyncio.to_thread(search_index.search, user_id, q, limit, offset)
+            return {
+                "query": q,
+                "total": result["total"],
+                "results": result["results"],
+                "next_offset": offset + limit if offset + limit < result["total"] else None,
+            }
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return await cached_read(request, user_id, load)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# EXPORT — Complete confirmed history as a download
+# GET /entries/{user_id}/export?format=ndjson|csv|parquet
+# ═════════════════════════════════════════════════════════════════════════════
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))  # entries per storage read (and Parquet row group)
+EXPORT_COLUMNS = ("id", "date", "created_at", "raw_text", "extracted_json")
+
+
+@app.get("/entries/{user_id}/export")
+async def export_entries(user_id: str, format: str = "ndjson"):
+    """
+    Every confirmed entry, oldest first, with extracted_json flattened into
+    columns (see export.py). Streamed as it is read: one page is encoded
+    while the next is fetched, so memory stays flat for any history length.
+    """
+    writer_class = export.WRITERS.get(format)
+    if writer_class is None:
+        raise HTTPException(status_code=400, detail=f"Unknown format: {format}. Use {', '.join(export.WRITERS)}.")
+    try:
+        writer = writer_class(export.schema(CONDITION_CHART_CONFIGS))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    def fetch(after: tuple[str, str] | None):
+        return storage.history_page(user_id, EXPORT_COLUMNS, EXPORT_PAGE_SIZE, after)
+
+    # The first page is read before the response starts, so a storage outage is still a 500
+    try:
+        first = await fetch(None)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def chunks():
+        page, upcoming = first, None
+        try:
+            while page:
+                last = page[-1]
+                upcoming = asyncio.create_task(fetch((str(last["date"]), last["id"])))
+                data = await asyncio.to_thread(writer.write, page)
+                if data:  # Parquet holds pages back until a row group is full
+                    yield data
+                page = await upcoming
+            yield await asyncio.to_thread(writer.close)
+        except Exception as e:
+            # Headers are gone; dropping the connection mid-body is how the client learns
+            print(f"⚠️  Export for {user_id} failed mid-stream: {e}")
+            raise
+        finally:
+            if upcoming is not None and not upcoming.done():
+                upcoming.cancel()
+
+    name = "".join(c for c in user_id if c.isalnum() or c in "-_") or "entries"
+    return StreamingResponse(
+        chunks(),
+        media_type=writer.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="koru-{name}-{date.today().isoformat()}.{writer.extension}"',
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # PATTERNS — Local statistical analysis (no Gemini needed)
 # GET /patterns/{user_id}
 # ═════════════════════════════════════════════════════════════════════════════
 
-def _compute_patterns(entries: list[dict]) -> list[dict]:
+# Cause → effect rules to check: (cause flag, effect flag, cause label, effect label)
+PATTERN_RULES = [
+    ("low_sleep", "headache", "Sleeping < 6h", "Headache"),
+    ("low_sleep", "fatigue", "Sleeping < 6h", "Fatigue"),
+    ("low_sleep", "bad_mood", "Sleeping < 6h", "Bad mood"),
+    ("high_stress", "headache", "High stress", "Headache"),
+    ("high_stress", "bad_mood", "High stress", "Bad mood"),
+    ("high_stress", "low_sleep", "High stress", "Poor sleep"),
+    ("exercise", "good_mood", "Exercise", "Good mood"),
+    ("exercise", "high_sleep", "Exercise", "Better sleep"),
+    ("high_sleep", "good_mood", "Good sleep (7h+)", "Good mood"),
+    ("low_stress", "good_mood", "Low stress", "Good mood"),
+]
+POSITIVE_CAUSES = ("exercise", "high_sleep", "low_stress")
+RISK_MARGIN = 0.1  # tomorrow's risk this far from the user's usual rate becomes a prediction
+
+
+def _compute_patterns(entries: list[dict] | EntryColumns) -> list[dict]:
     """Analyze extracted_json fields across entries to find correlations."""
-    total = len(entries)
-    patterns = []
+    cols = entries if isinstance(entries, EntryColumns) else decode_entries(entries)
+    flags = flag_columns(cols)
+    return _patterns_from_counts(*rule_counts(flags, PATTERN_RULES))
 
-    # Build per-entry flags
-    rows = []
-    for e in entries:
-        d = e.get("extracted_json") or {}
-        rows.append({
-            "low_sleep": d.get("sleep") == "low" or (d.get("sleep_hours") is not None and d.get("sleep_hours", 99) < 6),
-            "high_stress": d.get("stress") == "high",
-            "exercise": bool(d.get("exercise")),
-            "good_mood": d.get("mood") == "good",
-            "bad_mood": d.get("mood") == "bad",
-            "headache": "headache" in [s.lower() for s in (d.get("symptoms") or [])],
-            "fatigue": "fatigue" in [s.lower() for s in (d.get("symptoms") or [])],
-            "high_sleep": d.get("sleep") == "high" or (d.get("sleep_hours") is not None and d.get("sleep_hours", 0) >= 7),
-            "low_stress": d.get("stress") == "low",
-        })
 
-    # Define cause → effect rules to check
-    rules = [
-        ("low_sleep", "headache", "Sleeping < 6h", "Headache"),
-        ("low_sleep", "fatigue", "Sleeping < 6h", "Fatigue"),
-        ("low_sleep", "bad_mood", "Sleeping < 6h", "Bad mood"),
-        ("high_stress", "headache", "High stress", "Headache"),
-        ("high_stress", "bad_mood", "High stress", "Bad mood"),
-        ("high_stress", "low_sleep", "High stress", "Poor sleep"),
-        ("exercise", "good_mood", "Exercise", "Good mood"),
-        ("exercise", "high_sleep", "Exercise", "Better sleep"),
-        ("high_sleep", "good_mood", "Good sleep (7h+)", "Good mood"),
-        ("low_stress", "good_mood", "Low stress", "Good mood"),
-    ]
+def _patterns_from_counts(cause_counts: dict[str, int], pair_counts: dict[str, int]) -> list[dict]:
+    """Turn per-rule cause and cause∧effect counts into the top-5 pattern list."""
+    patterns = []
 
-    for cause_key, effect_key, cause_label, effect_label in rules:
-        cause_rows = [r for r in rows if r[cause_key]]
-        if len(cause_rows) < 2:
+    for cause_key, effect_key, cause_label, effect_label in PATTERN_RULES:
+        total = cause_counts.get(cause_key, 0)
+        if total < 2:
             continue
-        both = sum(1 for r in cause_rows if r[effect_key])
-        pct = round(both / len(cause_rows) * 100)
+        both = pair_counts.get(f"{cause_key}>{effect_key}", 0)
+        pct = round(both / total * 100)
         if pct < 40:
             continue
 
         # Determine strength
-        is_positive = cause_key in ("exercise", "high_sleep", "low_stress")
-        if is_positive:
+        if cause_key in POSITIVE_CAUSES:
             strength = "positive"
         elif pct >= 75:
             strength = "high"
@@ -369,7 +1467,7 @@ def _compute_patterns(entries: list[dict]) -> list[dict]:
             "cause": cause_label,
             "effect": effect_label,
             "occurrences": both,
-            "total": len(cause_rows),
+            "total": total,
             "percentage": pct,
             "strength": strength,
         })
@@ -379,49 +1477,31 @@ def _compute_patterns(entries: list[dict]) -> list[dict]:
     return patterns[:5]
 
 
-def _compute_stats(entries: list[dict]) -> dict:
-    """Compute summary statistics from entries."""
-    total = len(entries)
-    moods = {"good": 0, "neutral": 0, "bad": 0}
-    sleep_hours_list = []
-    exercise_count = 0
-    stress_counts = {"low": 0, "medium": 0, "high": 0}
-    all_symptoms = {}
-
-    for e in entries:
-        d = e.get("extracted_json") or {}
-        mood = d.get("mood", "neutral")
-        moods[mood] = moods.get(mood, 0) + 1
+def _compute_stats(entries: list[dict] | EntryColumns) -> dict:
+    """Compute summary statistics from entries (or already-decoded columns)."""
+    cols = entries if isinstance(entries, EntryColumns) else decode_entries(entries)
+    return _stats_from_aggregates(stats_aggregates(cols))
 
-        sh = d.get("sleep_hours")
-        if sh is not None:
-            sleep_hours_list.append(sh)
 
-        if d.get("exercise"):
-            exercise_count += 1
-
-        stress = d.get("stress", "medium")
-        stress_counts[stress] = stress_counts.get(stress, 0) + 1
-
-        for s in (d.get("symptoms") or []):
-            sl = s.lower()
-            all_symptoms[sl] = all_symptoms.get(sl, 0) + 1
-
-    avg_sleep = round(sum(sleep_hours_list) / len(sleep_hours_list), 1) if sleep_hours_list else None
-    top_symptoms = sorted(all_symptoms.items(), key=lambda x: x[1], reverse=True)[:5]
+def _stats_from_aggregates(agg: dict) -> dict:
+    total = agg["total"]
+    avg_sleep = round(agg["sleep_hours_sum"] / agg["sleep_hours_count"], 1) if agg["sleep_hours_count"] else None
+    top_symptoms = sorted(agg["symptoms"].items(), key=lambda x: x[1], reverse=True)[:5]
 
     return {
         "total_entries": total,
-        "mood_distribution": moods,
+        "mood_distribution": dict(agg["moods"]),
         "avg_sleep_hours": avg_sleep,
-        "exercise_rate": round(exercise_count / total * 100) if total > 0 else 0,
-        "stress_distribution": stress_counts,
+        "exercise_rate": round(agg["exercise"] / total * 100) if total > 0 else 0,
+        "stress_distribution": dict(agg["stress"]),
         "top_symptoms": [{"name": s, "count": c} for s, c in top_symptoms],
     }
 
 
 # ── Condition chart configs ────────────────────────────────────────────────────
 # To add a new condition, just add an entry here — no other code changes needed.
+# The primary value (and its split, e.g. "bp_secondary") plus every numeric
+# "text" indicator is also stored as a typed series for /series (timeseries.py).
 CONDITION_CHART_CONFIGS = {
     "diabetes": {
         "label": "Glucose over time",
@@ -429,7 +1509,7 @@ CONDITION_CHART_CONFIGS = {
         "primary": {"key": "glucose", "unit": "mg/dL", "high": 180, "low": 70},
         "indicators": [
             {"key": "insulin", "type": "toggle", "emoji": "💉", "label": "Insulin"},
-            {"key": "carbs",   "type": "text",   "emoji": "🍞", "label": "Carbs"},
+            {"key": "carbs",   "type": "text",   "emoji": "🍞", "label": "Carbs", "unit": "g"},
         ],
     },
     "hypertension": {
@@ -438,7 +1518,7 @@ CONDITION_CHART_CONFIGS = {
         "primary": {"key": "bp", "unit": "mmHg", "high": 140, "low": 90, "split": "/"},
         "indicators": [
             {"key": "medication",  "type": "toggle", "emoji": "💊", "label": "Medication"},
-            {"key": "heart_rate", "type": "text",   "emoji": "💓", "label": "Heart rate"},
+            {"key": "heart_rate", "type": "text",   "emoji": "💓", "label": "Heart rate", "unit": "bpm"},
         ],
     },
     # Easy to extend:
@@ -480,54 +1560,65 @@ def _compute_condition_chart(entries: list[dict], user_condition: str | None = N
     if not cfg:
         return None
 
-    prim = cfg["primary"]
     filtered = sorted(
         [p for p in points if p["condition"] == primary_cond],
         key=lambda p: p["date"],
     )
 
     chart_data = []
-    primary_values = []
-
     for p in filtered:
-        raw = p["values"].get(prim["key"])
-        if raw is None or raw == "":
-            continue
+        row = _chart_point(cfg, p["date"], p["values"])
+        if row is not None:
+            chart_data.append(row)
 
-        try:
-            # Handle split values like "120/80" → primary = 120, secondary = 80
-            if prim.get("split") and prim["split"] in str(raw):
-                parts = str(raw).split(prim["split"])
-                val = float(parts[0])
-                secondary_val = float(parts[1]) if len(parts) > 1 else None
-            else:
-                val = float(raw)
-                secondary_val = None
-        except (ValueError, TypeError):
-            continue
+    if not chart_data:
+        return None
 
-        primary_values.append(val)
-        row = {"date": p["date"], "value": val}
-        if secondary_val is not None:
-            row["secondary"] = secondary_val
+    avg_val = round(sum(r["value"] for r in chart_data) / len(chart_data), 1)
+    return _chart_payload(primary_cond, cfg, avg_val, chart_data[-CHART_POINTS:])
 
-        # Attach indicator fields
-        for ind in cfg.get("indicators", []):
-            ind_raw = p["values"].get(ind["key"])
-            if ind["type"] == "toggle":
-                row[ind["key"]] = bool(ind_raw)
-            else:
-                row[ind["key"]] = ind_raw if ind_raw else None
 
-        chart_data.append(row)
+CHART_POINTS = 30  # most recent points shown on the condition chart
 
-    if not chart_data:
+
+def _chart_point(cfg: dict, date: str, values: dict) -> dict | None:
+    """Parse one day's condition_data into a chart row, or None if unusable."""
+    prim = cfg["primary"]
+    raw = values.get(prim["key"])
+    if raw is None or raw == "":
+        return None
+
+    try:
+        # Handle split values like "120/80" → primary = 120, secondary = 80
+        if prim.get("split") and prim["split"] in str(raw):
+            parts = str(raw).split(prim["split"])
+            val = float(parts[0])
+            secondary_val = float(parts[1]) if len(parts) > 1 else None
+        else:
+            val = float(raw)
+            secondary_val = None
+    except (ValueError, TypeError):
         return None
 
-    avg_val = round(sum(primary_values) / len(primary_values), 1)
+    row = {"date": date, "value": val}
+    if secondary_val is not None:
+        row["secondary"] = secondary_val
+
+    # Attach indicator fields
+    for ind in cfg.get("indicators", []):
+        ind_raw = values.get(ind["key"])
+        if ind["type"] == "toggle":
+            row[ind["key"]] = bool(ind_raw)
+        else:
+            row[ind["key"]] = ind_raw if ind_raw else None
+
+    return row
 
+
+def _chart_payload(condition: str, cfg: dict, avg_val: float, chart_data: list[dict]) -> dict:
+    prim = cfg["primary"]
     return {
-        "condition": primary_cond,
+        "condition": condition,
         "emoji": cfg["emoji"],
         "label": cfg["label"],
         "unit": prim["unit"],
@@ -536,13 +1627,37 @@ def _compute_condition_chart(entries: list[dict], user_condition: str | None = N
         "has_secondary": prim.get("split") is not None,
         "avg": avg_val,
         "indicators": cfg.get("indicators", []),
-        "data": chart_data[-30:],
+        "data": chart_data,
     }
 
 
-def _generate_predictions(patterns: list[dict], stats: dict) -> list[dict]:
-    """Generate actionable predictions/tips from patterns and stats."""
+def _risk_predictions(risk: dict) -> list[dict]:
+    """Tomorrow's risks that stand out from the user's usual rate."""
     predictions = []
+    for t in sorted(risk["targets"], key=lambda t: t["probability"] - t["usual"], reverse=True):
+        label = t["label"].lower()
+        text = f"Tomorrow's {label} risk is {round(t['probability'] * 100)}% (usually {round(t['usual'] * 100)}%)"
+        if t["probability"] - t["usual"] >= RISK_MARGIN:
+            because = f" — {', '.join(d.lower() for d in t['drivers'])}." if t["drivers"] else "."
+            predictions.append({
+                "type": "warning",
+                "icon": "📈",
+                "text": text + because,
+                "tip": t["tip"] or f"Go easy tomorrow and note what you do — it helps spot what triggers {label}.",
+            })
+        elif t["usual"] - t["probability"] >= RISK_MARGIN:
+            predictions.append({
+                "type": "positive",
+                "icon": "📉",
+                "text": text + ".",
+                "tip": "Whatever you did today is working — keep it up.",
+            })
+    return predictions
+
+
+def _generate_predictions(patterns: list[dict], stats: dict, risk: dict | None = None) -> list[dict]:
+    """Generate actionable predictions/tips from tomorrow's risk, patterns and stats."""
+    predictions = _risk_predictions(risk) if risk else []
 
     for p in patterns:
         if p["strength"] == "high":
@@ -560,6 +1675,10 @@ def _generate_predictions(patterns: list[dict], stats: dict) -> list[dict]:
                 "tip": f"Keep it up! {p['cause']} clearly benefits you.",
             })
 
+    # Fixed-threshold tips only until the user's risk model has learned enough
+    if risk:
+        return predictions[:6]
+
     # Add stat-based insights
     if stats.get("avg_sleep_hours") and stats["avg_sleep_hours"] < 6:
         predictions.append({
@@ -594,36 +1713,606 @@ def _generate_predictions(patterns: list[dict], stats: dict) -> list[dict]:
     return predictions[:6]
 
 
+# ── Materialized per-user aggregates ──────────────────────────────────────────
+# Everything /patterns needs is kept as running counters in `user_aggregates`
+# (one JSON row per user, see migrations/001_user_aggregates.sql). Writes add
+# or subtract a single entry's contribution, so reads are one primary-key
+# lookup over the user's *full* history instead of a 60-row recompute.
+# insights_batch.py recomputes every user's row nightly across all cores, so
+# reads rarely hit the rebuild path and any drift is repaired.
+
+def _empty_aggregates() -> dict:
+    return {
+        "total": 0,
+        "moods": {"good": 0, "neutral": 0, "bad": 0},
+        "stress": {"low": 0, "medium": 0, "high": 0},
+        "symptoms": {},
+        "exercise": 0,
+        "sleep_hours_sum": 0.0,
+        "sleep_hours_count": 0,
+        "causes": {},       # cause flag → entries where it holds
+        "pairs": {},        # "cause>effect" → entries where both hold
+        "conditions": {},   # condition → {"entries", "value_sum", "value_count", "points"}
+        "risk": risk_model.empty(),  # next-day symptom model, see risk_model.py
+    }
+
+
+def _aggregates_from_entries(entries: list[dict]) -> dict:
+    """Build aggregates for a batch of entries (rows with id, date, extracted_json)."""
+    agg = _counts_from_entries(entries)
+    agg["risk"] = risk_model.fit(entries)
+    return agg
+
+
+def _counts_from_entries(entries: list[dict]) -> dict:
+    """Everything in the aggregates but the risk model — the part that adds and subtracts."""
+    cols = decode_entries(entries)
+    causes, pairs = rule_counts(flag_columns(cols), PATTERN_RULES)
+
+    agg = _empty_aggregates()
+    del agg["risk"]
+    agg.update(stats_aggregates(cols))
+    agg["causes"] = causes
+    agg["pairs"] = pairs
+
+    for e in entries:
+        d = e.get("extracted_json") or {}
+        cond = d.get("condition")
+        cdata = d.get("condition_data")
+        if not cond or not cdata:
+            continue
+
+        series = agg["conditions"].setdefault(
+            cond, {"entries": 0, "value_sum": 0.0, "value_count": 0, "points": []}
+        )
+        series["entries"] += 1
+        cfg = CONDITION_CHART_CONFIGS.get(cond)
+        row = _chart_point(cfg, e["date"], cdata) if cfg else None
+        if row is not None:
+            series["value_sum"] += row["value"]
+            series["value_count"] += 1
+            series["points"].append({**row, "entry_id": e["id"]})
+
+    for series in agg["conditions"].values():
+        series["points"].sort(key=lambda p: (p["date"], p["entry_id"]))
+        del series["points"][:-CHART_POINTS]
+
+    return agg
+
+
+def _merge_counts(target: dict, delta: dict, sign: int, keep_zero: bool = False):
+    for key, count in delta.items():
+        target[key] = target.get(key, 0) + sign * count
+        if target[key] <= 0 and not keep_zero:
+            del target[key]
+
+
+def _accumulate(agg: dict, entry: dict, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) one entry's contribution to agg in place."""
+    delta = _counts_from_entries([entry])
+
+    for key in ("total", "exercise", "sleep_hours_sum", "sleep_hours_count"):
+        agg[key] += sign * delta[key]
+    _merge_counts(agg["moods"], delta["moods"], sign, keep_zero=True)
+    _merge_counts(agg["stress"], delta["stress"], sign, keep_zero=True)
+    _merge_counts(agg["symptoms"], delta["symptoms"], sign)
+    _merge_counts(agg["causes"], delta["causes"], sign, keep_zero=True)
+    _merge_counts(agg["pairs"], delta["pairs"], sign, keep_zero=True)
+
+    for cond, d_series in delta["conditions"].items():
+        series = agg["conditions"].setdefault(
+            cond, {"entries": 0, "value_sum": 0.0, "value_count": 0, "points": []}
+        )
+        for key in ("entries", "value_sum", "value_count"):
+            series[key] += sign * d_series[key]
+        if sign > 0:
+            series["points"].extend(d_series["points"])
+            series["points"].sort(key=lambda p: (p["date"], p["entry_id"]))
+            del series["points"][:-CHART_POINTS]
+        else:
+            series["points"] = [p for p in series["points"] if p.get("entry_id") != entry["id"]]
+
+    # Exact for the model's last day; anything older marks it stale for the nightly batch
+    risk = agg.setdefault("risk", risk_model.empty())
+    if sign > 0:
+        risk_model.update(risk, entry)
+    else:
+        risk_model.remove(risk, entry)
+
+
+def _chart_from_aggregates(agg: dict, user_condition: str | None = None) -> dict | None:
+    conditions = {c: s for c, s in agg["conditions"].items() if s["entries"] > 0}
+    if not conditions:
+        return None
+
+    # Use the condition the user currently has selected; fall back to most frequent
+    if user_condition and user_condition != "general":
+        primary_cond = user_condition
+    else:
+        primary_cond = max(conditions, key=lambda c: conditions[c]["entries"])
+
+    cfg = CONDITION_CHART_CONFIGS.get(primary_cond)
+    series = conditions.get(primary_cond)
+    if not cfg or not series or series["value_count"] <= 0:
+        return None
+
+    avg_val = round(series["value_sum"] / series["value_count"], 1)
+    chart_data = [{k: v for k, v in p.items() if k != "entry_id"} for p in series["points"]]
+    return _chart_payload(primary_cond, cfg, avg_val, chart_data)
+
+
+_aggregate_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+async def rebuild_aggregates(user_id: str) -> dict:
+    """Recompute a user's aggregates from their full confirmed history and store them."""
+    agg = _aggregates_from_entries(await storage.history(user_id))
+    await _save_aggregates(user_id, agg)
+    return agg
+
+
+async def _load_aggregates(user_id: str) -> tuple[dict, bool]:
+    """Return (aggregates, rebuilt). Users without a stored row are backfilled."""
+    agg = await storage.get_aggregates(user_id)
+    if agg is not None:
+        return agg, False
+    return await rebuild_aggregates(user_id), True
+
+
+async def _save_aggregates(user_id: str, agg: dict):
+    await storage.save_aggregates(user_id, agg)
+    entry_cache.set_aggregates(user_id, agg)
+
+
+async def _hot_aggregates(user_id: str) -> dict:
+    """Aggregates for reads — from the entry cache while the user's data version holds."""
+    ticket = entry_cache.ticket()
+    version = await asyncio.to_thread(data_versions.get, user_id)
+    agg = entry_cache.aggregates(user_id, version)
+    if agg is None:
+        agg, _ = await _load_aggregates(user_id)
+        entry_cache.put_aggregates(user_id, version, agg, ticket)
+    return agg
+
+
+async def update_aggregates(user_id: str, add: list[dict] = (), remove: list[dict] = ()):
+    """
+    Apply entry deltas to a user's stored aggregates. Entries are rows with
+    id, date and extracted_json, already reflected in the `entries` table.
+    """
+    lock = _aggregate_locks.get(user_id)
+    if lock is None:
+        lock = _aggregate_locks[user_id] = asyncio.Lock()
+
+    async with lock:
+        try:
+            agg, rebuilt = await _load_aggregates(user_id)
+            if not rebuilt:  # else the rebuild already saw the new state
+                for entry in remove:
+                    _accumulate(agg, entry, -1)
+                for entry in sorted(add, key=lambda e: (str(e["date"])[:10], str(e["id"]))):  # the risk model learns in date order
+                    _accumulate(agg, entry, 1)
+                await _save_aggregates(user_id, agg)
+            entry_cache.apply(user_id, add=add, remove=remove)
+        except Exception as e:
+            # Drop the row so the next read rebuilds it instead of serving drift
+            print(f"⚠️  Aggregates update failed for {user_id}, invalidating: {e}")
+            entry_cache.drop(user_id)
+            try:
+                await storage.delete_aggregates(user_id)
+            except Exception:
+                pass
+
+
 @app.get("/patterns/{user_id}")
-async def get_patterns(user_id: str, condition: str | None = None):
+async def get_patterns(request: Request, user_id: str, condition: str | None = None):
+    async def load():
+        try:
+            agg = await _hot_aggregates(user_id)
+
+            if agg["total"] < 7:
+                return {"has_enough_data": False, "patterns": [], "stats": None, "predictions": [], "risk": None}
+
+            patterns = _patterns_from_counts(agg["causes"], agg["pairs"])
+            stats = _stats_from_aggregates(agg)
+            risk = risk_model.forecast(agg.get("risk"))
+            predictions = _generate_predictions(patterns, stats, risk)
+            condition_chart = _chart_from_aggregates(agg, condition)
+
+            return {
+                "has_enough_data": True,
+                "patterns": patterns,
+                "stats": stats,
+                "predictions": predictions,
+                "risk": risk,
+                "condition_chart": condition_chart,
+            }
+
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return await cached_read(request, user_id, load)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# METRICS — Typed condition series with downsampled rollups
+# GET /series/{user_id}/glucose?start=2025-01-01&end=2025-12-31
+# ═════════════════════════════════════════════════════════════════════════════
+METRIC_MAX_POINTS = int(os.getenv("METRIC_MAX_POINTS", "200"))  # auto bucketing keeps charts under this
+METRIC_DEFAULT_WINDOW = 7
+
+
+def _metric_spec(metric: str) -> tuple[str, dict] | None:
+    """(condition, spec) for a series name like "glucose" or "bp_secondary"."""
+    for condition, cfg in CONDITION_CHART_CONFIGS.items():
+        spec = timeseries.metric_specs(cfg).get(metric)
+        if spec is not None:
+            return condition, spec
+    return None
+
+
+def _metric_points(row: dict) -> list[dict]:
+    """Typed points for one entry (date, extracted_json) — parsed once, at write time."""
+    d = row.get("extracted_json") or {}
+    cfg = CONDITION_CHART_CONFIGS.get(d.get("condition"))
+    cdata = d.get("condition_data")
+    if not cfg or not isinstance(cdata, dict):
+        return []
+    specs = timeseries.metric_specs(cfg)
+    return [
+        {"metric": metric, "date": row["date"], "seq": seq, "value": value, "band": timeseries.band(value, specs[metric])}
+        for seq, (metric, value) in enumerate(timeseries.parse_readings(cfg, cdata))
+    ]
+
+
+async def record_metrics(user_id: str, rows: list[dict], replace: bool = False):
+    """
+    Store saved/confirmed entries' metric points. New rows without readings cost
+    nothing; `replace` (confirm) also clears readings an edit removed. Never
+    fails the write.
+    """
     try:
-        db_response = (
-            supabase.table("entries")
-            .select("date, extracted_json")
-            .eq("user_id", user_id)
-            .eq("status", "confirmed")
-            .order("date", desc=True)
-            .limit(60)
-            .execute()
-        )
+        for row in rows:
+            points = _metric_points(row)
+            if points or replace:
+                await storage.replace_metric_points(user_id, row["id"], points)
+    except Exception as e:
+        print(f"⚠️  Metric series update failed for {user_id}, will rebuild: {e}")
+        try:
+            await storage.mark_metrics_built(user_id, False)
+        except Exception:
+            pass
+
+
+async def _ensure_metrics(user_id: str):
+    """Build a user's series from their history the first time they're read."""
+    if await storage.metrics_built(user_id):
+        return
+    rows = await storage.history(user_id, "id, date, extracted_json")
+    await storage.rebuild_metrics(user_id, [{**p, "entry_id": row["id"]} for row in rows for p in _metric_points(row)])
+    await storage.mark_metrics_built(user_id)
+
+
+@app.get("/series/{user_id}/{metric}")
+async def get_metric_series(
+    request: Request,
+    user_id: str,
+    metric: str,
+    start: str | None = None,
+    end: str | None = None,
+    bucket: str = "auto",
+    window: int = METRIC_DEFAULT_WINDOW,
+):
+    """
+    One metric over any period (whole history by default). bucket=auto picks
+    the finest of raw / day / week / month that fits METRIC_MAX_POINTS; rolled
+    up buckets carry min/max/avg and above/below counts. rolling_avg covers the
+    trailing `window` buckets (days for raw). summary includes the share of
+    readings outside the condition's thresholds.
+    """
+    found = _metric_spec(metric)
+    if found is None:
+        raise HTTPException(status_code=404, detail=f"Unknown metric: {metric}")
+    condition, spec = found
+    if bucket != "auto" and bucket not in timeseries.BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be auto or one of {', '.join(timeseries.BUCKETS)}.")
+    for value in (start, end):
+        if value is not None:
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="start and end must be YYYY-MM-DD.")
+    window = max(window, 1)
+
+    async def load():
+        try:
+            await _ensure_metrics(user_id)
+            days = await storage.metric_days(user_id, metric, start, end)
+            chosen = timeseries.choose_bucket(days, METRIC_MAX_POINTS) if bucket == "auto" else bucket
+
+            if chosen == "raw":
+                points = await storage.metric_points(user_id, metric, start, end)
+                rows = [{"date": p["date"], "count": 1, "sum": p["value"], "band": p["band"]} for p in points]
+            else:
+                rows = timeseries.rollup(days, chosen)
+
+            return {
+                "metric": metric,
+                "condition": condition,
+                "unit": spec["unit"],
+                "threshold_high": spec["high"],
+                "threshold_low": spec["low"],
+                "bucket": chosen,
+                "start": days[0]["date"] if days else start,
+                "end": days[-1]["date"] if days else end,
+                "summary": timeseries.summary(days),
+                "points": timeseries.shape(timeseries.with_rolling(rows, chosen, window), chosen),
+            }
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return await cached_read(request, user_id, load)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# ASSOCIATIONS — Data-driven co-occurrence mining over every variable
+# GET /patterns/{user_id}/associations?min_support=3&min_lift=1.2&min_confidence=30
+# ═════════════════════════════════════════════════════════════════════════════
+FEATURE_LABELS = {
+    "sleep:<6h": "Sleeping < 6h",
+    "sleep:7h+": "Good sleep (7h+)",
+    "exercise:yes": "Exercise",
+}
+
+
+def _entry_features(d: dict) -> list[str]:
+    """Every variable in one extracted_json as "family:value" feature strings."""
+    features = [f"symptom:{s.lower()}" for s in (d.get("symptoms") or [])]
+    features += [f"food:{f.lower()}" for f in (d.get("food") or [])]
+
+    if d.get("sleep"):
+        features.append(f"sleep:{d['sleep']}")
+    sleep_hours = d.get("sleep_hours")
+    if sleep_hours is not None:
+        if sleep_hours < 6:
+            features.append("sleep:<6h")
+        elif sleep_hours >= 7:
+            features.append("sleep:7h+")
+    if d.get("stress"):
+        features.append(f"stress:{d['stress']}")
+    if d.get("mood"):
+        features.append(f"mood:{d['mood']}")
+    if d.get("exercise"):
+        features.append("exercise:yes")
+
+    # Condition flags: out-of-range primary readings and toggles taken
+    cond = d.get("condition")
+    cdata = d.get("condition_data")
+    cfg = CONDITION_CHART_CONFIGS.get(cond) if cond else None
+    if cfg and cdata:
+        prim = cfg["primary"]
+        point = _chart_point(cfg, "", cdata)
+        if point is not None:
+            if point["value"] > prim["high"]:
+                features.append(f"{cond}:high {prim['key']}")
+            elif point["value"] < prim["low"]:
+                features.append(f"{cond}:low {prim['key']}")
+        for ind in cfg.get("indicators", []):
+            if ind["type"] == "toggle" and cdata.get(ind["key"]) is True:
+                features.append(f"{cond}:{ind['label'].lower()}")
+
+    return features
+
+
+def _feature_label(feature: str) -> str:
+    if feature in FEATURE_LABELS:
+        return FEATURE_LABELS[feature]
+    family, value = feature.split(":", 1)
+    if family in ("sleep", "stress"):
+        return f"{value.capitalize()} {family}"
+    if family == "mood":
+        return f"{value.capitalize()} mood"
+    return value.capitalize()
+
+
+@app.get("/patterns/{user_id}/associations")
+async def get_associations(
+    request: Request,
+    user_id: str,
+    min_support: int = 3,
+    min_lift: float = 1.2,
+    min_confidence: int = 30,  # percent
+    limit: int = 20,
+):
+    async def load():
+        try:
+            entries = await _hot_entries(user_id)
+            if entries is None:
+                entries = await storage.history(user_id, "date, extracted_json")
+            if len(entries) < 7:
+                return {"has_enough_data": False, "associations": []}
+
+            associations = mine_associations(
+                [_entry_features(e.get("extracted_json") or {}) for e in entries],
+                [e["date"] for e in entries],
+                min_support=max(min_support, 1),
+                min_lift=min_lift,
+                min_confidence=min_confidence / 100,
+                limit=min(max(limit, 1), 100),
+            )
+            for a in associations:
+                a["cause_label"] = _feature_label(a["cause"])
+                a["effect_label"] = _feature_label(a["effect"])
+
+            return {"has_enough_data": True, "entries_analyzed": len(entries), "associations": associations}
+
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return await cached_read(request, user_id, load)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# INSIGHTS — Narrative insights from Gemini (opt-in: nothing else calls it)
+# GET /insights/{user_id}?condition=diabetes&wait=20
+#   200 {status: "ready", summary, insights: [...], generated_at, prompt_tokens}
+#   200 {status: "refreshing", ...}   new entries landed; the last insights meanwhile
+#   202 {status: "generating"}        first time; poll again (or pass wait=)
+#   200 {status: "failed", error}     retried by a request once INSIGHTS_LEASE is over
+# Gemini only ever sees a digest of fixed size built from the aggregates and
+# mined associations, so the prompt costs the same for 30 entries or 3000.
+# ═════════════════════════════════════════════════════════════════════════════
+INSIGHTS_RECENT = 30          # entries in the digest's "recent" stats
+INSIGHTS_ASSOCIATIONS = 8     # strongest associations in the digest
+INSIGHTS_MAX_WAIT = 30.0
+_insight_tasks: set[asyncio.Task] = set()
+
+
+def _condition_digest(chart: dict | None) -> dict | None:
+    """The condition chart's readings as a handful of numbers."""
+    values = [p["value"] for p in (chart or {}).get("data", []) if p.get("value") is not None]
+    if not values:
+        return None
+    high, low = chart.get("threshold_high"), chart.get("threshold_low")
+    recent, earlier = values[-10:], values[:-10]
+    return {
+        "condition": chart["condition"],
+        "unit": chart.get("unit"),
+        "readings": len(values),
+        "avg": round(sum(values) / len(values), 1),
+        "min": min(values),
+        "max": max(values),
+        "latest": values[-1],
+        "above_high": sum(v > high for v in values) if high is not None else None,
+        "below_low": sum(v < low for v in values) if low is not None else None,
+        "avg_last_10": round(sum(recent) / len(recent), 1),
+        "avg_before": round(sum(earlier) / len(earlier), 1) if earlier else None,
+    }
 
-        entries = db_response.data
 
-        if len(entries) < 7:
-            return {"has_enough_data": False, "patterns": [], "stats": None, "predictions": []}
+async def _insights_digest(user_id: str, condition: str | None) -> dict | None:
+    """Everything the insights prompt sees — fixed size, whatever the history length. None below 7 entries."""
+    agg = await _hot_aggregates(user_id)
+    if agg["total"] < 7:
+        return None
+    entries = await _hot_entries(user_id)
+    if entries is None:
+        entries = await storage.history(user_id, "date, extracted_json")
+
+    associations = mine_associations(
+        [_entry_features(e.get("extracted_json") or {}) for e in entries],
+        [e["date"] for e in entries],
+        min_support=3,
+        min_lift=1.2,
+        min_confidence=0.3,
+        limit=INSIGHTS_ASSOCIATIONS,
+    )
+    forecast = risk_model.forecast(agg.get("risk"))
+    return {
+        "entries": agg["total"],
+        "from": entries[0]["date"] if entries else None,
+        "to": entries[-1]["date"] if entries else None,
+        "overall": _stats_from_aggregates(agg),
+        "recent": _compute_stats(entries[-INSIGHTS_RECENT:]),
+        "patterns": _patterns_from_counts(agg["causes"], agg["pairs"]),
+        "associations": [
+            {"cause": _feature_label(a["cause"]), "effect": _feature_label(a["effect"]), "lag_days": a["lag_days"],
+             "occurrences": a["occurrences"], "total": a["total"], "confidence": a["confidence"], "lift": a["lift"]}
+            for a in associations
+        ],
+        "condition": _condition_digest(_chart_from_aggregates(agg, condition)),
+        "tomorrow": [
+            {"risk": t["label"], "probability": t["probability"], "usual": t["usual"], "drivers": t["drivers"]}
+            for t in forecast["targets"]
+        ] if forecast else None,
+    }
 
-        patterns = _compute_patterns(entries)
-        stats = _compute_stats(entries)
-        predictions = _generate_predictions(patterns, stats)
-        condition_chart = _compute_condition_chart(entries, condition)
 
-        return {
+def _clean_insights(result) -> dict:
+    """Keep what Gemini returned in the documented shape."""
+    if not isinstance(result, dict):
+        raise ValueError("Gemini returned insights that are not a JSON object.")
+    insights = []
+    for item in result.get("insights") or []:
+        if isinstance(item, dict) and isinstance(item.get("title"), str) and isinstance(item.get("detail"), str):
+            insights.append({
+                "title": item["title"],
+                "detail": item["detail"],
+                "kind": item.get("kind") if item.get("kind") in ("warning", "positive", "trend") else "trend",
+                "source": item.get("source"),
+            })
+    summary = result.get("summary")
+    return {"summary": summary if isinstance(summary, str) else "", "insights": insights[:5]}
+
+
+async def _regenerate_insights(key: str, version: int, digest: dict, digest_hash: str):
+    prompt = PATTERNS_PROMPT.format(
+        recent=INSIGHTS_RECENT, digest=json.dumps(digest, ensure_ascii=False, separators=(",", ":")),
+    )
+    try:
+        body = _clean_insights(await call_gemini(prompt, priority=BULK))
+        await asyncio.to_thread(insight_store.save, key, version, digest_hash, body, len(prompt) // 4)
+    except Exception as e:
+        print(f"⚠️  Insights for {key} failed: {e}")
+        await asyncio.to_thread(insight_store.fail, key, str(e))
+
+
+def _insights_response(state: dict, version: int) -> tuple[int, dict]:
+    if state["body"] is not None:
+        return 200, {
+            "status": "ready" if state["version"] == version else "refreshing",
             "has_enough_data": True,
-            "patterns": patterns,
-            "stats": stats,
-            "predictions": predictions,
-            "condition_chart": condition_chart,
+            **state["body"],
+            "generated_at": datetime.fromtimestamp(state["generated_at"], timezone.utc).isoformat(),
+            "prompt_tokens": state["prompt_tokens"],
         }
+    if state["error"]:
+        return 200, {"status": "failed", "has_enough_data": True, "error": state["error"]}
+    return 202, {"status": "generating", "has_enough_data": True}
+
+
+@app.get("/insights/{user_id}")
+async def get_insights(user_id: str, response: Response, condition: str | None = None, wait: float = 0):
+    """
+    Gemini's narrative read of the user's patterns. Regenerated in the
+    background only when new entries change the digest; until then every
+    request is served from the stored result.
+    """
+    key = f"{user_id}:{condition or ''}"
+    try:
+        version = await asyncio.to_thread(data_versions.get, user_id)
+        state = await asyncio.to_thread(insight_store.get, key)
+
+        if state is None or (state["version"] != version and not state["claimed"]):
+            digest = await _insights_digest(user_id, condition)
+            if digest is None:
+                return {"status": "ready", "has_enough_data": False, "summary": "", "insights": []}
+            digest_hash = hashlib.sha256("\x1f".join((
+                GEMINI_MODEL, PATTERNS_PROMPT_VERSION, json.dumps(digest, sort_keys=True, separators=(",", ":")),
+            )).encode()).hexdigest()
+
+            if state is not None and state["body"] is not None and state["digest_hash"] == digest_hash:
+                # New entries, but nothing the insights are built from moved
+                await asyncio.to_thread(insight_store.touch, key, version)
+                state["version"] = version
+            else:
+                # Unless another request is already on it (or a failed attempt's lease is still running)
+                if await asyncio.to_thread(insight_store.claim, key):
+                    task = asyncio.create_task(_regenerate_insights(key, version, digest, digest_hash))
+                    _insight_tasks.add(task)
+                    task.add_done_callback(_insight_tasks.discard)
+                state = await asyncio.to_thread(insight_store.get, key)
+
+        # Long-poll for the first generation
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(max(wait, 0.0), INSIGHTS_MAX_WAIT)
+        while state["body"] is None and not state["error"] and loop.time() < deadline:
+            await asyncio.sleep(0.25)
+            state = await asyncio.to_thread(insight_store.get, key)
+
+        response.status_code, body = _insights_response(state, version)
+        return body
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
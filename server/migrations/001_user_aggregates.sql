@@ -0,0 +1,8 @@
+-- Materialized per-user pattern/stat counters, maintained by main.update_aggregates().
+-- Rows are created lazily (backfilled from `entries` on first read), so no data
+-- migration is needed — dropping a row simply forces a rebuild.
+create table if not exists user_aggregates (
+    user_id     text primary key,
+    aggregates  jsonb not null,
+    updated_at  timestamptz not null default now()
+);
@@ -0,0 +1,4 @@
+-- Every user-scoped read (timeline pages, history for aggregates/associations)
+-- filters on user_id + status and orders by date, id — serve them from one index.
+create index if not exists entries_user_status_date
+    on entries (user_id, status, date, id);
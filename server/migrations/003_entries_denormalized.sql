@@ -0,0 +1,13 @@
+-- Timeline fields derived from extracted_json, written once by main._derived_columns()
+-- instead of being recomputed on every read, and indexed so the timeline can
+-- filter on them (?tag=headache, ?mood=bad).
+alter table entries add column if not exists tags   text[];
+alter table entries add column if not exists mood   text;
+alter table entries add column if not exists sleep  text;
+alter table entries add column if not exists stress text;
+
+create index if not exists entries_tags on entries using gin (tags);
+create index if not exists entries_user_mood_date on entries (user_id, mood, date);
+
+-- Existing rows: run `python backfill.py` from server/ after applying this file.
+-- It fills the four columns with the same Python derivation new writes use.
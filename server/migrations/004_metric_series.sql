@@ -0,0 +1,36 @@
+-- Condition metrics (glucose, blood pressure, heart rate…) as typed series,
+-- parsed once from condition_data at write time by main.record_metrics().
+-- band is -1 / 0 / 1 for below / inside / above the CONDITION_CHART_CONFIGS thresholds.
+create table if not exists metric_points (
+    user_id   text not null,
+    entry_id  uuid not null,
+    metric    text not null,
+    date      date not null,
+    seq       smallint not null,
+    value     double precision not null,
+    band      smallint not null,
+    primary key (user_id, metric, date, entry_id, seq)
+);
+create index if not exists metric_points_entry on metric_points (entry_id);
+
+-- One rollup row per user, metric and day; week/month buckets are merged from these.
+create table if not exists metric_daily (
+    user_id  text not null,
+    metric   text not null,
+    date     date not null,
+    count    integer not null,
+    sum      double precision not null,
+    min      double precision not null,
+    max      double precision not null,
+    above    integer not null,
+    below    integer not null,
+    primary key (user_id, metric, date)
+);
+
+-- Users whose series have been built. Existing users are built from their
+-- history on their first GET /series read, so no data migration is needed;
+-- deleting a row here forces a rebuild.
+create table if not exists metric_users (
+    user_id   text primary key,
+    built_at  timestamptz not null default now()
+);
@@ -0,0 +1,140 @@
+"""
+Data-driven co-occurrence mining over every extracted variable.
+
+Entries are turned into a sparse entry × feature incidence matrix X (one
+column per distinct symptom, food, sleep/stress/mood level, condition flag…).
+All same-day co-occurrence counts then come from a single product X.T @ X,
+and next-day (lagged) counts from one product between consecutive days.
+Candidate associations are filtered by support, confidence and lift, so only
+pairs that happen often *and* more often than chance survive.
+
+Features are "family:value" strings; pairs within the same family (e.g.
+"sleep:low" / "sleep:<6h") are skipped as trivially related.
+"""
+from datetime import date
+
+import numpy as np
+from scipy import sparse
+
+
+def incidence_matrix(feature_lists: list[list[str]]) -> tuple[sparse.csr_matrix, list[str]]:
+    """Binary entry × feature matrix plus the feature vocabulary (column order)."""
+    vocab: dict[str, int] = {}
+    rows: list[int] = []
+    cols: list[int] = []
+    for i, features in enumerate(feature_lists):
+        for f in set(features):
+            j = vocab.get(f)
+            if j is None:
+                j = vocab[f] = len(vocab)
+            rows.append(i)
+            cols.append(j)
+
+    data = np.ones(len(rows), dtype=np.float32)
+    matrix = sparse.csr_matrix((data, (rows, cols)), shape=(len(feature_lists), len(vocab)))
+    return matrix, list(vocab)
+
+
+def _family(feature: str) -> str:
+    return feature.split(":", 1)[0]
+
+
+def _day_matrix(matrix: sparse.csr_matrix, dates: list[str]) -> tuple[sparse.csr_matrix, np.ndarray]:
+    """Collapse entries to one binary row per calendar day; returns (days × features, day ordinals)."""
+    ordinals = np.fromiter((date.fromisoformat(d[:10]).toordinal() for d in dates), dtype=np.int64, count=len(dates))
+    days, inverse = np.unique(ordinals, return_inverse=True)
+    grouping = sparse.csr_matrix(
+        (np.ones(len(dates), dtype=np.float32), (inverse, np.arange(len(dates)))),
+        shape=(len(days), len(dates)),
+    )
+    day_matrix = (grouping @ matrix).tocsr()
+    day_matrix.data[:] = 1.0
+    return day_matrix, days
+
+
+def _associations(
+    co: np.ndarray,
+    cause_counts: np.ndarray,
+    effect_counts: np.ndarray,
+    n: int,
+    vocab: list[str],
+    lag_days: int,
+    min_support: int,
+    min_lift: float,
+    min_confidence: float,
+) -> list[dict]:
+    results = []
+    if n == 0:
+        return results
+
+    effect_rate = effect_counts / n
+    causes, effects = np.nonzero(co >= min_support)
+    for a, b in zip(causes.tolist(), effects.tolist()):
+        if lag_days == 0 and a == b:
+            continue
+        if lag_days == 0 and _family(vocab[a]) == _family(vocab[b]):
+            continue
+        both = int(co[a, b])
+        confidence = both / cause_counts[a]
+        lift = confidence / effect_rate[b] if effect_rate[b] else 0.0
+        if lift < min_lift or confidence < min_confidence:
+            continue
+        results.append({
+            "cause": vocab[a],
+            "effect": vocab[b],
+            "lag_days": lag_days,
+            "occurrences": both,
+            "total": int(cause_counts[a]),
+            "support": round(both / n, 3),
+            "confidence": round(confidence * 100),
+            "lift": round(float(lift), 2),
+        })
+    return results
+
+
+def mine_associations(
+    feature_lists: list[list[str]],
+    dates: list[str],
+    min_support: int = 3,
+    min_lift: float = 1.2,
+    min_confidence: float = 0.3,
+    limit: int = 20,
+) -> list[dict]:
+    """
+    Strongest cause → effect associations, same-day and next-day.
+
+    min_support is the minimum number of co-occurrences (entries for same-day,
+    day pairs for next-day); min_confidence is P(effect | cause) as a
+    fraction and min_lift is P(effect | cause) / P(effect).
+    """
+    if not feature_lists:
+        return []
+
+    matrix, vocab = incidence_matrix(feature_lists)
+
+    # Same day, entry level: one co-occurrence product for every pair at once
+    co = (matrix.T @ matrix).toarray()
+    same_day = _associations(
+        co, np.diag(co), np.diag(co), matrix.shape[0], vocab,
+        lag_days=0, min_support=min_support, min_lift=min_lift, min_confidence=min_confidence,
+    )
+
+    # Next day: day t features against day t+1 features, over consecutive days only
+    day_matrix, days = _day_matrix(matrix, dates)
+    consecutive = np.nonzero(np.diff(days) == 1)[0]
+    lagged = []
+    if consecutive.size:
+        today = day_matrix[consecutive]
+        tomorrow = day_matrix[consecutive + 1]
+        lag_co = (today.T @ tomorrow).toarray()
+        lagged = _associations(
+            lag_co,
+            np.asarray(today.sum(axis=0)).ravel(),
+            np.asarray(tomorrow.sum(axis=0)).ravel(),
+            consecutive.size, vocab,
+            lag_days=1, min_support=min_support, min_lift=min_lift, min_confidence=min_confidence,
+        )
+
+    results = same_day + lagged
+    results.sort(key=lambda r: (r["lift"], r["occurrences"]), reverse=True)
+    return results[:limit]
@@ -0,0 +1,245 @@
+"""
+Online next-day symptom risk — one tiny logistic regression per user and target.
+
+Every confirmed entry is one day of inputs (sleep, stress, mood, exercise,
+alcohol/caffeine, today's symptoms, plus yesterday's sleep/stress/headache
+as lagged inputs). When the entry for the following calendar day arrives,
+its symptoms are the outcome: each target's weights take one SGD step on
+(yesterday's inputs → today's outcome). That is O(features) per entry, and
+the whole model is about a kilobyte of JSON kept in the user's
+aggregates row, so /patterns only evaluates a dot product per target.
+
+State is a plain dict (it is stored as JSON):
+
+    {"day": "2026-01-14",            # last entry's date
+     "x": [...],                     # that day's inputs (what tomorrow is predicted from)
+     "targets": {"headache": {"w": [...], "n": 41, "pos": 9}, ...},
+     "entries": {"<entry id>": [...], ...},  # the last day's entries and their inputs
+     "before": {"day", "x", "targets"}}      # the state before the last day was learned
+
+A day's inputs are the element-wise max over its entries. Keeping the last
+day's entries and the state before it means an edit, a second entry or a
+removal on the last day is exact: the day is undone and learned again.
+Anything older can't be changed online — an entry before the last day, an
+edit or removal of an earlier day — so the state is marked "stale" and
+left for fit(), which replays the whole history in date order and is what
+rebuilds and the nightly batch use.
+"""
+import math
+from datetime import date, timedelta
+
+TARGETS = {"headache": "Headache", "fatigue": "Fatigue", "bad_mood": "Bad mood"}
+
+# (name, label shown as a driver, tip when it drives a risk up)
+DAY_FEATURES = (
+    ("low_sleep", "Short sleep", "An early night should help."),
+    ("sleep_debt", "Sleep debt", "An early night should help."),
+    ("high_stress", "High stress", "Make some time to wind down this evening."),
+    ("low_stress", "Low stress", None),
+    ("exercise", "Exercise", None),
+    ("good_mood", "Good mood", None),
+    ("bad_mood", "Bad mood", "Something you enjoy this evening may help."),
+    ("headache", "Headache today", "Rest and stay hydrated."),
+    ("fatigue", "Fatigue today", "Take it easy and rest where you can."),
+    ("alcohol", "Alcohol", "Skipping alcohol tonight may help."),
+    ("caffeine", "Caffeine", "Go easy on caffeine, especially late in the day."),
+)
+LAGGED = (
+    ("low_sleep", "Short sleep two nights running", "An early night should help."),
+    ("high_stress", "High stress two days running", "Make some time to wind down this evening."),
+    ("headache", "Headache two days running", "Rest and stay hydrated."),
+)
+N_DAY = len(DAY_FEATURES)
+N_INPUTS = 1 + N_DAY + len(LAGGED)   # bias first
+
+_INDEX = {name: i for i, (name, _, _) in enumerate(DAY_FEATURES)}
+_LAG_INDEX = [_INDEX[name] for name, _, _ in LAGGED]
+_TARGET_INDEX = [(target, _INDEX[target]) for target in TARGETS]
+_DRIVERS = [(label, tip) for _, label, tip in DAY_FEATURES + LAGGED]
+
+ALCOHOL = ("wine", "beer", "alcohol", "cocktail", "whisky", "vodka", "cider", "champagne", "prosecco")
+CAFFEINE = ("coffee", "espresso", "latte", "cappuccino", "energy drink")
+
+ETA = 0.2            # initial learning rate, decays as 1/sqrt(updates)
+DECAY = 0.1
+L2 = 0.02            # shrinks non-bias weights towards 0 every step
+PRIOR = 0.2          # starting probability for every target
+MIN_EXAMPLES = 14    # next-day pairs before a target is forecast
+SCALE = 10_000       # weights and inputs are stored to 4 decimal places
+
+
+def _q(v: float) -> float:
+    return round(v * SCALE) / SCALE  # round(v, 4) gives the same double, ~3x slower
+
+
+def _logit(p: float) -> float:
+    return math.log(p / (1 - p))
+
+
+def _sigmoid(z: float) -> float:
+    if z < -30:
+        return 0.0
+    if z > 30:
+        return 1.0
+    return 1 / (1 + math.exp(-z))
+
+
+def empty() -> dict:
+    bias = _q(_logit(PRIOR))
+    return {
+        "day": None,
+        "x": [0.0] * (N_INPUTS - 1),
+        "targets": {t: {"w": [bias] + [0.0] * (N_INPUTS - 1), "n": 0, "pos": 0} for t in TARGETS},
+        "entries": {},
+        "before": None,
+    }
+
+
+def _mentions(foods: str, words: tuple[str, ...]) -> float:
+    return 1.0 if any(w in foods for w in words) else 0.0
+
+
+def day_features(d: dict) -> list[float]:
+    """One day's inputs from an entry's extracted_json, in DAY_FEATURES order."""
+    hours = d.get("sleep_hours")
+    try:
+        hours = float(hours) if hours is not None else None
+    except (TypeError, ValueError):
+        hours = None
+    symptoms = {s.lower() for s in d.get("symptoms") or () if isinstance(s, str)}
+    foods = " ".join(f for f in d.get("food") or () if isinstance(f, str)).lower()
+    stress, mood = d.get("stress"), d.get("mood")
+    return [
+        1.0 if d.get("sleep") == "low" or (hours is not None and hours < 6) else 0.0,
+        _q(min(max(7 - hours, 0) / 3, 1.0)) if hours is not None else 0.0,
+        1.0 if stress == "high" else 0.0,
+        1.0 if stress == "low" else 0.0,
+        1.0 if d.get("exercise") else 0.0,
+        1.0 if mood == "good" else 0.0,
+        1.0 if mood == "bad" else 0.0,
+        1.0 if "headache" in symptoms else 0.0,
+        1.0 if "fatigue" in symptoms else 0.0,
+        _mentions(foods, ALCOHOL),
+        _mentions(foods, CAFFEINE),
+    ]
+
+
+def _step(model: dict, inputs: list[tuple[int, float]], y: float):
+    # Only inputs that are on move (and are shrunk by L2) — a day has a handful
+    w = model["w"]
+    p = _sigmoid(sum([w[i] * v for i, v in inputs]))
+    eta = ETA / math.sqrt(1 + DECAY * model["n"])
+    step, shrink = eta * (p - y), 1 - eta * L2
+    w[0] = _q(w[0] - step)
+    for i, v in inputs[1:]:
+        w[i] = _q(w[i] * shrink - step * v)
+    model["n"] += 1
+    model["pos"] += int(y)
+
+
+def _snapshot(state: dict) -> dict:
+    targets = {t: {"w": list(m["w"]), "n": m["n"], "pos": m["pos"]} for t, m in state["targets"].items()}
+    return {"day": state["day"], "x": list(state["x"]), "targets": targets}
+
+
+def _learn_day(state: dict, day: str, today: list[float]) -> bool:
+    """Move state on to `day` with inputs `today`, stepping if it follows the state's last day."""
+    last = state["day"]
+    consecutive = last is not None and date.fromisoformat(day).toordinal() - date.fromisoformat(last).toordinal() == 1
+    if consecutive:
+        inputs = [(i, v) for i, v in enumerate([1.0] + state["x"]) if v]
+        for target, i in _TARGET_INDEX:
+            _step(state["targets"][target], inputs, today[i])
+        lagged = [state["x"][i] for i in _LAG_INDEX]
+    else:
+        lagged = [0.0] * len(LAGGED)
+
+    state["day"] = day
+    state["x"] = today + lagged
+    return consecutive
+
+
+def _relearn_last_day(state: dict) -> bool:
+    """Undo the last day and learn it again from its remaining entries (or leave it undone)."""
+    day = state["day"]
+    state.update(_snapshot(state["before"]))
+    if state["entries"]:
+        return _learn_day(state, day, [max(column) for column in zip(*state["entries"].values())])
+    state["entries"] = state["before"] = None  # the day now last was learned without keeping its entries
+    return False
+
+
+def update(state: dict, entry: dict) -> bool:
+    """Learn from one entry (id, date, extracted_json) in place. Returns whether a step was taken."""
+    day = str(entry["date"])[:10]
+    key = str(entry["id"])
+    today = day_features(entry.get("extracted_json") or {})
+    last = state["day"]
+
+    if last is not None and day < last:
+        state["stale"] = True  # out of order — fit() picks it up on the next rebuild
+        return False
+    if day == last:
+        if state.get("entries") is None or state.get("before") is None:
+            state["stale"] = True
+            return False
+        state["entries"][key] = today  # a second entry for the day, or an edit of one
+        return _relearn_last_day(state)
+
+    state["before"] = _snapshot(state)
+    state["entries"] = {key: today}
+    return _learn_day(state, day, today)
+
+
+def remove(state: dict, entry: dict):
+    """Forget one entry (id, date) in place — exactly on the last day, else by marking the state stale."""
+    entries = state.get("entries")
+    key = str(entry["id"])
+    if str(entry["date"])[:10] != state["day"] or not entries or key not in entries or state.get("before") is None:
+        state["stale"] = True
+        return
+    del entries[key]
+    _relearn_last_day(state)
+
+
+def fit(entries: list[dict]) -> dict:
+    """A fresh state trained on a whole history, replayed in date order."""
+    state = empty()
+    for entry in sorted(entries, key=lambda e: (str(e["date"])[:10], e["id"])):
+        update(state, entry)
+    return state
+
+
+def predict(state: dict) -> dict[str, float]:
+    """P(target on the day after state's last day), for every target."""
+    x = [1.0] + state["x"]
+    return {t: _sigmoid(sum(wi * xi for wi, xi in zip(m["w"], x))) for t, m in state["targets"].items()}
+
+
+def forecast(state: dict | None, min_examples: int = MIN_EXAMPLES) -> dict | None:
+    """Tomorrow's risk per target with enough history, plus what drives it, or None."""
+    if not state or state.get("day") is None:
+        return None
+    x = [1.0] + state["x"]
+    probabilities = predict(state)
+    targets = []
+    for target, model in state["targets"].items():
+        if model["n"] < min_examples:
+            continue
+        contributions = sorted(
+            ((model["w"][i] * x[i], i) for i in range(1, N_INPUTS) if x[i]), reverse=True,
+        )
+        drivers = [i for c, i in contributions[:3] if c >= 0.1]
+        targets.append({
+            "target": target,
+            "label": TARGETS[target],
+            "probability": round(probabilities[target], 2),
+            "usual": round(model["pos"] / model["n"], 2),
+            "examples": model["n"],
+            "drivers": [_DRIVERS[i - 1][0] for i in drivers],
+            "tip": next((_DRIVERS[i - 1][1] for i in drivers if _DRIVERS[i - 1][1]), None),
+        })
+    if not targets:
+        return None
+    for_date = date.fromisoformat(state["day"]) + timedelta(days=1)
+    return {"for_date": for_date.isoformat(), "based_on": state["day"], "targets": targets}
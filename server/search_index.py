@@ -0,0 +1,333 @@
+"""
+Per-user full-text search over entries' raw_text.
+
+An inverted index in a local SQLite file (shared by workers on the host):
+one posting row per (user, stemmed term, entry) with the term frequency and
+token positions, clustered on (user_id, term) so a lookup or a prefix range
+only ever reads that user's postings. Ranking is BM25 with each user's own
+document statistics.
+
+Query syntax:
+    migraine wine        any of the words, best BM25 matches first
+    migr*                prefix — every indexed term starting with "migr"
+    "red wine"           phrase — must appear, words adjacent and in order
+
+The index is updated as entries are saved or confirmed; a user who has never
+been indexed is built from their history on first search.
+"""
+import re
+import json
+import html
+import math
+import heapq
+import sqlite3
+import threading
+import unicodedata
+
+K1 = 1.2
+B = 0.75
+SNIPPET_WORDS = 24
+
+WORD_RE = re.compile(r"\w+(?:'\w+)*")
+QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "had", "has", "have",
+    "i", "i'm", "if", "in", "into", "is", "it", "its", "me", "my", "of", "on", "or", "so", "that",
+    "the", "then", "there", "this", "to", "was", "were", "with",
+}
+
+VOWELS = set("aeiouy")
+
+
+def _has_vowel(s: str) -> bool:
+    return any(c in VOWELS for c in s)
+
+
+def stem(word: str) -> str:
+    """A small Porter-style suffix stripper — enough to fold plurals and verb forms."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+
+    # Plurals
+    if word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("ies"):
+        word = word[:-3] + "y"
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+
+    # -ed / -ing
+    for suffix in ("ing", "ed"):
+        if word.endswith(suffix) and _has_vowel(word[:-len(suffix)]) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            if word.endswith(("at", "bl", "iz")):
+                word += "e"
+            elif len(word) > 3 and word[-1] == word[-2] and word[-1] not in "lsz":
+                word = word[:-1]
+            break
+
+    # Common derivational endings
+    for suffix in ("fulness", "ousness", "iveness", "ness", "ful", "ly"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            word = word[:-len(suffix)]
+            break
+
+    # Final -y / -e
+    if word.endswith("y") and len(word) > 4 and _has_vowel(word[:-1]):
+        word = word[:-1] + "i"
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[tuple[str, int, int, int]]:
+    """(term, position, start, end) for every indexable word; positions count stopwords too."""
+    text = unicodedata.normalize("NFKC", text)
+    tokens = []
+    for position, match in enumerate(WORD_RE.finditer(text)):
+        word = match.group().casefold()
+        if word in STOPWORDS:
+            continue
+        tokens.append((stem(word), position, match.start(), match.end()))
+    return tokens
+
+
+def parse_query(q: str) -> tuple[list[str], list[str], list[list[tuple[str, int]]]]:
+    """(terms, prefixes, phrases) — phrases are [(term, offset)] relative to the first word."""
+    terms, prefixes, phrases = [], [], []
+    for match in QUERY_RE.finditer(q):
+        phrase, word = match.groups()
+        if phrase is not None:
+            tokens = tokenize(phrase)
+            if len(tokens) == 1:
+                terms.append(tokens[0][0])
+            elif tokens:
+                first = tokens[0][1]
+                phrases.append([(t, p - first) for t, p, _, _ in tokens])
+        elif word.endswith("*") and len(word) > 1:
+            prefix = word.rstrip("*").casefold()
+            if prefix:
+                prefixes.append(prefix)
+        else:
+            terms += [t for t, _, _, _ in tokenize(word)]
+    return terms, prefixes, phrases
+
+
+class SearchIndex:
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            "  user_id TEXT NOT NULL,"
+            "  entry_id TEXT NOT NULL,"
+            "  date TEXT NOT NULL,"
+            "  length INTEGER NOT NULL,"
+            "  text TEXT NOT NULL,"
+            "  PRIMARY KEY (user_id, entry_id)"
+            ") WITHOUT ROWID"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "  user_id TEXT NOT NULL,"
+            "  term TEXT NOT NULL,"
+            "  entry_id TEXT NOT NULL,"
+            "  tf INTEGER NOT NULL,"
+            "  positions TEXT NOT NULL,"
+            "  PRIMARY KEY (user_id, term, entry_id)"
+            ") WITHOUT ROWID"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS postings_entry ON postings (user_id, entry_id)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS indexed_users (user_id TEXT PRIMARY KEY)")
+
+    # ── Writes ────────────────────────────────────────────────────────────────
+    def _remove(self, user_id: str, entry_id: str):
+        self._db.execute("DELETE FROM postings WHERE user_id = ? AND entry_id = ?", (user_id, entry_id))
+        self._db.execute("DELETE FROM docs WHERE user_id = ? AND entry_id = ?", (user_id, entry_id))
+
+    def add(self, rows: list[dict]):
+        """(Re)index entries — rows with id, user_id, date and raw_text."""
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                for row in rows:
+                    text = row.get("raw_text") or ""
+                    self._remove(row["user_id"], row["id"])
+                    postings: dict[str, list[int]] = {}
+                    tokens = tokenize(text)
+                    for term, position, _, _ in tokens:
+                        postings.setdefault(term, []).append(position)
+                    self._db.execute(
+                        "INSERT INTO docs (user_id, entry_id, date, length, text) VALUES (?, ?, ?, ?, ?)",
+                        (row["user_id"], row["id"], row["date"], len(tokens), text),
+                    )
+                    self._db.executemany(
+                        "INSERT INTO postings (user_id, term, entry_id, tf, positions) VALUES (?, ?, ?, ?, ?)",
+                        [
+                            (row["user_id"], term, row["id"], len(positions), json.dumps(positions))
+                            for term, positions in postings.items()
+                        ],
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def remove(self, user_id: str, entry_id: str):
+        with self._lock:
+            self._remove(user_id, entry_id)
+
+    def is_indexed(self, user_id: str) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM indexed_users WHERE user_id = ?", (user_id,)).fetchone() is not None
+
+    def mark_indexed(self, user_id: str, indexed: bool = True):
+        with self._lock:
+            if indexed:
+                self._db.execute("INSERT OR IGNORE INTO indexed_users (user_id) VALUES (?)", (user_id,))
+            else:
+                self._db.execute("DELETE FROM indexed_users WHERE user_id = ?", (user_id,))
+
+    # ── Search ────────────────────────────────────────────────────────────────
+    def _postings(self, user_id: str, term: str) -> dict[str, tuple[int, int]]:
+        """entry_id -> (tf, doc length) for one term."""
+        rows = self._db.execute(
+            "SELECT p.entry_id, p.tf, d.length FROM postings p"
+            " JOIN docs d ON d.user_id = p.user_id AND d.entry_id = p.entry_id"
+            " WHERE p.user_id = ? AND p.term = ?",
+            (user_id, term),
+        ).fetchall()
+        return {r[0]: r[1:] for r in rows}
+
+    def _positions(self, user_id: str, term: str) -> dict[str, str]:
+        rows = self._db.execute(
+            "SELECT entry_id, positions FROM postings WHERE user_id = ? AND term = ?", (user_id, term)
+        ).fetchall()
+        return dict(rows)
+
+    def _prefix_terms(self, user_id: str, prefix: str) -> list[str]:
+        starts = {prefix, stem(prefix)}
+        terms = set()
+        for start in starts:
+            rows = self._db.execute(
+                "SELECT DISTINCT term FROM postings WHERE user_id = ? AND term >= ? AND term < ?",
+                (user_id, start, start + "\U0010ffff"),
+            ).fetchall()
+            terms.update(r[0] for r in rows)
+        return sorted(terms)
+
+    def _phrase_matches(self, user_id: str, phrase: list[tuple[str, int]]) -> set[str]:
+        lists = [(self._positions(user_id, term), offset) for term, offset in phrase]
+        candidates = set.intersection(*(set(positions) for positions, _ in lists))
+        matched = set()
+        for entry_id in candidates:
+            first_positions, first_offset = lists[0]
+            starts = {p - first_offset for p in json.loads(first_positions[entry_id])}
+            for positions, offset in lists[1:]:
+                starts &= {p - offset for p in json.loads(positions[entry_id])}
+                if not starts:
+                    break
+            if starts:
+                matched.add(entry_id)
+        return matched
+
+    def search(self, user_id: str, q: str, limit: int = 20, offset: int = 0) -> dict:
+        terms, prefixes, phrases = parse_query(q)
+        with self._lock:
+            n_docs, total_length = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if n_docs == 0 or not (terms or prefixes or phrases):
+                return {"total": 0, "results": []}
+            avg_length = total_length / n_docs
+
+            scoring = list(dict.fromkeys(terms))
+            for prefix in prefixes:
+                scoring += [t for t in self._prefix_terms(user_id, prefix) if t not in scoring]
+            for phrase in phrases:
+                scoring += [t for t, _ in phrase if t not in scoring]
+
+            required = None
+            for phrase in phrases:
+                hits = self._phrase_matches(user_id, phrase)
+                required = hits if required is None else required & hits
+
+            postings = {term: self._postings(user_id, term) for term in scoring}
+            candidates = set().union(*(set(p) for p in postings.values())) if postings else set()
+            if required is not None:
+                candidates &= required
+            if not candidates:
+                return {"total": 0, "results": []}
+
+            scores = dict.fromkeys(candidates, 0.0)
+            for term, term_postings in postings.items():
+                df = len(term_postings)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for entry_id, (tf, length) in term_postings.items():
+                    if entry_id in scores:
+                        norm = K1 * (1 - B + B * length / avg_length)
+                        scores[entry_id] += idf * tf * (K1 + 1) / (tf + norm)
+
+            ranked = heapq.nsmallest(offset + limit, scores.items(), key=lambda kv: (-kv[1], kv[0]))
+            page = ranked[offset:]
+            docs = {}
+            if page:
+                placeholders = ", ".join("?" * len(page))
+                docs = {
+                    r[0]: r[1:]
+                    for r in self._db.execute(
+                        f"SELECT entry_id, date, text FROM docs WHERE user_id = ? AND entry_id IN ({placeholders})",
+                        (user_id, *(entry_id for entry_id, _ in page)),
+                    ).fetchall()
+                }
+
+        highlight = set(scoring)
+        results = []
+        for entry_id, score in page:
+            entry_date, text = docs[entry_id]
+            results.append({
+                "entry_id": entry_id,
+                "date": entry_date,
+                "score": round(score, 4),
+                "snippet": snippet(text, highlight),
+            })
+        return {"total": len(scores), "results": results}
+
+    def close(self):
+        self._db.close()
+
+
+def snippet(text: str, terms: set[str], words: int = SNIPPET_WORDS) -> str:
+    """HTML-escaped window of the text around the densest run of matches, matches in <mark>."""
+    spans = [m.span() for m in WORD_RE.finditer(text)]
+    hits = [i for i, (a, b) in enumerate(spans) if stem(text[a:b].casefold()) in terms]
+    if not spans:
+        return ""
+
+    start = 0
+    if hits and len(spans) > words:
+        best = max(range(len(hits)), key=lambda i: sum(1 for h in hits[i:] if h < hits[i] + words))
+        start = max(0, min(hits[best] - words // 4, len(spans) - words))
+    end = min(len(spans), start + words)
+
+    marked = set(hits)
+    out = []
+    cursor = spans[start][0] if start > 0 else 0
+    for i in range(start, end):
+        a, b = spans[i]
+        out.append(html.escape(text[cursor:a]))
+        word = html.escape(text[a:b])
+        out.append(f"<mark>{word}</mark>" if i in marked else word)
+        cursor = b
+    if end == len(spans):
+        out.append(html.escape(text[cursor:]))
+    body = "".join(out).strip()
+    if start > 0:
+        body = "…" + body
+    if end < len(spans):
+        body += "…"
+    return body
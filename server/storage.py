@@ -0,0 +1,974 @@
+"""
+Storage backends for entries, per-user aggregates and condition metric series.
+
+main.py talks to a `Storage` — one method per query the endpoints issue —
+so the same app can run against:
+
+  • SupabaseStorage  — PostgREST over HTTP (the default; what prod uses).
+  • SQLiteStorage    — a local file; no network at all, good for dev and
+                       offline benchmarks.
+  • PostgresStorage  — direct SQL over a pooled asyncpg connection, for
+                       running co-located with the database.
+
+The two SQL backends share their queries (written with `?` placeholders).
+Both reuse prepared statements — sqlite3's statement cache and asyncpg's
+per-connection cache — and create the (user_id, status, date, id) index
+every user-scoped read is served from.
+
+Pick one with STORAGE_BACKEND=supabase|sqlite|postgres (see open_storage).
+"""
+import os
+import json
+import uuid
+import asyncio
+import sqlite3
+import threading
+from datetime import date, datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+from timeseries import daily_rollup
+
+try:
+    import asyncpg  # optional — only needed for STORAGE_BACKEND=postgres
+except ImportError:
+    asyncpg = None
+
+# tags/mood/sleep/stress are denormalized from extracted_json at write time (main._derived_columns)
+ENTRY_COLUMNS = (
+    "id", "user_id", "date", "raw_text", "extracted_json", "status", "created_at",
+    "tags", "mood", "sleep", "stress",
+)
+ENTRY_WRITE_COLUMNS = ("id", "user_id", "date", "raw_text", "extracted_json", "status", "tags", "mood", "sleep", "stress")
+
+
+def _columns(columns) -> list[str]:
+    if isinstance(columns, str):
+        columns = [c.strip() for c in columns.split(",")]
+    unknown = [c for c in columns if c not in ENTRY_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown entry columns: {', '.join(unknown)}")
+    return list(columns)
+
+
+class Storage:
+    """Queries the API issues. Entry rows are plain dicts; dates are 'YYYY-MM-DD' strings."""
+
+    name = "storage"
+
+    async def ping(self):
+        raise NotImplementedError
+
+    async def insert_entries(self, rows: list[dict]) -> list[dict]:
+        """Insert rows and return them as stored (with ids)."""
+        raise NotImplementedError
+
+    async def get_entry(self, entry_id: str, columns=ENTRY_COLUMNS) -> dict | None:
+        raise NotImplementedError
+
+    async def update_entry(self, entry_id: str, values: dict, expect_status: str | None = None) -> dict | None:
+        """Update one entry (only if its status is `expect_status`, when given). Returns the row or None."""
+        raise NotImplementedError
+
+    async def list_entries(
+        self,
+        user_id: str,
+        columns,
+        start: str | None = None,
+        end: str | None = None,
+        before: tuple[str, str] | None = None,
+        limit: int | None = None,
+        tag: str | None = None,
+        mood: str | None = None,
+    ) -> list[dict]:
+        """
+        Confirmed entries newest first (date desc, id desc), optionally in
+        [start, end], after a keyset, carrying `tag` and/or with `mood`.
+        """
+        raise NotImplementedError
+
+    async def history(self, user_id: str, columns="id, date, extracted_json", limit: int | None = None) -> list[dict]:
+        """Confirmed entries oldest first — all of them, or the most recent `limit`."""
+        raise NotImplementedError
+
+    async def history_page(
+        self, user_id: str, columns, limit: int, after: tuple[str, str] | None = None,
+    ) -> list[dict]:
+        """Up to `limit` confirmed entries oldest first, continuing after a (date, id) keyset — for exports."""
+        raise NotImplementedError
+
+    async def entries_on(self, user_id: str, day: str, columns=ENTRY_COLUMNS) -> list[dict]:
+        """A user's entries dated `day`, any status, oldest id first — for one-entry-per-day saves."""
+        raise NotImplementedError
+
+    async def entries_missing(self, column: str, columns, limit: int) -> list[dict]:
+        """Up to `limit` entries (any user or status) where `column` is null — for backfills."""
+        raise NotImplementedError
+
+    async def confirmed_page(
+        self,
+        limit: int,
+        after: tuple[str, str, str] | None = None,
+        after_user: str | None = None,
+        columns="user_id, id, date, extracted_json",
+    ) -> list[dict]:
+        """
+        Confirmed entries of every user in (user_id, date, id) order — for batch
+        jobs. Continues after a (user_id, date, id) keyset, or after every entry
+        of `after_user`. May return fewer than `limit` rows before the end.
+        """
+        raise NotImplementedError
+
+    async def confirmed_counts(self, limit: int, after_user: str | None = None) -> list[tuple[str, int]]:
+        """(user_id, confirmed entries) for the next `limit` users after `after_user`, in user_id order."""
+        raise NotImplementedError
+
+    async def get_aggregates(self, user_id: str) -> dict | None:
+        raise NotImplementedError
+
+    async def save_aggregates(self, user_id: str, aggregates: dict):
+        raise NotImplementedError
+
+    async def aggregates_many(self, user_ids: list[str]) -> dict[str, dict]:
+        """user_id → {"aggregates", "updated_at" (ISO string)} for the users that have a row."""
+        raise NotImplementedError
+
+    async def save_aggregates_many(self, rows: list[tuple[str, dict]], read_at: datetime) -> list[str]:
+        """
+        Upsert several users' aggregates computed from data read at `read_at`.
+        Rows updated since then (a write landed mid-batch) are left alone where
+        the backend can check that atomically. Returns the user_ids written.
+        """
+        raise NotImplementedError
+
+    async def delete_aggregates(self, user_id: str):
+        raise NotImplementedError
+
+    # Condition metric series — points are {metric, date, seq, value, band}, see timeseries.py
+    async def replace_metric_points(self, user_id: str, entry_id: str, points: list[dict]):
+        """Swap one entry's points and refresh the daily rollups of every day it touched."""
+        raise NotImplementedError
+
+    async def rebuild_metrics(self, user_id: str, points: list[dict]):
+        """Replace all of a user's points (each with entry_id) and recompute their daily rollups."""
+        raise NotImplementedError
+
+    async def metric_points(self, user_id: str, metric: str, start: str | None = None, end: str | None = None) -> list[dict]:
+        """Readings (date, value, band) oldest first."""
+        raise NotImplementedError
+
+    async def metric_days(self, user_id: str, metric: str, start: str | None = None, end: str | None = None) -> list[dict]:
+        """Daily rollups (date, count, sum, min, max, above, below) oldest first."""
+        raise NotImplementedError
+
+    async def metrics_built(self, user_id: str) -> bool:
+        raise NotImplementedError
+
+    async def mark_metrics_built(self, user_id: str, built: bool = True):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# Supabase (PostgREST over HTTP)
+# ═════════════════════════════════════════════════════════════════════════════
+class SupabaseStorage(Storage):
+    name = "supabase"
+    PAGE_SIZE = 1000  # PostgREST's default max rows per request
+
+    def __init__(self, client=None, pool_size: int = 8, connect=None):
+        # Either a ready client or connect() -> client, called on first use
+        self._client = client
+        self._connect = connect
+        self._client_lock = threading.Lock()
+        # supabase-py is synchronous — run its HTTP calls on a bounded pool so one slow
+        # query never blocks the event loop (and can't spawn unbounded threads either).
+        self._pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="supabase")
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._connect()
+        return self._client
+
+    async def _execute(self, query):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, query.execute)
+
+    def _entries(self):
+        return self.client.table("entries")
+
+    async def ping(self):
+        if self._client is None:  # build the client (and import supabase) on the pool, not the event loop
+            await asyncio.get_running_loop().run_in_executor(self._pool, lambda: self.client)
+        await self._execute(self._entries().select("id").limit(1))
+
+    async def insert_entries(self, rows: list[dict]) -> list[dict]:
+        return (await self._execute(self._entries().insert(rows))).data
+
+    async def get_entry(self, entry_id: str, columns=ENTRY_COLUMNS) -> dict | None:
+        response = await self._execute(self._entries().select(", ".join(_columns(columns))).eq("id", entry_id))
+        return response.data[0] if response.data else None
+
+    async def update_entry(self, entry_id: str, values: dict, expect_status: str | None = None) -> dict | None:
+        query = self._entries().update(values).eq("id", entry_id)
+        if expect_status is not None:
+            query = query.eq("status", expect_status)
+        response = await self._execute(query)
+        return response.data[0] if response.data else None
+
+    async def list_entries(
+        self, user_id, columns, start=None, end=None, before=None, limit=None, tag=None, mood=None,
+    ) -> list[dict]:
+        query = (
+            self._entries()
+            .select(", ".join(_columns(columns)))
+            .eq("user_id", user_id)
+            .eq("status", "confirmed")
+            .order("date", desc=True)
+            .order("id", desc=True)
+        )
+        if start:
+            query = query.gte("date", start)
+        if end:
+            query = query.lte("date", end)
+        if tag:
+            query = query.contains("tags", [tag])
+        if mood:
+            query = query.eq("mood", mood)
+        if before:
+            before_date, before_id = before
+            query = query.or_(f'date.lt.{before_date},and(date.eq.{before_date},id.lt."{before_id}")')
+        if limit is not None:
+            query = query.limit(limit)
+        return (await self._execute(query)).data
+
+    async def history(self, user_id, columns="id, date, extracted_json", limit=None) -> list[dict]:
+        columns = ", ".join(_columns(columns))
+        if limit is not None:
+            response = await self._execute(
+                self._entries().select(columns).eq("user_id", user_id).eq("status", "confirmed")
+                .order("date", desc=True).order("id", desc=True).limit(limit)
+            )
+            return response.data[::-1]
+
+        # Page past the PostgREST row cap; id breaks date ties so pages neither skip nor repeat rows
+        return await self._select_all(
+            lambda: self._entries().select(columns).eq("user_id", user_id).eq("status", "confirmed").order("date").order("id")
+        )
+
+    async def history_page(self, user_id, columns, limit, after=None) -> list[dict]:
+        query = (
+            self._entries().select(", ".join(_columns(columns))).eq("user_id", user_id).eq("status", "confirmed")
+            .order("date").order("id").limit(min(limit, self.PAGE_SIZE))
+        )
+        if after:
+            after_date, after_id = after
+            query = query.or_(f'date.gt.{after_date},and(date.eq.{after_date},id.gt."{after_id}")')
+        return (await self._execute(query)).data
+
+    async def entries_on(self, user_id, day, columns=ENTRY_COLUMNS) -> list[dict]:
+        query = self._entries().select(", ".join(_columns(columns))).eq("user_id", user_id).eq("date", day).order("id")
+        return (await self._execute(query)).data
+
+    async def entries_missing(self, column: str, columns, limit: int) -> list[dict]:
+        response = await self._execute(
+            self._entries().select(", ".join(_columns(columns))).is_(_columns([column])[0], "null").limit(limit)
+        )
+        return response.data
+
+    async def confirmed_page(self, limit, after=None, after_user=None, columns="user_id, id, date, extracted_json"):
+        query = (
+            self._entries().select(", ".join(_columns(columns))).eq("status", "confirmed")
+            .order("user_id").order("date").order("id").limit(limit)
+        )
+        if after:
+            user_id, day, entry_id = after
+            query = query.or_(
+                f'user_id.gt."{user_id}",and(user_id.eq."{user_id}",date.gt.{day}),'
+                f'and(user_id.eq."{user_id}",date.eq.{day},id.gt."{entry_id}")'
+            )
+        elif after_user:
+            query = query.gt("user_id", after_user)
+        return (await self._execute(query)).data
+
+    async def confirmed_counts(self, limit, after_user=None) -> list[tuple[str, int]]:
+        # No GROUP BY over PostgREST — count (user_id, date, id) pages until `limit` users are complete
+        counts: dict[str, int] = {}
+        after = None
+        while len(counts) <= limit:
+            page = await self.confirmed_page(self.PAGE_SIZE, after=after, after_user=after_user, columns="user_id, date, id")
+            if not page:
+                return list(counts.items())
+            for row in page:
+                counts[row["user_id"]] = counts.get(row["user_id"], 0) + 1
+            after = (page[-1]["user_id"], page[-1]["date"], page[-1]["id"])
+        return list(counts.items())[:limit]  # all but the last user seen are complete
+
+    async def get_aggregates(self, user_id: str) -> dict | None:
+        response = await self._execute(
+            self.client.table("user_aggregates").select("aggregates").eq("user_id", user_id).limit(1)
+        )
+        return response.data[0]["aggregates"] if response.data else None
+
+    async def save_aggregates(self, user_id: str, aggregates: dict):
+        await self._execute(self.client.table("user_aggregates").upsert(
+            {"user_id": user_id, "aggregates": aggregates, "updated_at": datetime.now(timezone.utc).isoformat()},
+            on_conflict="user_id",
+        ))
+
+    async def aggregates_many(self, user_ids: list[str]) -> dict[str, dict]:
+        response = await self._execute(
+            self.client.table("user_aggregates").select("user_id, aggregates, updated_at").in_("user_id", user_ids)
+        )
+        return {r["user_id"]: r for r in response.data}
+
+    async def save_aggregates_many(self, rows: list[tuple[str, dict]], read_at: datetime) -> list[str]:
+        # PostgREST upserts can't be conditional: callers compare updated_at from
+        # aggregates_many first, and a write landing in between is overwritten
+        # (it's repaired by the next update or batch run).
+        now = datetime.now(timezone.utc).isoformat()
+        payload = [{"user_id": user_id, "aggregates": agg, "updated_at": now} for user_id, agg in rows]
+        await self._execute(self.client.table("user_aggregates").upsert(payload, on_conflict="user_id"))
+        return [user_id for user_id, _ in rows]
+
+    async def delete_aggregates(self, user_id: str):
+        await self._execute(self.client.table("user_aggregates").delete().eq("user_id", user_id))
+
+    async def _insert_chunked(self, table: str, rows: list[dict]):
+        for i in range(0, len(rows), self.PAGE_SIZE):
+            await self._execute(self.client.table(table).insert(rows[i:i + self.PAGE_SIZE]))
+
+    async def _select_all(self, query_for_page) -> list[dict]:
+        rows = []
+        offset = 0
+        while True:
+            response = await self._execute(query_for_page().range(offset, offset + self.PAGE_SIZE - 1))
+            rows += response.data
+            if len(response.data) < self.PAGE_SIZE:
+                return rows
+            offset += self.PAGE_SIZE
+
+    async def _refresh_metric_day(self, user_id: str, metric: str, day: str):
+        points = (await self._execute(
+            self.client.table("metric_points").select("value, band")
+            .eq("user_id", user_id).eq("metric", metric).eq("date", day)
+        )).data
+        await self._execute(
+            self.client.table("metric_daily").delete().eq("user_id", user_id).eq("metric", metric).eq("date", day)
+        )
+        rollup = daily_rollup(points)
+        if rollup is not None:
+            await self._execute(self.client.table("metric_daily").insert(
+                {"user_id": user_id, "metric": metric, "date": day, **rollup}
+            ))
+
+    async def replace_metric_points(self, user_id: str, entry_id: str, points: list[dict]):
+        old = await self._execute(self.client.table("metric_points").delete().eq("entry_id", entry_id))
+        if points:
+            await self._execute(self.client.table("metric_points").insert(
+                [{"user_id": user_id, "entry_id": entry_id, **p} for p in points]
+            ))
+        days = {(r["metric"], r["date"]) for r in old.data} | {(p["metric"], p["date"]) for p in points}
+        for metric, day in sorted(days):
+            await self._refresh_metric_day(user_id, metric, day)
+
+    async def rebuild_metrics(self, user_id: str, points: list[dict]):
+        await self._execute(self.client.table("metric_points").delete().eq("user_id", user_id))
+        await self._execute(self.client.table("metric_daily").delete().eq("user_id", user_id))
+        await self._insert_chunked("metric_points", [{"user_id": user_id, **p} for p in points])
+
+        by_day: dict[tuple[str, str], list[dict]] = {}
+        for p in points:
+            by_day.setdefault((p["metric"], p["date"]), []).append(p)
+        await self._insert_chunked("metric_daily", [
+            {"user_id": user_id, "metric": metric, "date": day, **daily_rollup(day_points)}
+            for (metric, day), day_points in sorted(by_day.items())
+        ])
+
+    def _metric_query(self, table: str, columns: str, user_id: str, metric: str, start, end):
+        def query():
+            q = self.client.table(table).select(columns).eq("user_id", user_id).eq("metric", metric)
+            if start:
+                q = q.gte("date", start)
+            if end:
+                q = q.lte("date", end)
+            q = q.order("date")
+            return q.order("entry_id").order("seq") if table == "metric_points" else q
+        return query
+
+    async def metric_points(self, user_id, metric, start=None, end=None) -> list[dict]:
+        return await self._select_all(self._metric_query("metric_points", "date, value, band", user_id, metric, start, end))
+
+    async def metric_days(self, user_id, metric, start=None, end=None) -> list[dict]:
+        return await self._select_all(self._metric_query(
+            "metric_daily", "date, count, sum, min, max, above, below", user_id, metric, start, end
+        ))
+
+    async def metrics_built(self, user_id: str) -> bool:
+        response = await self._execute(self.client.table("metric_users").select("user_id").eq("user_id", user_id))
+        return bool(response.data)
+
+    async def mark_metrics_built(self, user_id: str, built: bool = True):
+        table = self.client.table("metric_users")
+        if built:
+            await self._execute(table.upsert(
+                {"user_id": user_id, "built_at": datetime.now(timezone.utc).isoformat()}, on_conflict="user_id"
+            ))
+        else:
+            await self._execute(table.delete().eq("user_id", user_id))
+
+    async def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# Direct SQL (shared by SQLite and Postgres)
+# ═════════════════════════════════════════════════════════════════════════════
+class SQLStorage(Storage):
+    """Queries in `?` placeholder style; subclasses run them and convert values."""
+
+    # ── Dialect hooks ─────────────────────────────────────────────────────────
+    async def _fetch(self, sql: str, *params) -> list[dict]:
+        raise NotImplementedError
+
+    async def _execute(self, sql: str, *params):
+        raise NotImplementedError
+
+    def _date(self, value: str):
+        return value
+
+    def _json(self, value):
+        return value
+
+    def _now(self):
+        return datetime.now(timezone.utc)
+
+    def _timestamp(self, value: datetime):
+        return value
+
+    def _tags(self, value):
+        return value
+
+    def _tag_filter(self, user_id: str, tag: str) -> tuple[str, list]:
+        """(SQL condition, params) matching entries that carry `tag`."""
+        raise NotImplementedError
+
+    # ── Queries ───────────────────────────────────────────────────────────────
+    async def ping(self):
+        await self._fetch("SELECT 1 AS ok")
+
+    def _write_value(self, column: str, value):
+        if column == "date":
+            return self._date(value)
+        if column == "extracted_json":
+            return self._json(value)
+        if column == "tags":
+            return self._tags(value)
+        return value
+
+    async def insert_entries(self, rows: list[dict]) -> list[dict]:
+        if not rows:
+            return []
+        columns = ENTRY_WRITE_COLUMNS
+        params = []
+        for row in rows:
+            row = {"id": str(uuid.uuid4()), **row}
+            params += [self._write_value(c, row.get(c)) for c in columns]
+        values = ", ".join(["(" + ", ".join("?" * len(columns)) + ")"] * len(rows))
+        return await self._fetch(
+            f"INSERT INTO entries ({', '.join(columns)}) VALUES {values} RETURNING *",
+            *params,
+        )
+
+    async def get_entry(self, entry_id: str, columns=ENTRY_COLUMNS) -> dict | None:
+        rows = await self._fetch(f"SELECT {', '.join(_columns(columns))} FROM entries WHERE id = ?", entry_id)
+        return rows[0] if rows else None
+
+    async def update_entry(self, entry_id: str, values: dict, expect_status: str | None = None) -> dict | None:
+        columns = _columns(list(values))
+        sql = f"UPDATE entries SET {', '.join(f'{c} = ?' for c in columns)} WHERE id = ?"
+        params = [self._write_value(c, values[c]) for c in columns] + [entry_id]
+        if expect_status is not None:
+            sql += " AND status = ?"
+            params.append(expect_status)
+        rows = await self._fetch(sql + " RETURNING *", *params)
+        return rows[0] if rows else None
+
+    async def list_entries(
+        self, user_id, columns, start=None, end=None, before=None, limit=None, tag=None, mood=None,
+    ) -> list[dict]:
+        sql = f"SELECT {', '.join(_columns(columns))} FROM entries WHERE user_id = ? AND status = 'confirmed'"
+        params = [user_id]
+        if tag:
+            condition, tag_params = self._tag_filter(user_id, tag)
+            sql += f" AND {condition}"
+            params += tag_params
+        if mood:
+            sql += " AND mood = ?"
+            params.append(mood)
+        if start:
+            sql += " AND date >= ?"
+            params.append(self._date(start))
+        if end:
+            sql += " AND date <= ?"
+            params.append(self._date(end))
+        if before:
+            before_date, before_id = before
+            sql += " AND (date < ? OR (date = ? AND id < ?))"
+            params += [self._date(before_date), self._date(before_date), before_id]
+        sql += " ORDER BY date DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return await self._fetch(sql, *params)
+
+    async def history(self, user_id, columns="id, date, extracted_json", limit=None) -> list[dict]:
+        columns = ", ".join(_columns(columns))
+        if limit is not None:
+            rows = await self._fetch(
+                f"SELECT {columns} FROM entries WHERE user_id = ? AND status = 'confirmed' "
+                "ORDER BY date DESC, id DESC LIMIT ?",
+                user_id, limit,
+            )
+            return rows[::-1]
+        return await self._fetch(
+            f"SELECT {columns} FROM entries WHERE user_id = ? AND status = 'confirmed' ORDER BY date, id",
+            user_id,
+        )
+
+    async def history_page(self, user_id, columns, limit, after=None) -> list[dict]:
+        sql = f"SELECT {', '.join(_columns(columns))} FROM entries WHERE user_id = ? AND status = 'confirmed'"
+        params = [user_id]
+        if after:
+            after_date, after_id = after
+            sql += " AND (date, id) > (?, ?)"
+            params += [self._date(after_date), after_id]
+        return await self._fetch(sql + " ORDER BY date, id LIMIT ?", *params, limit)
+
+    async def entries_on(self, user_id, day, columns=ENTRY_COLUMNS) -> list[dict]:
+        return await self._fetch(
+            f"SELECT {', '.join(_columns(columns))} FROM entries WHERE user_id = ? AND date = ? ORDER BY id",
+            user_id, self._date(day),
+        )
+
+    async def entries_missing(self, column: str, columns, limit: int) -> list[dict]:
+        column = _columns([column])[0]
+        return await self._fetch(
+            f"SELECT {', '.join(_columns(columns))} FROM entries WHERE {column} IS NULL LIMIT ?", limit,
+        )
+
+    async def confirmed_page(self, limit, after=None, after_user=None, columns="user_id, id, date, extracted_json"):
+        sql = f"SELECT {', '.join(_columns(columns))} FROM entries WHERE status = 'confirmed'"
+        params = []
+        if after:
+            user_id, day, entry_id = after
+            sql += " AND (user_id, date, id) > (?, ?, ?)"  # a row-value compare seeks the index; an OR chain scans it
+            params += [user_id, self._date(day), entry_id]
+        elif after_user:
+            sql += " AND user_id > ?"
+            params.append(after_user)
+        return await self._fetch(sql + " ORDER BY user_id, date, id LIMIT ?", *params, limit)
+
+    async def confirmed_counts(self, limit, after_user=None) -> list[tuple[str, int]]:
+        rows = await self._fetch(
+            "SELECT user_id, COUNT(*) AS entries FROM entries WHERE status = 'confirmed' AND user_id > ? "
+            "GROUP BY user_id ORDER BY user_id LIMIT ?",
+            after_user or "", limit,
+        )
+        return [(r["user_id"], r["entries"]) for r in rows]
+
+    async def get_aggregates(self, user_id: str) -> dict | None:
+        rows = await self._fetch("SELECT aggregates FROM user_aggregates WHERE user_id = ?", user_id)
+        return rows[0]["aggregates"] if rows else None
+
+    async def save_aggregates(self, user_id: str, aggregates: dict):
+        await self._execute(
+            "INSERT INTO user_aggregates (user_id, aggregates, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET aggregates = excluded.aggregates, updated_at = excluded.updated_at",
+            user_id, self._json(aggregates), self._now(),
+        )
+
+    async def aggregates_many(self, user_ids: list[str]) -> dict[str, dict]:
+        rows = await self._fetch(
+            f"SELECT user_id, aggregates, updated_at FROM user_aggregates WHERE user_id IN ({', '.join('?' for _ in user_ids)})",
+            *user_ids,
+        )
+        return {r["user_id"]: r for r in rows}
+
+    async def save_aggregates_many(self, rows: list[tuple[str, dict]], read_at: datetime) -> list[str]:
+        now = self._now()
+        values = ", ".join("(?, ?, ?)" for _ in rows)
+        params = [v for user_id, agg in rows for v in (user_id, self._json(agg), now)]
+        written = await self._fetch(
+            f"INSERT INTO user_aggregates (user_id, aggregates, updated_at) VALUES {values} "
+            "ON CONFLICT (user_id) DO UPDATE SET aggregates = excluded.aggregates, updated_at = excluded.updated_at "
+            "WHERE user_aggregates.updated_at <= ? RETURNING user_id",
+            *params, self._timestamp(read_at),
+        )
+        return [r["user_id"] for r in written]
+
+    async def delete_aggregates(self, user_id: str):
+        await self._execute("DELETE FROM user_aggregates WHERE user_id = ?", user_id)
+
+    # ── Metric series ─────────────────────────────────────────────────────────
+    METRIC_POINT_COLUMNS = ("user_id", "entry_id", "metric", "date", "seq", "value", "band")
+    METRIC_INSERT_CHUNK = 500
+
+    async def _insert_metric_points(self, user_id: str, points: list[dict]):
+        columns = self.METRIC_POINT_COLUMNS
+        for i in range(0, len(points), self.METRIC_INSERT_CHUNK):
+            chunk = points[i:i + self.METRIC_INSERT_CHUNK]
+            params = []
+            for p in chunk:
+                params += [user_id, p["entry_id"], p["metric"], self._date(p["date"]), p["seq"], p["value"], p["band"]]
+            values = ", ".join(["(" + ", ".join("?" * len(columns)) + ")"] * len(chunk))
+            await self._execute(f"INSERT INTO metric_points ({', '.join(columns)}) VALUES {values}", *params)
+
+    # Rollup of metric_points rows matching the WHERE clause it is completed with
+    _DAILY_ROLLUP = (
+        "INSERT INTO metric_daily (user_id, metric, date, count, sum, min, max, above, below) "
+        "SELECT user_id, metric, date, COUNT(*), SUM(value), MIN(value), MAX(value), "
+        "SUM(CASE WHEN band > 0 THEN 1 ELSE 0 END), SUM(CASE WHEN band < 0 THEN 1 ELSE 0 END) "
+        "FROM metric_points WHERE "
+    )
+
+    async def replace_metric_points(self, user_id: str, entry_id: str, points: list[dict]):
+        old = await self._fetch("DELETE FROM metric_points WHERE entry_id = ? RETURNING metric, date", entry_id)
+        await self._insert_metric_points(user_id, [{**p, "entry_id": entry_id} for p in points])
+        days = {(r["metric"], r["date"]) for r in old} | {(p["metric"], p["date"]) for p in points}
+        for metric, day in sorted(days):
+            day = self._date(day)
+            await self._execute(
+                "DELETE FROM metric_daily WHERE user_id = ? AND metric = ? AND date = ?", user_id, metric, day,
+            )
+            await self._execute(
+                self._DAILY_ROLLUP + "user_id = ? AND metric = ? AND date = ? GROUP BY user_id, metric, date",
+                user_id, metric, day,
+            )
+
+    async def rebuild_metrics(self, user_id: str, points: list[dict]):
+        await self._execute("DELETE FROM metric_points WHERE user_id = ?", user_id)
+        await self._execute("DELETE FROM metric_daily WHERE user_id = ?", user_id)
+        await self._insert_metric_points(user_id, points)
+        await self._execute(self._DAILY_ROLLUP + "user_id = ? GROUP BY user_id, metric, date", user_id)
+
+    async def _metric_rows(self, sql: str, user_id: str, metric: str, start, end, order: str) -> list[dict]:
+        params = [user_id, metric]
+        if start:
+            sql += " AND date >= ?"
+            params.append(self._date(start))
+        if end:
+            sql += " AND date <= ?"
+            params.append(self._date(end))
+        return await self._fetch(f"{sql} ORDER BY {order}", *params)
+
+    async def metric_points(self, user_id, metric, start=None, end=None) -> list[dict]:
+        return await self._metric_rows(
+            "SELECT date, value, band FROM metric_points WHERE user_id = ? AND metric = ?",
+            user_id, metric, start, end, "date, entry_id, seq",
+        )
+
+    async def metric_days(self, user_id, metric, start=None, end=None) -> list[dict]:
+        return await self._metric_rows(
+            "SELECT date, count, sum, min, max, above, below FROM metric_daily WHERE user_id = ? AND metric = ?",
+            user_id, metric, start, end, "date",
+        )
+
+    async def metrics_built(self, user_id: str) -> bool:
+        return bool(await self._fetch("SELECT 1 AS ok FROM metric_users WHERE user_id = ?", user_id))
+
+    async def mark_metrics_built(self, user_id: str, built: bool = True):
+        if built:
+            await self._execute(
+                "INSERT INTO metric_users (user_id, built_at) VALUES (?, ?) ON CONFLICT (user_id) DO NOTHING",
+                user_id, self._now(),
+            )
+        else:
+            await self._execute("DELETE FROM metric_users WHERE user_id = ?", user_id)
+
+
+# ── SQLite ────────────────────────────────────────────────────────────────────
+SQLITE_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS entries ("
+    "  id TEXT PRIMARY KEY,"
+    "  user_id TEXT NOT NULL,"
+    "  date TEXT NOT NULL,"
+    "  raw_text TEXT,"
+    "  extracted_json TEXT,"
+    "  status TEXT NOT NULL,"
+    "  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))"
+    ")",
+    "CREATE INDEX IF NOT EXISTS entries_user_status_date ON entries (user_id, status, date, id)",
+    # SQLite can't index into a JSON array, so tags are mirrored one row per tag
+    "CREATE TABLE IF NOT EXISTS entry_tags ("
+    "  entry_id TEXT NOT NULL,"
+    "  user_id TEXT NOT NULL,"
+    "  tag TEXT NOT NULL,"
+    "  PRIMARY KEY (entry_id, tag)"
+    ")",
+    "CREATE INDEX IF NOT EXISTS entry_tags_user_tag ON entry_tags (user_id, tag)",
+    "CREATE TABLE IF NOT EXISTS user_aggregates ("
+    "  user_id TEXT PRIMARY KEY,"
+    "  aggregates TEXT NOT NULL,"
+    "  updated_at TEXT NOT NULL"
+    ")",
+    "CREATE TABLE IF NOT EXISTS metric_points ("
+    "  user_id TEXT NOT NULL,"
+    "  entry_id TEXT NOT NULL,"
+    "  metric TEXT NOT NULL,"
+    "  date TEXT NOT NULL,"
+    "  seq INTEGER NOT NULL,"
+    "  value REAL NOT NULL,"
+    "  band INTEGER NOT NULL,"
+    "  PRIMARY KEY (user_id, metric, date, entry_id, seq)"
+    ")",
+    "CREATE INDEX IF NOT EXISTS metric_points_entry ON metric_points (entry_id)",
+    "CREATE TABLE IF NOT EXISTS metric_daily ("
+    "  user_id TEXT NOT NULL,"
+    "  metric TEXT NOT NULL,"
+    "  date TEXT NOT NULL,"
+    "  count INTEGER NOT NULL,"
+    "  sum REAL NOT NULL,"
+    "  min REAL NOT NULL,"
+    "  max REAL NOT NULL,"
+    "  above INTEGER NOT NULL,"
+    "  below INTEGER NOT NULL,"
+    "  PRIMARY KEY (user_id, metric, date)"
+    ")",
+    "CREATE TABLE IF NOT EXISTS metric_users ("
+    "  user_id TEXT PRIMARY KEY,"
+    "  built_at TEXT NOT NULL"
+    ")",
+)
+# Added after the first schema — ALTERed into older files
+SQLITE_LATER_COLUMNS = {"tags": "TEXT", "mood": "TEXT", "sleep": "TEXT", "stress": "TEXT"}
+SQLITE_LATER_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS entries_user_mood_date ON entries (user_id, mood, date)",
+)
+JSON_COLUMNS = ("extracted_json", "aggregates", "tags")
+
+
+class SQLiteStorage(SQLStorage):
+    name = "sqlite"
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, cached_statements=256)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA busy_timeout=5000")
+        for statement in SQLITE_SCHEMA:
+            self._db.execute(statement)
+        existing = {row["name"] for row in self._db.execute("PRAGMA table_info(entries)")}
+        for column, kind in SQLITE_LATER_COLUMNS.items():
+            if column not in existing:
+                self._db.execute(f"ALTER TABLE entries ADD COLUMN {column} {kind}")
+        for statement in SQLITE_LATER_INDEXES:
+            self._db.execute(statement)
+
+    def _run(self, sql: str, params) -> list[dict]:
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        result = []
+        for row in rows:
+            row = dict(row)
+            for column in JSON_COLUMNS:
+                if isinstance(row.get(column), str):
+                    row[column] = json.loads(row[column])
+            result.append(row)
+        return result
+
+    async def _fetch(self, sql: str, *params) -> list[dict]:
+        return await asyncio.to_thread(self._run, sql, params)
+
+    async def _execute(self, sql: str, *params):
+        await asyncio.to_thread(self._run, sql, params)
+
+    def _json(self, value):
+        return None if value is None else json.dumps(value)
+
+    def _tags(self, value):
+        return self._json(value)
+
+    def _now(self):
+        return datetime.now(timezone.utc).isoformat()
+
+    def _timestamp(self, value: datetime):
+        return value.isoformat()
+
+    def _tag_filter(self, user_id: str, tag: str) -> tuple[str, list]:
+        return "id IN (SELECT entry_id FROM entry_tags WHERE user_id = ? AND tag = ?)", [user_id, tag]
+
+    def _sync_tags(self, rows: list[dict]):
+        with self._lock:
+            self._db.execute("BEGIN")
+            for row in rows:
+                self._db.execute("DELETE FROM entry_tags WHERE entry_id = ?", (row["id"],))
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO entry_tags (entry_id, user_id, tag) VALUES (?, ?, ?)",
+                    [(row["id"], row["user_id"], t) for t in row.get("tags") or []],
+                )
+            self._db.execute("COMMIT")
+
+    async def insert_entries(self, rows: list[dict]) -> list[dict]:
+        inserted = await super().insert_entries(rows)
+        await asyncio.to_thread(self._sync_tags, inserted)
+        return inserted
+
+    async def update_entry(self, entry_id: str, values: dict, expect_status: str | None = None) -> dict | None:
+        updated = await super().update_entry(entry_id, values, expect_status)
+        if updated is not None and "tags" in values:
+            await asyncio.to_thread(self._sync_tags, [updated])
+        return updated
+
+    async def close(self):
+        self._db.close()
+
+
+# ── Postgres ──────────────────────────────────────────────────────────────────
+POSTGRES_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS entries ("
+    "  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),"
+    "  user_id text NOT NULL,"
+    "  date date NOT NULL,"
+    "  raw_text text,"
+    "  extracted_json jsonb,"
+    "  status text NOT NULL,"
+    "  created_at timestamptz NOT NULL DEFAULT now()"
+    ")",
+    "CREATE INDEX IF NOT EXISTS entries_user_status_date ON entries (user_id, status, date, id)",
+    # Same as migrations/003_entries_denormalized.sql
+    "ALTER TABLE entries ADD COLUMN IF NOT EXISTS tags text[]",
+    "ALTER TABLE entries ADD COLUMN IF NOT EXISTS mood text",
+    "ALTER TABLE entries ADD COLUMN IF NOT EXISTS sleep text",
+    "ALTER TABLE entries ADD COLUMN IF NOT EXISTS stress text",
+    "CREATE INDEX IF NOT EXISTS entries_tags ON entries USING gin (tags)",
+    "CREATE INDEX IF NOT EXISTS entries_user_mood_date ON entries (user_id, mood, date)",
+    "CREATE TABLE IF NOT EXISTS user_aggregates ("
+    "  user_id text PRIMARY KEY,"
+    "  aggregates jsonb NOT NULL,"
+    "  updated_at timestamptz NOT NULL DEFAULT now()"
+    ")",
+    # Same as migrations/004_metric_series.sql
+    "CREATE TABLE IF NOT EXISTS metric_points ("
+    "  user_id text NOT NULL,"
+    "  entry_id uuid NOT NULL,"
+    "  metric text NOT NULL,"
+    "  date date NOT NULL,"
+    "  seq smallint NOT NULL,"
+    "  value double precision NOT NULL,"
+    "  band smallint NOT NULL,"
+    "  PRIMARY KEY (user_id, metric, date, entry_id, seq)"
+    ")",
+    "CREATE INDEX IF NOT EXISTS metric_points_entry ON metric_points (entry_id)",
+    "CREATE TABLE IF NOT EXISTS metric_daily ("
+    "  user_id text NOT NULL,"
+    "  metric text NOT NULL,"
+    "  date date NOT NULL,"
+    "  count integer NOT NULL,"
+    "  sum double precision NOT NULL,"
+    "  min double precision NOT NULL,"
+    "  max double precision NOT NULL,"
+    "  above integer NOT NULL,"
+    "  below integer NOT NULL,"
+    "  PRIMARY KEY (user_id, metric, date)"
+    ")",
+    "CREATE TABLE IF NOT EXISTS metric_users ("
+    "  user_id text PRIMARY KEY,"
+    "  built_at timestamptz NOT NULL DEFAULT now()"
+    ")",
+)
+
+
+def _dollar_params(sql: str) -> str:
+    """'a = ? AND b = ?' → 'a = $1 AND b = $2'."""
+    parts = sql.split("?")
+    return parts[0] + "".join(f"${i}{part}" for i, part in enumerate(parts[1:], start=1))
+
+
+class PostgresStorage(SQLStorage):
+    name = "postgres"
+
+    def __init__(self, dsn: str, min_size: int = 2, max_size: int = 10):
+        if asyncpg is None:
+            raise RuntimeError("STORAGE_BACKEND=postgres needs the asyncpg package.")
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+
+    @staticmethod
+    async def _init_connection(conn):
+        for type_name in ("json", "jsonb"):
+            await conn.set_type_codec(type_name, encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+    async def _get_pool(self):
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    pool = await asyncpg.create_pool(
+                        self.dsn, min_size=self.min_size, max_size=self.max_size, init=self._init_connection,
+                    )
+                    async with pool.acquire() as conn:
+                        for statement in POSTGRES_SCHEMA:
+                            await conn.execute(statement)
+                    self._pool = pool
+        return self._pool
+
+    @staticmethod
+    def _row(record) -> dict:
+        row = dict(record)
+        for key, value in row.items():
+            if isinstance(value, uuid.UUID):
+                row[key] = str(value)
+            elif isinstance(value, (date, datetime)):
+                row[key] = value.isoformat()
+        return row
+
+    async def _fetch(self, sql: str, *params) -> list[dict]:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            records = await conn.fetch(_dollar_params(sql), *params)
+        return [self._row(r) for r in records]
+
+    async def _execute(self, sql: str, *params):
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            await conn.execute(_dollar_params(sql), *params)
+
+    def _date(self, value):
+        return date.fromisoformat(value[:10]) if isinstance(value, str) else value
+
+    def _tag_filter(self, user_id: str, tag: str) -> tuple[str, list]:
+        return "tags @> ARRAY[?]::text[]", [tag]  # GIN index on tags
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+
+
+def open_storage(backend: str | None = None) -> Storage:
+    """Build the backend named by STORAGE_BACKEND (default: supabase)."""
+    backend = (backend or os.getenv("STORAGE_BACKEND", "supabase")).lower()
+    if backend == "supabase":
+        def connect():
+            from supabase import create_client
+
+            return create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+
+        return SupabaseStorage(connect=connect, pool_size=int(os.getenv("DB_POOL_SIZE", "8")))
+    if backend == "sqlite":
+        return SQLiteStorage(os.getenv("SQLITE_PATH", "koru.sqlite3"))
+    if backend == "postgres":
+        return PostgresStorage(
+            os.getenv("DATABASE_URL"),
+            min_size=int(os.getenv("DB_POOL_MIN", "2")),
+            max_size=int(os.getenv("DB_POOL_SIZE", "8")),
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
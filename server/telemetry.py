@@ -0,0 +1,245 @@
+"""
+Process-local metrics and optional tracing.
+
+Counters and fixed-bucket histograms live in plain dicts keyed by label
+values — an observation is a bisect and a few increments, cheap enough to
+leave on in production — and render() writes them in the Prometheus text
+format for GET /metrics. Values that already live elsewhere (queue depth,
+scheduler counters) are read at scrape time through collectors instead of
+being mirrored on every change.
+
+Everything runs on the event loop, so there is no locking. Each worker
+process keeps its own registry; Prometheus scrapes and sums them.
+
+  • MetricsMiddleware     — latency / status per route template.
+  • InstrumentedStorage   — latency / errors per Storage method.
+  • span()                — an OpenTelemetry span when TRACING_ENABLED=1 and
+                            opentelemetry-api is installed, otherwise a no-op.
+"""
+import os
+import time
+import bisect
+import inspect
+import functools
+from contextlib import nullcontext
+
+try:
+    from opentelemetry import trace, propagate  # optional — spans are a no-op without it
+except ImportError:
+    trace = propagate = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, _labels(self.labels, labels), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.series: dict[tuple, list] = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *labels):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        names = self.labels + ("le",)
+        for labels, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket", _labels(names, labels + (_number(bound),)), cumulative
+            yield f"{self.name}_sum", _labels(self.labels, labels), series[-1]
+            yield f"{self.name}_count", _labels(self.labels, labels), cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list = []
+        self.collectors: list = []
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, collect):
+        """Register collect() -> [(name, kind, help, [(labels dict, value)])], called per scrape."""
+        self.collectors.append(collect)
+        return collect
+
+    def render(self, collected: list | None = None) -> str:
+        """Prometheus text exposition. `collected` is pre-gathered collector output (for async sources)."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_number(value)}")
+
+        families = list(collected or [])
+        for collect in self.collectors:
+            families += collect()
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+
+
+# ── Tracing ───────────────────────────────────────────────────────────────────
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "").lower() in ("1", "true", "yes") and trace is not None
+_tracer = trace.get_tracer("koru") if TRACING_ENABLED else None
+
+
+def span(name: str, **attributes):
+    """Child span of whatever is current — exported by the deployment's TracerProvider."""
+    if _tracer is None:
+        return nullcontext()
+    return _tracer.start_as_current_span(name, attributes=attributes)
+
+
+# ── HTTP ──────────────────────────────────────────────────────────────────────
+HTTP_REQUESTS = counter("koru_http_requests_total", "HTTP requests by route template and status.",
+                        ("method", "route", "status"))
+HTTP_LATENCY = histogram("koru_http_request_duration_seconds", "HTTP request latency (until the body is sent).",
+                         ("method", "route"))
+HTTP_IN_FLIGHT = {"value": 0}
+
+
+class MetricsMiddleware:
+    """Pure ASGI (no BaseHTTPMiddleware buffering), so streamed responses pass straight through."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT["value"] += 1
+        start = time.perf_counter()
+        with self._span(scope) as current:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                HTTP_IN_FLIGHT["value"] -= 1
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                HTTP_LATENCY.observe(time.perf_counter() - start, scope["method"], route)
+                HTTP_REQUESTS.inc(scope["method"], route, f"{status['code'] // 100}xx")
+                if current is not None:
+                    current.update_name(f"{scope['method']} {route}")
+                    current.set_attribute("http.route", route)
+                    current.set_attribute("http.status_code", status["code"])
+
+    @staticmethod
+    def _span(scope):
+        if _tracer is None or trace.get_current_span().get_span_context().is_valid:
+            return nullcontext()  # off, or the framework / an outer instrumentation already opened one
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        return _tracer.start_as_current_span(
+            f"{scope['method']} {scope.get('path', '')}",
+            context=propagate.extract(headers),  # continue a caller's traceparent
+            kind=trace.SpanKind.SERVER,
+            attributes={"http.method": scope["method"], "http.target": scope.get("path", "")},
+        )
+
+
+# ── Storage ───────────────────────────────────────────────────────────────────
+STORAGE_LATENCY = histogram("koru_storage_duration_seconds", "Storage call latency by backend and method.",
+                            ("backend", "method"), buckets=FAST_BUCKETS)
+STORAGE_ERRORS = counter("koru_storage_errors_total", "Failed storage calls by backend, method and error type.",
+                         ("backend", "method", "error"))
+
+
+class InstrumentedStorage:
+    """Wraps a Storage so every async method is timed (and traced); everything else passes through."""
+
+    def __init__(self, inner):
+        self._inner = inner
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if name.startswith("_") or not inspect.iscoroutinefunction(attr):
+            return attr
+        backend = self._inner.name
+
+        @functools.wraps(attr)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with span(f"storage.{name}", **{"db.system": backend}):
+                    return await attr(*args, **kwargs)
+            except Exception as e:
+                STORAGE_ERRORS.inc(backend, name, type(e).__name__)
+                raise
+            finally:
+                STORAGE_LATENCY.observe(time.perf_counter() - start, backend, name)
+
+        self.__dict__[name] = timed  # build each wrapper once
+        return timed
+
+
+def http_collector():
+    return [("koru_http_requests_in_flight", "gauge", "HTTP requests being served.", [({}, HTTP_IN_FLIGHT["value"])])]
+
+
+REGISTRY.collector(http_collector)
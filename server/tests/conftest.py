@@ -0,0 +1,56 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Tests import the server modules the way main.py does — as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# main.py opens its local stores on import; keep them out of the working tree
+_workdir = tempfile.mkdtemp(prefix="koru-test-")
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "offline")
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+os.environ.setdefault("STORAGE_BACKEND", "sqlite")
+os.environ.setdefault("GEMINI_RPM", "1000000")
+os.environ.setdefault("GEMINI_TPM", "1000000000")
+for _var in ("SQLITE_PATH", "DATA_VERSION_PATH", "JOB_QUEUE_PATH", "SEARCH_INDEX_PATH", "IDEMPOTENCY_PATH",
+             "INSIGHTS_PATH"):
+    os.environ.setdefault(_var, os.path.join(_workdir, f"{_var.lower()}.sqlite3"))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """main with fresh storage and local stores per test, Gemini faked, nothing extracted locally."""
+    import main
+    from benchmarks.fakes import FakeGemini
+    from entry_cache import EntryCache
+    from extraction_cache import ExtractionCache
+    from gemini_scheduler import GeminiScheduler
+    from http_cache import DataVersionStore, ResponseCache
+    from idempotency import IdempotencyStore
+    from insight_store import InsightStore
+    from job_queue import JobQueue
+    from search_index import SearchIndex
+    from storage import SQLiteStorage
+
+    stores = {
+        "storage": SQLiteStorage(str(tmp_path / "koru.sqlite3")),
+        "data_versions": DataVersionStore(str(tmp_path / "versions.sqlite3")),
+        "job_queue": JobQueue(str(tmp_path / "jobs.sqlite3")),
+        "search_index": SearchIndex(str(tmp_path / "search.sqlite3")),
+        "idempotency": IdempotencyStore(str(tmp_path / "idempotency.sqlite3")),
+        "insight_store": InsightStore(str(tmp_path / "insights.sqlite3")),
+        "extraction_cache": ExtractionCache(),
+        "response_cache": ResponseCache(),
+        "entry_cache": EntryCache(),
+        "gemini_scheduler": GeminiScheduler(main._generate, rpm=1_000_000, tpm=1_000_000_000),  # asyncio state is per loop
+    }
+    for name, store in stores.items():
+        monkeypatch.setattr(main, name, store)
+    monkeypatch.setattr(main, "gemini", FakeGemini(latency=0))
+    monkeypatch.setattr(main, "local_extraction", lambda text: None)
+    yield main
+    for name in ("data_versions", "job_queue", "search_index", "idempotency", "insight_store"):
+        stores[name].close()
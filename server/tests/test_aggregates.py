@@ -0,0 +1,104 @@
+import asyncio
+
+import httpx
+
+from benchmarks.synthetic import synthetic_entries
+
+
+def _client(main) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+
+
+async def _insert(main, rows: list[dict]) -> list[dict]:
+    for row in rows:
+        row.update(main._derived_columns(row["extracted_json"]))
+    return await main.storage.insert_entries(rows)
+
+
+def _counts(agg: dict) -> dict:
+    return {k: v for k, v in agg.items() if k != "risk"}
+
+
+def test_incremental_updates_match_a_rebuild(app):
+    main = app
+
+    async def go():
+        rows = synthetic_entries(60, user_id="u1", condition="diabetes")
+        first = await _insert(main, rows[:30])
+        await main.update_aggregates("u1", add=first)
+        for row in await _insert(main, rows[30:]):   # one at a time, like check-ins
+            await main.update_aggregates("u1", add=[row])
+
+        stored = await main.storage.get_aggregates("u1")
+        assert stored == main._aggregates_from_entries(await main.storage.history("u1"))
+
+    asyncio.run(go())
+
+
+def test_edits_subtract_the_old_version_exactly(app):
+    main = app
+
+    async def go():
+        inserted = await _insert(main, synthetic_entries(30, user_id="u1", condition="diabetes"))
+        await main.update_aggregates("u1", add=inserted)
+        old = inserted[3]
+        new = {**old, "extracted_json": {**old["extracted_json"], "mood": "good", "symptoms": ["nausea"]}}
+        await main.storage.update_entry(old["id"], {"extracted_json": new["extracted_json"]})
+        await main.update_aggregates("u1", remove=[old], add=[new])
+
+        stored = await main.storage.get_aggregates("u1")
+        rebuilt = main._aggregates_from_entries(await main.storage.history("u1"))
+        assert _counts(stored) == _counts(rebuilt)
+        assert stored["risk"].get("stale")      # an older day can't be relearned online
+
+    asyncio.run(go())
+
+
+def test_missing_row_is_backfilled_from_history(app):
+    main = app
+
+    async def go():
+        await _insert(main, synthetic_entries(10, user_id="u1"))
+        assert await main.storage.get_aggregates("u1") is None
+        async with _client(main) as client:
+            r = await client.get("/patterns/u1")
+        assert r.status_code == 200 and r.json()["has_enough_data"]
+        assert (await main.storage.get_aggregates("u1"))["total"] == 10
+
+    asyncio.run(go())
+
+
+def test_patterns_need_a_week_of_entries(app):
+    main = app
+
+    async def go():
+        inserted = await _insert(main, synthetic_entries(6, user_id="u1"))
+        await main.update_aggregates("u1", add=inserted)
+        async with _client(main) as client:
+            r = await client.get("/patterns/u1")
+        assert r.json() == {"has_enough_data": False, "patterns": [], "stats": None, "predictions": [], "risk": None}
+
+    asyncio.run(go())
+
+
+def test_failed_update_drops_the_row_instead_of_drifting(app):
+    main = app
+
+    async def go():
+        inserted = await _insert(main, synthetic_entries(10, user_id="u1"))
+        await main.update_aggregates("u1", add=inserted[:9])
+        save = main.storage.save_aggregates
+
+        async def broken(*args, **kwargs):
+            raise RuntimeError("write failed")
+
+        main.storage.save_aggregates = broken
+        await main.update_aggregates("u1", add=inserted[9:])
+        assert await main.storage.get_aggregates("u1") is None
+
+        main.storage.save_aggregates = save
+        async with _client(main) as client:
+            await client.get("/patterns/u1")
+        assert (await main.storage.get_aggregates("u1"))["total"] == 10
+
+    asyncio.run(go())
@@ -0,0 +1,78 @@
+import json
+import asyncio
+
+import pytest
+
+from benchmarks import run_all
+from benchmarks.fakes import DEFAULT_EXTRACTION, FakeAPIError, FakeGemini, FakeSupabase
+from benchmarks.synthetic import synthetic_entries
+
+
+def test_synthetic_histories_are_deterministic():
+    assert synthetic_entries(50, seed=3) == synthetic_entries(50, seed=3)
+    assert synthetic_entries(50, seed=3) != synthetic_entries(50, seed=4)
+    rows = synthetic_entries(200, condition="hypertension", user_id="u9")
+    assert [r["date"] for r in rows] == sorted(r["date"] for r in rows)
+    assert {r["user_id"] for r in rows} == {"u9"}
+    assert any("bp" in (r["extracted_json"].get("condition_data") or {}) for r in rows)
+
+
+def test_fake_supabase_filters_orders_and_pages():
+    db = FakeSupabase()
+    db.table("t").insert([{"k": k, "d": d} for k, d in (("a", "1"), ("b", "2"), ("c", "2"), ("d", "3"))]).execute()
+    rows = db.table("t").select("k").or_('d.lt.2,and(d.eq.2,k.lt."c")').order("k", desc=True).execute().data
+    assert rows == [{"k": "b"}, {"k": "a"}]
+    page = db.table("t").select("k").order("d").order("k", desc=True).range(1, 2).execute().data
+    assert page == [{"k": "c"}, {"k": "b"}]
+
+
+def test_fake_supabase_failures_are_reproducible():
+    def failures(seed: int) -> list[bool]:
+        db = FakeSupabase(error_rate=0.5, seed=seed)
+        out = []
+        for _ in range(20):
+            try:
+                db.table("t").select().execute()
+                out.append(False)
+            except FakeAPIError:
+                out.append(True)
+        return out
+
+    assert failures(1) == failures(1) and any(failures(1)) and not all(failures(1))
+
+
+def test_fake_gemini_streams_the_same_reply_in_chunks():
+    gemini = FakeGemini(stream_chunk_chars=5)
+
+    async def go():
+        stream = await gemini.aio.models.generate_content_stream(model="m", contents="prompt")
+        chunks = [chunk async for chunk in stream]
+        assert all(len(c.text) <= 5 for c in chunks)
+        assert json.loads("".join(c.text for c in chunks)) == DEFAULT_EXTRACTION
+        assert chunks[-1].usage_metadata is not None and chunks[0].usage_metadata is None
+        reply = await gemini.aio.models.generate_content(model="m", contents="prompt")
+        assert json.loads(reply.text) == DEFAULT_EXTRACTION and gemini.calls == 2
+
+    asyncio.run(go())
+
+
+def test_fake_gemini_injects_rate_limits():
+    gemini = FakeGemini(rate_limit_rate=1.0)
+
+    async def go():
+        with pytest.raises(FakeAPIError) as raised:
+            await gemini.aio.models.generate_content(model="m", contents="prompt")
+        assert raised.value.code == 429 and gemini.errors == 1
+
+    asyncio.run(go())
+
+
+def test_compare_reports_changes_and_new_output_hashes():
+    old = {"meta": {"git_commit": "aaa"},
+           "micro": [{"case": "stats", "entries": 60, "best_ms": 2.0, "median_ms": 4.0, "output_hash": "x"}]}
+    new = {"meta": {"git_commit": "bbb"},
+           "micro": [{"case": "stats", "entries": 60, "best_ms": 1.0, "median_ms": 4.0, "output_hash": "y"}]}
+    lines = run_all.compare(old, new)
+    assert lines[0] == "aaa → bbb"
+    assert any("micro/stats/60/best_ms" in line and "-50.0%" in line for line in lines)
+    assert any("different result" in line for line in lines)
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import httpx
+
+from benchmarks.fakes import DEFAULT_EXTRACTION
+
+
+def _client(main) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+
+
+def _batch_reply(prompt: str):
+    """Per-text replies, shuffled: mood follows the text so a mixed-up index would show."""
+    if "Texts (JSON array)" not in prompt:
+        return DEFAULT_EXTRACTION
+    texts = json.loads(prompt.split("Texts (JSON array): ")[1].strip())
+    return [{**DEFAULT_EXTRACTION, "mood": "good" if "happy" in t["text"] else "bad", "index": t["index"]}
+            for t in reversed(texts)]
+
+
+def _items(n: int) -> list[dict]:
+    return [{"user_id": "u1", "text": f"day {i} {'happy' if i % 2 else 'tired'}", "date": f"2026-01-{i % 28 + 1:02d}"}
+            for i in range(n)]
+
+
+def test_texts_are_packed_into_batches_and_matched_by_index(app):
+    main = app
+    main.gemini.response = _batch_reply
+
+    async def go():
+        async with _client(main) as client:
+            r = await client.post("/entries/bulk", json={"entries": _items(25)})
+        body = r.json()
+        assert r.status_code == 200
+        assert body["imported"] == 25 and body["failed"] == 0
+        assert body["gemini_batches"] == 3 and main.gemini.calls == 3      # 25 texts, 10 per call
+
+        rows = await main.storage.history("u1")
+        assert len(rows) == 25
+        moods = {row["id"]: row["extracted_json"]["mood"] for row in rows}
+        for item in body["entries"]:
+            assert moods[item["entry_id"]] == ("good" if item["index"] % 2 else "bad")
+
+    asyncio.run(go())
+
+
+def test_aggregates_match_a_rebuild(app):
+    main = app
+    main.gemini.response = _batch_reply
+
+    async def go():
+        async with _client(main) as client:
+            await client.post("/entries/bulk", json={"entries": _items(40)})
+        stored = await main.storage.get_aggregates("u1")
+        assert stored == main._aggregates_from_entries(await main.storage.history("u1"))
+
+    asyncio.run(go())
+
+
+def test_cached_texts_skip_gemini(app):
+    main = app
+    main.gemini.response = _batch_reply
+
+    async def go():
+        async with _client(main) as client:
+            await client.post("/entries/bulk", json={"entries": _items(10)})
+            calls = main.gemini.calls
+            r = await client.post("/entries/bulk", json={"entries": _items(10)})
+        assert r.json()["cached"] == 10 and r.json()["gemini_batches"] == 0
+        assert main.gemini.calls == calls
+
+    asyncio.run(go())
+
+
+def test_unusable_batch_reply_falls_back_to_one_call_per_text(app):
+    main = app
+    main.gemini.response = lambda prompt: [] if "Texts (JSON array)" in prompt else DEFAULT_EXTRACTION
+
+    async def go():
+        async with _client(main) as client:
+            r = await client.post("/entries/bulk", json={"entries": _items(4)})
+        assert r.json()["imported"] == 4
+        assert main.gemini.calls == 1 + 4
+
+    asyncio.run(go())
+
+
+def test_failed_extractions_are_reported_per_item(app):
+    main = app
+
+    def reply(prompt: str):
+        if "Texts (JSON array)" in prompt:
+            return []
+        if "tired" in prompt:
+            raise RuntimeError("boom")
+        return DEFAULT_EXTRACTION
+
+    main.gemini.response = reply
+
+    async def go():
+        async with _client(main) as client:
+            r = await client.post("/entries/bulk", json={"entries": _items(4)})
+        body = r.json()
+        assert body["imported"] == 2 and body["failed"] == 2
+        assert [e["index"] for e in body["errors"]] == [0, 2]
+        assert all(e["detail"].startswith("extraction failed") for e in body["errors"])
+
+    asyncio.run(go())
@@ -0,0 +1,102 @@
+import json
+import asyncio
+
+
+def _events(chunks: list[str]) -> list[tuple[str, dict]]:
+    out = []
+    for chunk in chunks:
+        event, data = chunk.strip().split("\n")
+        out.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return out
+
+
+def test_slow_reader_does_not_hold_the_gemini_slot(app):
+    main = app
+
+    async def go():
+        request = main.CheckInRequest(user_id="u1", text="slept badly, headache", date="2026-01-01")
+        response = await main.create_draft_stream(request, None)
+        stream = response.body_iterator
+
+        first = await stream.__anext__()            # the client reads one event, then stalls
+        await asyncio.sleep(0.05)
+        assert main.gemini_scheduler.stats()["in_flight"] == 0
+
+        events = _events([first] + [chunk async for chunk in stream])
+        assert events[-1][0] == "done"
+        fields = {data["key"]: data["value"] for event, data in events if event == "field"}
+        assert fields["symptoms"] == events[-1][1]["extracted_data"]["symptoms"]
+
+    asyncio.run(go())
+
+
+def _feed_in_chunks(main, text: str, size: int) -> list[tuple[str, object]]:
+    parser = main.PartialObjectParser()
+    fields = []
+    for i in range(0, len(text), size):
+        fields += parser.feed(text[i:i + size])
+    return fields
+
+
+def test_parser_emits_each_field_once_whatever_the_chunking(app):
+    main = app
+    obj = {
+        "symptoms": ["headache", "brain \"fog\""], "sleep": "low", "sleep_hours": 12, "food": [],
+        "stress": "high, then {calm}", "exercise": False, "mood": None, "condition_data": {"glucose": 5.5},
+    }
+    text = json.dumps(obj, indent=1)
+    for size in (1, 3, 7, len(text)):
+        assert _feed_in_chunks(main, text, size) == list(obj.items())
+
+
+def test_parser_holds_numbers_until_a_delimiter(app):
+    main = app
+    parser = main.PartialObjectParser()
+    assert parser.feed('{"sleep_hours": 1') == []
+    assert parser.feed('2') == []
+    assert parser.feed('.5, "exercise": tr') == [("sleep_hours", 12.5)]
+    assert parser.feed('ue}') == [("exercise", True)]
+
+
+def test_parser_ignores_text_before_the_object(app):
+    main = app
+    parser = main.PartialObjectParser()
+    assert parser.feed("  ") == []
+    assert parser.feed('{"mood": "good"}') == [("mood", "good")]
+    assert json.loads(parser.buffer) == {"mood": "good"}
+
+
+def test_stream_sends_fields_then_the_saved_entry(app):
+    main = app
+
+    async def go():
+        request = main.CheckInRequest(user_id="u1", text="slept badly, headache", date="2026-01-01")
+        response = await main.create_draft_stream(request, None)
+        events = _events([chunk async for chunk in response.body_iterator])
+
+        kinds = [event for event, _ in events]
+        assert kinds[-1] == "done" and set(kinds[:-1]) == {"field"}
+        done = events[-1][1]
+        row = await main.storage.get_entry(done["entry_id"])
+        assert row["extracted_json"] == done["extracted_data"]
+
+    asyncio.run(go())
+
+
+def test_upstream_failure_ends_the_stream_with_an_error_event(app):
+    main = app
+
+    def fail(prompt):
+        raise RuntimeError("upstream down")
+
+    main.gemini.response = fail
+
+    async def go():
+        request = main.CheckInRequest(user_id="u1", text="slept badly", date="2026-01-01")
+        response = await main.create_draft_stream(request, None)
+        events = _events([chunk async for chunk in response.body_iterator])
+        assert events == [("error", {"detail": "upstream down"})]
+        assert main.gemini_scheduler.stats()["in_flight"] == 0
+        assert await main.storage.history("u1") == []
+
+    asyncio.run(go())
@@ -0,0 +1,75 @@
+import asyncio
+
+from entry_cache import EntryCache
+
+
+def _row(i: int) -> dict:
+    return {"id": f"e{i:03d}", "date": f"2026-01-{i + 1:02d}", "raw_text": "x", "tags": [], "mood": "good",
+            "extracted_json": {"mood": "good"}}
+
+
+def test_fill_fetched_before_a_write_is_not_cached():
+    cache = EntryCache()
+    ticket = cache.ticket()                       # read at version 1 starts fetching
+    stale = [_row(0)]
+    cache.apply("u1", add=[_row(1)])              # a write lands meanwhile
+    cache.set_aggregates("u1", {"total": 2})
+    cache.advance("u1", 2)
+    cache.put_entries("u1", 1, stale, ticket)     # the read finishes
+    cache.put_aggregates("u1", 1, {"total": 1}, ticket)
+    cache.advance("u1", 2)
+    assert cache.entries("u1", 2) is None
+    assert cache.aggregates("u1", 2) is None
+
+
+def test_fill_without_a_write_is_cached():
+    cache = EntryCache()
+    ticket = cache.ticket()
+    cache.apply("u2", add=[_row(1)])              # other users' writes don't matter
+    cache.put_entries("u1", 1, [_row(0)], ticket)
+    assert [e.id for e in cache.entries("u1", 1)] == ["e000"]
+
+
+def test_forgotten_writes_refuse_old_fills(monkeypatch):
+    monkeypatch.setattr("entry_cache.RECENT_WRITES", 2)
+    cache = EntryCache()
+    ticket = cache.ticket()
+    for user in ("u1", "u2", "u3"):               # u1's write falls out of the record
+        cache.apply(user, add=[_row(1)])
+    cache.put_entries("u1", 1, [_row(0)], ticket)
+    assert cache.entries("u1", 1) is None
+
+
+def test_write_between_fetch_and_put_reaches_the_next_read(app):
+    main = app
+
+    async def go():
+        rows = [{**_row(i), "user_id": "u1", "status": "confirmed"} for i in range(10)]
+        await main.storage.insert_entries(rows)
+
+        fetched, release = asyncio.Event(), asyncio.Event()
+        history = main.storage.history
+
+        async def gated_history(*args, **kwargs):
+            result = await history(*args, **kwargs)
+            if not fetched.is_set():              # only the read's fill waits
+                fetched.set()
+                await release.wait()
+            return result
+
+        main.storage.history = gated_history   # a fresh SQLiteStorage per test
+        read = asyncio.create_task(main._hot_entries("u1"))
+        await fetched.wait()
+
+        # The read finishes while the write is between its aggregates update and its version bump
+        inserted = await main.storage.insert_entries([{**_row(20), "user_id": "u1", "status": "confirmed"}])
+        await main.update_aggregates("u1", add=inserted)
+        release.set()
+        assert len(await read) == 10
+        await main.bump_version("u1")
+
+        entries = await main._hot_entries("u1")
+        assert [e.id for e in entries][-1] == inserted[0]["id"]
+        assert (await main._hot_aggregates("u1"))["total"] == 11
+
+    asyncio.run(go())
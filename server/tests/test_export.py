@@ -0,0 +1,91 @@
+import io
+import csv
+import json
+import asyncio
+
+import httpx
+import pytest
+
+import export
+
+CONFIGS = {
+    "diabetes": {"primary": {"key": "glucose"}, "indicators": [{"key": "insulin", "type": "toggle"},
+                                                                {"key": "carbs", "type": "text"}]},
+}
+ROW = {
+    "id": "e1", "date": "2026-01-01", "created_at": "2026-01-01T08:00:00+00:00", "raw_text": 'bad night, "fog"',
+    "extracted_json": {
+        "symptoms": ["headache", "fog"], "sleep": "low", "sleep_hours": "5", "food": [], "stress": "high",
+        "exercise": False, "mood": "bad", "condition": "diabetes",
+        "condition_data": {"glucose": ["95", "160"], "insulin": "yes", "ketones": "trace"},
+        "extraction": {"source": "local", "confidence": 0.9}, "note": "kept",
+    },
+}
+
+
+def test_schema_has_a_column_per_condition_key():
+    names = [name for name, _ in export.schema(CONFIGS)]
+    assert names[:4] == ["id", "date", "created_at", "raw_text"]
+    assert ("condition_data.insulin", "bool") in export.schema(CONFIGS)
+    assert names[-3:] == ["extraction.source", "extraction.confidence", "extra"]
+
+
+def test_flatten_is_typed_and_lossless():
+    flat = export.flatten(ROW, export._plan(export.schema(CONFIGS)))
+    assert flat["symptoms"] == ["headache", "fog"] and flat["food"] == []
+    assert flat["sleep_hours"] == 5.0 and flat["exercise"] is False
+    assert flat["condition_data.glucose"] == "95; 160" and flat["condition_data.insulin"] is True
+    assert flat["condition_data.carbs"] is None
+    assert (flat["extraction.source"], flat["extraction.confidence"]) == ("local", 0.9)
+    assert json.loads(flat["extra"]) == {"note": "kept", "condition_data": {"ketones": "trace"}}
+    assert ROW["extracted_json"]["condition_data"]["ketones"] == "trace"        # the row isn't consumed
+
+
+def test_csv_quotes_and_joins_lists():
+    writer = export.CSVWriter(export.schema(CONFIGS))
+    data = (writer.write([ROW]) + writer.write([ROW]) + writer.close()).decode()
+    header, first, second = list(csv.reader(io.StringIO(data)))
+    assert header == [name for name, _ in export.schema(CONFIGS)]
+    row = dict(zip(header, first))
+    assert row["raw_text"] == 'bad night, "fog"' and row["symptoms"] == "headache; fog"
+    assert row["exercise"] == "false" and first == second
+
+
+def test_empty_csv_still_has_a_header():
+    writer = export.CSVWriter(export.schema(CONFIGS))
+    assert writer.close().decode().strip().split(",")[0] == "id"
+
+
+def test_parquet_round_trips_in_row_groups():
+    pq = pytest.importorskip("pyarrow.parquet")
+    writer = export.ParquetWriter(export.schema(CONFIGS), row_group_rows=3)
+    data = b"".join(writer.write([{**ROW, "id": f"e{i}"} for i in range(p * 2, p * 2 + 2)]) for p in range(4))
+    data += writer.close()
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    assert parquet.metadata.num_rows == 8 and parquet.metadata.num_row_groups == 2
+    table = parquet.read()
+    assert table.column("id").to_pylist() == [f"e{i}" for i in range(8)]
+    assert table.column("symptoms").to_pylist()[0] == ["headache", "fog"]
+    assert table.column("sleep_hours").to_pylist()[0] == 5.0
+
+
+def test_endpoint_streams_every_page_oldest_first(app, monkeypatch):
+    main = app
+    monkeypatch.setattr(main, "EXPORT_PAGE_SIZE", 4)
+
+    async def go():
+        rows = [{"user_id": "u1", "date": f"2026-01-{d:02d}", "raw_text": str(d), "status": "confirmed",
+                 "extracted_json": {"mood": "good"}} for d in range(1, 11)]
+        await main.storage.insert_entries(rows)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            r = await client.get("/entries/u1/export")
+            assert r.headers["content-type"] == "application/x-ndjson"
+            assert r.headers["content-disposition"].startswith('attachment; filename="koru-u1-')
+            lines = [json.loads(line) for line in r.text.splitlines()]
+            assert [line["raw_text"] for line in lines] == [str(d) for d in range(1, 11)]
+
+            r = await client.get("/entries/u1/export", params={"format": "csv"})
+            assert len(r.text.splitlines()) == 11
+            assert (await client.get("/entries/u1/export", params={"format": "xlsx"})).status_code == 400
+
+    asyncio.run(go())
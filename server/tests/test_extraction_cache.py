@@ -0,0 +1,60 @@
+import asyncio
+
+from extraction_cache import ExtractionCache, cache_key
+
+
+def test_key_ignores_case_and_whitespace_but_not_model_or_prompt():
+    key = cache_key("Slept 5h,  headache", "m", "1")
+    assert cache_key("slept 5h, HEADACHE ", "m", "1") == key
+    assert cache_key("slept 5h, headache", "other", "1") != key
+    assert cache_key("slept 5h, headache", "m", "2") != key
+
+
+def test_memory_tier_is_lru_and_returns_copies():
+    async def go():
+        cache = ExtractionCache(max_entries=2)
+        await cache.put("a", {"symptoms": ["headache"]})
+        await cache.put("b", {})
+        got = await cache.get("a")
+        got["symptoms"].append("mutated")
+        assert await cache.get("a") == {"symptoms": ["headache"]}
+        await cache.put("c", {})                  # evicts b, the least recently used
+        assert await cache.get("b") is None
+        assert cache.hits == 2 and cache.misses == 1
+
+    asyncio.run(go())
+
+
+def test_expired_results_are_misses():
+    async def go():
+        cache = ExtractionCache(ttl_seconds=-1)
+        await cache.put("a", {})
+        assert await cache.get("a") is None
+
+    asyncio.run(go())
+
+
+def test_persistent_tier_survives_a_restart(tmp_path):
+    async def go():
+        path = str(tmp_path / "cache.sqlite3")
+        first = ExtractionCache(db_path=path)
+        await first.put("a", {"mood": "good"})
+        first.close()
+        second = ExtractionCache(db_path=path)
+        assert await second.get("a") == {"mood": "good"}
+        assert second.persistent_hits == 1
+        second.close()
+
+    asyncio.run(go())
+
+
+def test_identical_check_in_text_calls_gemini_once(app):
+    main = app
+
+    async def go():
+        first = await main.extract_entry("Slept 5h, headache after coffee")
+        second = await main.extract_entry("slept 5h,  headache after COFFEE")
+        assert first == second
+        assert main.gemini.calls == 1
+
+    asyncio.run(go())
@@ -0,0 +1,90 @@
+import time
+import asyncio
+
+import pytest
+
+from gemini_scheduler import GeminiScheduler, CircuitBreaker, SchedulerRejected
+
+
+def _half_open_scheduler(**kwargs) -> GeminiScheduler:
+    async def call(prompt):
+        return "ok"
+
+    breaker = CircuitBreaker(threshold=1, cooldown=0.0)
+    breaker.failures = 1
+    breaker.opened_at = time.monotonic() - 1
+    return GeminiScheduler(call, rpm=1000, tpm=1_000_000, breaker=breaker, **kwargs)
+
+
+def test_rejected_half_open_probe_leaves_the_probe_free():
+    async def go():
+        scheduler = _half_open_scheduler(max_queue=0)
+        with pytest.raises(SchedulerRejected, match="queue is full"):
+            async with scheduler.slot():
+                pass
+        assert scheduler.breaker.state == "half_open" and not scheduler.breaker.probing
+
+        scheduler.max_queue = 10
+        assert await scheduler.run("probe") == "ok"
+        assert scheduler.breaker.state == "closed"
+
+    asyncio.run(go())
+
+
+def test_cancelled_half_open_probe_leaves_the_probe_free():
+    async def go():
+        scheduler = _half_open_scheduler(max_concurrency=0)  # nothing is ever granted
+
+        async def probe():
+            async with scheduler.slot():
+                pass
+
+        task = asyncio.create_task(probe())
+        await asyncio.sleep(0.01)
+        assert scheduler.breaker.probing
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert scheduler.breaker.state == "half_open" and not scheduler.breaker.probing
+
+        scheduler.max_concurrency = 1
+        scheduler._wakeup.set()
+        assert await scheduler.run("probe") == "ok"
+        assert scheduler.breaker.state == "closed"
+
+    asyncio.run(go())
+
+
+def test_cancelled_ordinary_waiter_keeps_the_probe_taken():
+    async def go():
+        async def call(prompt):
+            return "ok"
+
+        breaker = CircuitBreaker(threshold=1, cooldown=0.0)
+        scheduler = GeminiScheduler(call, rpm=1000, tpm=1_000_000, breaker=breaker, max_concurrency=0)
+
+        async def wait_for_slot():
+            async with scheduler.slot():
+                pass
+
+        ordinary = asyncio.create_task(wait_for_slot())   # queued while the breaker is closed
+        await asyncio.sleep(0.01)
+        breaker.failures, breaker.opened_at = 1, time.monotonic() - 1
+        probe = asyncio.create_task(wait_for_slot())       # takes the half-open probe
+        await asyncio.sleep(0.01)
+        assert breaker.probing
+
+        ordinary.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await ordinary
+        assert breaker.probing
+        with pytest.raises(SchedulerRejected, match="circuit breaker"):
+            async with scheduler.slot():
+                pass
+
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        assert not breaker.probing
+
+    asyncio.run(go())
@@ -0,0 +1,113 @@
+import asyncio
+
+import httpx
+
+from health import HealthMonitor, LazyClient
+
+
+def test_lazy_client_builds_once_on_first_use():
+    built = []
+
+    def factory():
+        built.append(1)
+        return type("Client", (), {"name": "sdk"})()
+
+    client = LazyClient(factory)
+    assert not client.built and built == []
+    assert client.name == "sdk" and client.name == "sdk"
+    assert client.built and built == [1]
+
+    warmed = LazyClient(factory)
+    asyncio.run(warmed.warm())
+    assert warmed.built and len(built) == 2
+
+
+def test_probe_outcomes():
+    async def ok():
+        return None
+
+    async def degraded():
+        return "circuit breaker open"
+
+    async def down():
+        raise ConnectionError("refused")
+
+    async def hangs():
+        await asyncio.sleep(10)
+
+    monitor = HealthMonitor(timeout=0.05)
+    for name, probe in (("ok", ok), ("degraded", degraded), ("down", down), ("hangs", hangs)):
+        monitor.add(name, probe)
+
+    asyncio.run(monitor.run_once())
+    asyncio.run(monitor.run_once())
+    snapshot = monitor.snapshot()
+    assert {name: r["status"] for name, r in snapshot.items()} == {
+        "ok": "ok", "degraded": "degraded", "down": "error", "hangs": "error",
+    }
+    assert snapshot["down"]["detail"] == "refused" and snapshot["hangs"]["detail"] == "timed out after 0.05s"
+    assert snapshot["down"]["consecutive_failures"] == 2 and snapshot["ok"]["consecutive_failures"] == 0
+
+
+def test_ready_needs_every_critical_dependency_fresh():
+    state = {"storage": None}
+
+    async def storage():
+        if state["storage"]:
+            raise RuntimeError(state["storage"])
+
+    async def gemini():
+        raise RuntimeError("no key")
+
+    monitor = HealthMonitor(interval=10)
+    monitor.add("storage", storage)
+    monitor.add("gemini", gemini, critical=False)
+    assert monitor.ready() == (False, {"failing": {"storage": "not checked yet"}})
+
+    asyncio.run(monitor.run_once())
+    assert monitor.ready() == (True, {"failing": {}})          # a non-critical failure doesn't count
+
+    state["storage"] = "down"
+    asyncio.run(monitor.run_once())
+    assert monitor.ready() == (False, {"failing": {"storage": "down"}})
+
+    state["storage"] = None
+    asyncio.run(monitor.run_once())
+    monitor.results["storage"]["_checked"] -= 31                # no check for longer than stale_after
+    assert monitor.ready() == (False, {"failing": {"storage": "stale"}})
+
+
+def test_live_follows_the_monitor_loop_and_stop_drains():
+    async def go():
+        monitor = HealthMonitor(interval=0.01)
+        monitor.add("storage", lambda: asyncio.sleep(0))
+        assert monitor.live() == (False, {"monitor": "stopped"})
+        monitor.start()
+        await asyncio.sleep(0.03)
+        assert monitor.live()[0] and monitor.ready()[0]
+        await monitor.stop()
+        assert monitor.ready() == (False, {"status": "draining"})
+        assert not monitor.live()[0]
+
+    asyncio.run(go())
+
+
+def test_endpoints_read_the_last_results(app, monkeypatch):
+    main = app
+    monitor = HealthMonitor()
+    monitor.add("storage", main._storage_health)
+    monitor.add("gemini", main._gemini_health, critical=False)
+    monkeypatch.setattr(main, "health_monitor", monitor)
+
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            assert (await client.get("/health/ready")).status_code == 503
+            assert (await client.get("/health")).status_code == 503
+
+            await monitor.run_once()
+            assert (await client.get("/health/ready")).json() == {"status": "ready", "failing": {}}
+            body = (await client.get("/health")).json()
+            assert body["services"] == {"fastapi": "ok", "sqlite": "ok", "gemini": "ok"}
+            assert "job_queue" in body and "gemini_scheduler" in body
+
+    asyncio.run(go())
@@ -0,0 +1,150 @@
+import json
+import time
+import asyncio
+
+import httpx
+
+from idempotency import IdempotencyStore, fingerprint
+
+CHECK_IN = {"user_id": "u1", "text": "slept badly", "date": "2026-01-01"}
+
+
+def _client(main) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+
+
+def test_key_lifecycle(tmp_path):
+    store = IdempotencyStore(str(tmp_path / "idempotency.sqlite3"))
+    first = fingerprint("/entries/draft", CHECK_IN)
+    assert fingerprint("/entries/draft", dict(reversed(list(CHECK_IN.items())))) == first
+    assert fingerprint("/entries/draft/stream", CHECK_IN) != first
+
+    assert store.begin("u1", "k", first) == ("new", None)
+    assert store.begin("u1", "k", first) == ("in_progress", None)
+    assert store.begin("u1", "k", "other") == ("mismatch", None)
+    assert store.begin("u2", "k", first) == ("new", None)          # keys are per user
+    store.finish("u1", "k", 202, {"entry_id": "e1"})
+    assert store.begin("u1", "k", first) == ("replay", (202, {"entry_id": "e1"}))
+
+    store.begin("u1", "failed", first)
+    store.release("u1", "failed")
+    assert store.begin("u1", "failed", first) == ("new", None)
+    store.close()
+
+
+def test_abandoned_reservations_are_taken_over_and_old_keys_purged(tmp_path):
+    store = IdempotencyStore(str(tmp_path / "idempotency.sqlite3"), lease_seconds=0.01, ttl_seconds=0.05)
+    store.begin("u1", "k", "f")
+    time.sleep(0.02)
+    assert store.begin("u1", "k", "other") == ("mismatch", None)   # only the same request takes it over
+    assert store.begin("u1", "k", "f") == ("new", None)
+    time.sleep(0.06)
+    assert store.purge() == 1
+    store.close()
+
+
+def test_retried_draft_is_replayed_without_a_second_row(app):
+    main = app
+
+    async def go():
+        async with _client(main) as client:
+            headers = {"Idempotency-Key": "abc"}
+            first = await client.post("/entries/draft", json=CHECK_IN, headers=headers)
+            again = await client.post("/entries/draft", json=CHECK_IN, headers=headers)
+            assert first.status_code == again.status_code == 202
+            assert again.json() == first.json() and again.headers["Idempotent-Replayed"] == "true"
+            assert main.job_queue.stats()["depth"] == 1
+
+            other = await client.post("/entries/draft", json={**CHECK_IN, "text": "slept well"}, headers=headers)
+            assert other.status_code == 422
+
+            main.idempotency.begin("u1", "busy", fingerprint("/entries/draft", main.CheckInRequest(**CHECK_IN).model_dump()))
+            assert (await client.post("/entries/draft", json=CHECK_IN, headers={"Idempotency-Key": "busy"})).status_code == 409
+
+    asyncio.run(go())
+
+
+def test_failed_draft_releases_its_key(app):
+    main = app
+
+    async def go():
+        insert = main.storage.insert_entries
+
+        async def broken(rows):
+            raise RuntimeError("database down")
+
+        main.storage.insert_entries = broken
+        async with _client(main) as client:
+            headers = {"Idempotency-Key": "abc"}
+            assert (await client.post("/entries/draft", json=CHECK_IN, headers=headers)).status_code == 500
+            main.storage.insert_entries = insert
+            assert (await client.post("/entries/draft", json=CHECK_IN, headers=headers)).status_code == 202
+
+    asyncio.run(go())
+
+
+def test_finished_stream_is_replayed_as_events(app):
+    main = app
+
+    async def go():
+        async with _client(main) as client:
+            headers = {"Idempotency-Key": "abc"}
+            first = await client.post("/entries/draft/stream", json=CHECK_IN, headers=headers)
+            again = await client.post("/entries/draft/stream", json=CHECK_IN, headers=headers)
+        done = [json.loads(line[6:]) for line in first.text.splitlines() if line.startswith("data: ")][-1]
+        replayed = [json.loads(line[6:]) for line in again.text.splitlines() if line.startswith("data: ")][-1]
+        assert again.headers["Idempotent-Replayed"] == "true" and replayed == done
+        assert main.gemini.calls == 1 and len(await main.storage.history("u1")) == 1
+
+    asyncio.run(go())
+
+
+def test_confirming_an_unchanged_entry_writes_nothing(app):
+    main = app
+
+    async def go():
+        await main.extract_entry(CHECK_IN["text"])  # cached, so the draft is saved inline
+        async with _client(main) as client:
+            draft = (await client.post("/entries/draft", json=CHECK_IN)).json()
+            entry_id, data = draft["entry_id"], draft["extracted_data"]
+            version = main.data_versions.get("u1")
+
+            updates = []
+            update_aggregates = main.update_aggregates
+
+            async def counted(*args, **kwargs):
+                updates.append(args)
+                return await update_aggregates(*args, **kwargs)
+
+            main.update_aggregates = counted
+            try:
+                r = await client.patch(f"/entries/{entry_id}/confirm", json={"extracted_data": data})
+                assert r.json() == {"message": "Entry unchanged.", "entry_id": entry_id, "changed": []}
+                assert updates == [] and main.data_versions.get("u1") == version
+
+                r = await client.patch(f"/entries/{entry_id}/confirm", json={"extracted_data": {**data, "mood": "good"}})
+                assert r.json()["changed"] == ["mood"] and len(updates) == 1
+                assert main.data_versions.get("u1") > version
+            finally:
+                main.update_aggregates = update_aggregates
+            assert (await client.patch("/entries/missing/confirm", json={"extracted_data": {}})).status_code == 404
+
+    asyncio.run(go())
+
+
+def test_one_entry_per_day_overwrites_the_days_entry(app, monkeypatch):
+    main = app
+    monkeypatch.setattr(main, "ENTRY_PER_DAY", True)
+
+    async def go():
+        await main.extract_entry("slept badly")
+        await main.extract_entry("slept well")
+        async with _client(main) as client:
+            first = (await client.post("/entries/draft", json=CHECK_IN)).json()
+            second = (await client.post("/entries/draft", json={**CHECK_IN, "text": "slept well"})).json()
+        assert second["entry_id"] == first["entry_id"]
+        rows = await main.storage.history("u1", "id, raw_text")
+        assert [row["raw_text"] for row in rows] == ["slept well"]
+        assert (await main.storage.get_aggregates("u1"))["total"] == 1
+
+    asyncio.run(go())
@@ -0,0 +1,127 @@
+import asyncio
+
+import httpx
+import pytest
+
+from benchmarks.synthetic import synthetic_entries
+
+REPLY = {
+    "summary": "Things are ok.",
+    "insights": [{"title": "Stress and sleep", "detail": "58% ...", "kind": "warning", "source": "patterns"},
+                 {"title": "Untyped", "detail": "...", "kind": "alarm"}, {"bad": 1}, "x"],
+}
+
+
+@pytest.fixture
+def insights(app, monkeypatch):
+    """main with call_gemini replaced by a recorder; set `fail` to make it raise."""
+    main = app
+    calls = {"prompts": [], "fail": False}
+
+    async def call_gemini(prompt, retries=2, priority=0):
+        calls["prompts"].append((prompt, priority))
+        await asyncio.sleep(0.05)
+        if calls["fail"]:
+            raise RuntimeError("503 UNAVAILABLE")
+        return REPLY
+
+    monkeypatch.setattr(main, "call_gemini", call_gemini)
+    return main, calls
+
+
+async def _seed(main, user_id: str, n: int, condition: str | None = None, seed: int = 1):
+    rows = synthetic_entries(n, user_id=user_id, condition=condition, seed=seed)
+    for row in rows:
+        row["id"] = user_id + row["id"]
+        row.update(main._derived_columns(row["extracted_json"]))
+    await main.storage.insert_entries(rows)
+
+
+def _client(main) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+
+
+def test_reply_is_kept_to_the_documented_shape(app):
+    main = app
+    cleaned = main._clean_insights(REPLY)
+    assert cleaned["summary"] == "Things are ok."
+    assert [(i["title"], i["kind"]) for i in cleaned["insights"]] == [("Stress and sleep", "warning"), ("Untyped", "trend")]
+    with pytest.raises(ValueError):
+        main._clean_insights(["not", "an", "object"])
+
+
+def test_short_history_never_calls_gemini(insights):
+    main, calls = insights
+
+    async def go():
+        await _seed(main, "few", 5)
+        async with _client(main) as client:
+            body = (await client.get("/insights/few")).json()
+        assert body["has_enough_data"] is False and calls["prompts"] == []
+
+    asyncio.run(go())
+
+
+def test_generated_once_and_served_until_the_digest_changes(insights):
+    main, calls = insights
+
+    async def go():
+        await _seed(main, "u1", 120, "diabetes")
+        params = {"condition": "diabetes"}
+        async with _client(main) as client:
+            r = await client.get("/insights/u1", params=params)
+            assert r.status_code == 202 and r.json()["status"] == "generating"
+            assert (await client.get("/insights/u1", params=params)).status_code == 202   # already claimed
+            r = await client.get("/insights/u1", params={**params, "wait": 5})
+            assert r.json()["status"] == "ready" and len(r.json()["insights"]) == 2
+            assert len(calls["prompts"]) == 1 and calls["prompts"][0][1] == main.BULK
+
+            main.data_versions.bump("u1")                         # a write that moved nothing
+            assert (await client.get("/insights/u1", params=params)).json()["status"] == "ready"
+            assert len(calls["prompts"]) == 1
+
+            request = main.CheckInRequest(user_id="u1", text="awful", date="2026-01-01")
+            await main._save_entry(request, {"symptoms": ["migraine"], "mood": "bad", "stress": "high"})
+            r = await client.get("/insights/u1", params=params)
+            assert r.json()["status"] == "refreshing" and r.json()["insights"]   # the old ones meanwhile
+            await asyncio.gather(*main._insight_tasks)
+            assert (await client.get("/insights/u1", params=params)).json()["status"] == "ready"
+            assert len(calls["prompts"]) == 2
+
+    asyncio.run(go())
+
+
+def test_failure_is_reported_and_retried_after_the_lease(insights):
+    main, calls = insights
+    calls["fail"] = True
+    main.insight_store.lease_seconds = 0.3
+
+    async def go():
+        await _seed(main, "u2", 30)
+        async with _client(main) as client:
+            r = await client.get("/insights/u2", params={"wait": 5})
+            assert r.json() == {"status": "failed", "has_enough_data": True, "error": "503 UNAVAILABLE"}
+            await client.get("/insights/u2")
+            assert len(calls["prompts"]) == 1                      # backed off while the lease runs
+
+            await asyncio.sleep(0.35)
+            calls["fail"] = False
+            r = await client.get("/insights/u2", params={"wait": 5})
+            assert r.json()["status"] == "ready" and len(calls["prompts"]) == 2
+
+    asyncio.run(go())
+
+
+def test_prompt_size_does_not_grow_with_history(insights):
+    main, _ = insights
+
+    async def go():
+        tokens = {}
+        async with _client(main) as client:
+            for n in (30, 3000):
+                await _seed(main, f"s{n}", n, "diabetes", seed=n)
+                r = await client.get(f"/insights/s{n}", params={"condition": "diabetes", "wait": 5})
+                tokens[n] = r.json()["prompt_tokens"]
+        assert tokens[3000] < tokens[30] * 1.5
+
+    asyncio.run(go())
@@ -0,0 +1,124 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pytest
+
+import insights_batch
+from benchmarks.synthetic import synthetic_entries
+
+USERS = [f"u{i:02d}" for i in range(6)]
+
+
+async def _seed(main, per_user: int = 8):
+    for n, user_id in enumerate(USERS):
+        rows = synthetic_entries(per_user, seed=n, user_id=user_id)
+        for row in rows:
+            del row["id"]  # synthetic ids repeat across users
+        await main.storage.insert_entries(rows)
+
+
+@pytest.fixture
+def batch(app, monkeypatch):
+    """insights_batch on the test stores: the pool runs in a thread, ranges are a couple of users each."""
+    loops = []
+
+    def init():
+        init_worker()
+        loops.append(insights_batch._worker_loop)
+
+    def pool(max_workers, mp_context, initializer):
+        return ThreadPoolExecutor(max_workers=1, initializer=init)
+
+    init_worker = insights_batch._init_worker
+    ranges = insights_batch.user_ranges
+    monkeypatch.setattr(insights_batch, "ProcessPoolExecutor", pool)
+    monkeypatch.setattr(insights_batch, "user_ranges", lambda after_user: ranges(after_user, chunk_entries=16))
+    yield app
+    for loop in loops:  # a pool process would take its loop with it
+        loop.close()
+
+
+def test_histories_are_grouped_per_user_within_a_range(app):
+    main = app
+
+    async def go():
+        await _seed(main)
+        seen = [(user_id, len(rows)) async for user_id, rows in
+                insights_batch.user_histories("u01", "u04", page_size=5)]
+        assert seen == [("u02", 8), ("u03", 8), ("u04", 8)]
+        ranges = [r async for r in insights_batch.user_ranges(None, chunk_entries=20)]
+        assert ranges == [(None, "u02", 3, 24), ("u02", "u05", 3, 24)]
+
+    asyncio.run(go())
+
+
+def test_only_changed_rows_are_written_and_newer_live_rows_are_left_alone(app):
+    main = app
+
+    async def go():
+        await main.storage.save_aggregates("same", {"total": 1, "avg": 0.1 + 0.2})
+        await asyncio.sleep(0.01)
+        read_at = datetime.now(timezone.utc)
+        await asyncio.sleep(0.01)
+        await main.storage.save_aggregates("live", {"total": 1})            # a write landed after the read
+        written, skipped = await insights_batch.write_results(
+            [("same", {"total": 1, "avg": 0.3}), ("live", {"total": 2}), ("new", {"total": 3})], read_at,
+        )
+        assert (written, skipped) == (["new"], 1)
+        assert await main.storage.get_aggregates("live") == {"total": 1}
+
+    asyncio.run(go())
+
+
+def test_run_backfills_and_repairs_drift(batch, tmp_path):
+    main = batch
+
+    async def go():
+        await _seed(main)
+        rebuilt = main._aggregates_from_entries(await main.storage.history("u03"))
+        await main.storage.save_aggregates("u03", {**rebuilt, "total": 999})
+        await main.storage.save_aggregates("u04", main._aggregates_from_entries(await main.storage.history("u04")))
+        version = main.data_versions.get("u03")
+
+        state = await insights_batch.run(1, checkpoint_path=str(tmp_path / "checkpoints.sqlite3"))
+        assert (state["users"], state["entries"], state["written"], state["failed"]) == (6, 48, 5, 0)
+        for user_id in USERS:
+            stored = await main.storage.get_aggregates(user_id)
+            assert stored == main._aggregates_from_entries(await main.storage.history(user_id))
+        assert main.data_versions.get("u03") > version
+
+    asyncio.run(go())
+
+
+def test_failed_run_resumes_from_its_checkpoint(batch, tmp_path, monkeypatch):
+    main = batch
+    path = str(tmp_path / "checkpoints.sqlite3")
+    process_range = insights_batch.process_range
+    calls, failures = [], ["u03"]
+
+    def flaky(after_user, last_user):
+        calls.append(last_user)
+        if last_user in failures:
+            failures.remove(last_user)
+            raise RuntimeError("worker died")
+        return process_range(after_user, last_user)
+
+    monkeypatch.setattr(insights_batch, "process_range", flaky)
+
+    async def go():
+        await _seed(main)
+        with pytest.raises(RuntimeError):
+            await insights_batch.run(1, checkpoint_path=path)
+        assert await main.storage.get_aggregates("u04") is None
+
+        calls.clear()
+        state = await insights_batch.run(1, checkpoint_path=path)
+        assert calls == ["u03", "u05"]                 # the first range isn't redone
+        assert state["users"] == 6 and state["finished_at"] is not None
+
+        calls.clear()
+        await insights_batch.run(1, fresh=True, checkpoint_path=path)
+        assert calls == ["u01", "u03", "u05"]
+
+    asyncio.run(go())
@@ -0,0 +1,141 @@
+import time
+import asyncio
+
+import httpx
+
+import job_queue
+from job_queue import JobQueue, backoff_delay
+
+
+def _client(main) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+
+
+def test_jobs_are_claimed_once_in_order(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    queue.enqueue("e1", {"n": 1})
+    queue.enqueue("e2", {"n": 2})
+    first, second = queue.claim(), queue.claim()
+    assert (first["entry_id"], first["payload"], first["attempts"]) == ("e1", {"n": 1}, 1)
+    assert second["entry_id"] == "e2"
+    assert queue.claim() is None
+    queue.complete(first["id"], {"mood": "good"})
+    assert queue.get("e1")["status"] == "done" and queue.get("e1")["result"] == {"mood": "good"}
+    queue.close()
+
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), lease_seconds=0.01)
+    queue.enqueue("e1", {})
+    queue.claim()
+    time.sleep(0.02)                       # the worker died holding it
+    again = queue.claim()
+    assert again["entry_id"] == "e1" and again["attempts"] == 2
+    queue.close()
+
+
+def test_backoff_is_jittered_and_capped():
+    delays = [backoff_delay(3) for _ in range(200)]
+    assert all(0 <= d <= 16 for d in delays) and len(set(delays)) > 1
+    assert backoff_delay(30) <= 300
+
+
+def test_failures_back_off_then_give_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "backoff_delay", lambda attempt: 60.0)
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), max_attempts=2)
+    queue.enqueue("e1", {})
+    assert queue.fail(queue.claim(), "boom") == 60.0
+    assert queue.claim() is None           # not ready until the backoff passes
+    queue._db.execute("UPDATE jobs SET run_after = 0")
+    assert queue.fail(queue.claim(), "boom again") is None
+    job = queue.get("e1")
+    assert (job["status"], job["attempts"], job["error"]) == ("failed", 2, "boom again")
+    queue.close()
+
+
+def test_enqueue_replaces_only_finished_jobs(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    queue.enqueue("e1", {"v": 1})
+    job = queue.claim()
+    queue.enqueue("e1", {"v": 2})          # still running: left alone
+    assert queue.get("e1")["status"] == "running"
+    queue.complete(job["id"], {})
+    queue.enqueue("e1", {"v": 3})
+    assert queue.get("e1")["status"] == "queued" and queue.claim()["payload"] == {"v": 3}
+    queue.close()
+
+
+def test_purge_drops_old_finished_jobs(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    queue.enqueue("e1", {})
+    queue.enqueue("e2", {})
+    queue.complete(queue.claim()["id"], {})
+    assert queue.purge(-1) == 1
+    assert queue.get("e1") is None and queue.stats()["depth"] == 1
+    queue.close()
+
+
+def _with_worker(main, monkeypatch, go):
+    async def run():
+        monkeypatch.setattr(main, "_job_wakeup", asyncio.Event())
+        worker = asyncio.create_task(main._extraction_worker())
+        try:
+            await go()
+        finally:
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+
+    asyncio.run(run())
+
+
+def test_draft_is_queued_then_filled_in_by_a_worker(app, monkeypatch):
+    main = app
+
+    async def go():
+        async with _client(main) as client:
+            r = await client.post("/entries/draft", json={"user_id": "u1", "text": "slept badly", "date": "2026-01-01"})
+            assert r.status_code == 202 and r.json()["status"] == "queued"
+            entry_id = r.json()["entry_id"]
+
+            r = await client.get(f"/entries/draft/{entry_id}", params={"wait": 5})
+            assert r.json()["status"] == "done" and r.json()["attempts"] == 1
+
+        row = await main.storage.get_entry(entry_id)
+        assert row["status"] == "confirmed" and row["extracted_json"] == r.json()["extracted_data"]
+        assert (await main.storage.get_aggregates("u1"))["total"] == 1
+
+    _with_worker(main, monkeypatch, go)
+
+
+def test_draft_that_keeps_failing_is_marked_failed(app, monkeypatch):
+    main = app
+    main.job_queue.max_attempts = 1
+
+    def fail(prompt):
+        raise RuntimeError("upstream down")
+
+    main.gemini.response = fail
+
+    async def go():
+        async with _client(main) as client:
+            r = await client.post("/entries/draft", json={"user_id": "u1", "text": "slept badly", "date": "2026-01-01"})
+            entry_id = r.json()["entry_id"]
+            r = await client.get(f"/entries/draft/{entry_id}", params={"wait": 5})
+        assert r.json()["status"] == "failed" and "upstream down" in r.json()["error"]
+        assert (await main.storage.get_entry(entry_id))["status"] == "failed"
+
+    _with_worker(main, monkeypatch, go)
+
+
+def test_cached_text_is_answered_inline(app):
+    main = app
+
+    async def go():
+        await main.extract_entry("slept badly")
+        async with _client(main) as client:
+            r = await client.post("/entries/draft", json={"user_id": "u1", "text": "slept badly", "date": "2026-01-01"})
+            assert r.status_code == 200 and r.json()["status"] == "done"
+            assert (await client.get("/entries/draft/nope")).status_code == 404
+        assert main.job_queue.stats()["depth"] == 0
+
+    asyncio.run(go())
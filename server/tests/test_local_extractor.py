@@ -0,0 +1,32 @@
+from local_extractor import extract_local
+
+THRESHOLD = 0.8   # LOCAL_EXTRACTION_THRESHOLD's default
+
+
+def test_negated_mood_is_not_read_as_stated():
+    extracted, confidence = extract_local("slept 5h, headache, coffee, stressed, not happy")
+    assert extracted["mood"] == "bad"
+    assert confidence < THRESHOLD
+
+
+def test_negated_low_stress_is_not_low():
+    extracted, confidence = extract_local("slept 8h, coffee, not relaxed, happy")
+    assert extracted["stress"] == "medium"
+    assert confidence < THRESHOLD
+
+
+def test_negated_high_stress_reads_low():
+    extracted, _ = extract_local("slept 8h, not stressed, happy")
+    assert extracted["stress"] == "low"
+
+
+def test_inferred_mood_goes_to_gemini():
+    extracted, confidence = extract_local("slept 5h, headache, coffee, stressed")
+    assert extracted["stress"] == "high" and extracted["mood"] == "bad"
+    assert confidence < THRESHOLD
+
+
+def test_fully_stated_checkin_stays_on_fast_path():
+    extracted, confidence = extract_local("slept 7h, yoga, salad, relaxed, happy")
+    assert extracted["stress"] == "low" and extracted["mood"] == "good" and extracted["exercise"]
+    assert confidence >= THRESHOLD
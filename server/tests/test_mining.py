@@ -0,0 +1,68 @@
+import random
+from datetime import date, timedelta
+
+from mining import incidence_matrix, mine_associations
+
+
+def _days(n: int) -> list[str]:
+    start = date(2026, 1, 1)
+    return [(start + timedelta(days=i)).isoformat() for i in range(n)]
+
+
+def _find(results: list[dict], cause: str, effect: str, lag_days: int) -> dict | None:
+    return next((r for r in results if (r["cause"], r["effect"], r["lag_days"]) == (cause, effect, lag_days)), None)
+
+
+def test_incidence_matrix_is_binary_per_entry():
+    matrix, vocab = incidence_matrix([["food:wine", "food:wine", "mood:bad"], [], ["mood:bad"]])
+    assert sorted(vocab) == ["food:wine", "mood:bad"]
+    dense = matrix.toarray()
+    assert dense.shape == (3, 2) and dense.max() == 1
+    assert dense[:, vocab.index("mood:bad")].tolist() == [1, 0, 1]
+
+
+def test_planted_same_day_association_is_found():
+    rng = random.Random(1)
+    features = []
+    for _ in range(100):
+        day = ["stress:high"] if rng.random() < 0.3 else ["stress:low"]
+        if "stress:high" in day or rng.random() < 0.1:
+            day.append("symptom:headache")
+        features.append(day)
+
+    results = mine_associations(features, _days(100))
+    found = _find(results, "stress:high", "symptom:headache", 0)
+    assert found is not None
+    assert found["confidence"] == 100 and found["lift"] > 2
+    assert _find(results, "stress:low", "symptom:headache", 0) is None    # less often than chance
+
+
+def test_planted_next_day_association_is_found():
+    features = [["food:wine"] if i % 3 == 0 else ["food:salad"] for i in range(90)]
+    for i in range(90):
+        if i % 3 == 1:
+            features[i].append("symptom:headache")
+
+    results = mine_associations(features, _days(90))
+    found = _find(results, "food:wine", "symptom:headache", 1)
+    assert found is not None and found["confidence"] == 100
+    assert _find(results, "food:wine", "symptom:headache", 0) is None
+
+
+def test_next_day_pairs_skip_gaps():
+    features = [["food:wine"], ["symptom:headache"]] * 10
+    dates = [(date(2026, 1, 1) + timedelta(days=i * 2)).isoformat() for i in range(20)]   # every other day
+    assert all(r["lag_days"] == 0 for r in mine_associations(features, dates, min_support=1))
+
+
+def test_same_family_pairs_and_rare_pairs_are_dropped():
+    features = [["sleep:low", "sleep:<6h", "mood:bad"]] * 2 + [["mood:good"]] * 10
+    results = mine_associations(features, _days(12), min_support=3)
+    assert results == []
+    results = mine_associations(features, _days(12), min_support=2)
+    assert _find(results, "sleep:low", "mood:bad", 0) is not None
+    assert _find(results, "sleep:low", "sleep:<6h", 0) is None
+
+
+def test_empty_history_has_no_associations():
+    assert mine_associations([], []) == []
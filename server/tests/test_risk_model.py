@@ -0,0 +1,97 @@
+import asyncio
+
+import risk_model
+from benchmarks.backtest_risk import planted_history
+
+
+def _history(days: int = 60) -> list[dict]:
+    rows = planted_history(1, days, seed=3)
+    for row in rows:
+        row.pop("truth")
+    return rows
+
+
+def _edited(row: dict, **fields) -> dict:
+    return {**row, "extracted_json": {**row["extracted_json"], **fields}}
+
+
+def test_editing_the_last_day_matches_a_fresh_fit():
+    rows = _history()
+    state = risk_model.fit(rows)
+    edited = _edited(rows[-1], symptoms=[], stress="low")
+    risk_model.remove(state, rows[-1])        # what a confirm edit does: remove the old, add the new
+    risk_model.update(state, edited)
+    assert state == risk_model.fit(rows[:-1] + [edited])
+
+
+def test_replacing_a_last_day_entry_in_place_matches_a_fresh_fit():
+    rows = _history()
+    state = risk_model.fit(rows)
+    edited = _edited(rows[-1], symptoms=["headache"], stress="high", sleep_hours=4)
+    risk_model.update(state, edited)
+    assert state == risk_model.fit(rows[:-1] + [edited])
+
+
+def test_second_entry_and_its_removal_on_the_last_day():
+    rows = _history()
+    state = risk_model.fit(rows)
+    extra = {"id": "extra", "date": rows[-1]["date"], "extracted_json": {"symptoms": ["fatigue"], "mood": "bad"}}
+    risk_model.update(state, extra)
+    assert state == risk_model.fit(rows + [extra])
+    risk_model.remove(state, extra)
+    assert state == risk_model.fit(rows)
+
+
+def test_older_changes_mark_the_state_stale():
+    rows = _history()
+    state = risk_model.fit(rows[:30] + rows[31:])
+    risk_model.update(state, rows[30])        # back-dated
+    assert state["stale"]
+    state = risk_model.fit(rows)
+    risk_model.remove(state, rows[10])
+    assert state["stale"]
+    assert "stale" not in risk_model.fit(rows)
+
+
+def test_back_dated_insert_does_not_read_the_full_history(app):
+    main = app
+    rows = _history()
+    for row in rows:
+        row.update(user_id="u1", status="confirmed", raw_text="x")
+
+    async def go():
+        await main.storage.insert_entries(rows[:30] + rows[31:])
+        await main.rebuild_aggregates("u1")
+        reads = []
+        history = main.storage.history
+
+        async def counted_history(*args, **kwargs):
+            reads.append(args)
+            return await history(*args, **kwargs)
+
+        main.storage.history = counted_history
+        inserted = await main.storage.insert_entries([rows[30]])
+        await main.update_aggregates("u1", add=inserted)
+        agg = await main.storage.get_aggregates("u1")
+        assert reads == []
+        assert agg["total"] == len(rows) and agg["risk"]["stale"]
+
+    asyncio.run(go())
+
+
+def test_confirm_edit_of_the_last_day_keeps_aggregates_equal_to_a_rebuild(app):
+    main = app
+    rows = _history()
+    for row in rows:
+        row.update(user_id="u1", status="confirmed", raw_text="x")
+
+    async def go():
+        inserted = await main.storage.insert_entries(rows)
+        await main.rebuild_aggregates("u1")
+        previous = inserted[-1]
+        updated = await main.storage.update_entry(previous["id"], {"extracted_json": _edited(previous, symptoms=[])["extracted_json"]})
+        await main.update_aggregates("u1", add=[updated], remove=[previous])
+        agg = await main.storage.get_aggregates("u1")
+        assert agg == main._aggregates_from_entries(await main.storage.history("u1"))
+
+    asyncio.run(go())
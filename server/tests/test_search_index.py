@@ -0,0 +1,94 @@
+import asyncio
+
+import httpx
+
+from search_index import SearchIndex, parse_query, stem, tokenize
+
+
+def _index(tmp_path, texts: dict[str, str], user_id: str = "u1") -> SearchIndex:
+    index = SearchIndex(str(tmp_path / "search.sqlite3"))
+    index.add([{"id": entry_id, "user_id": user_id, "date": "2026-01-01", "raw_text": text}
+               for entry_id, text in texts.items()])
+    return index
+
+
+def _ids(result: dict) -> list[str]:
+    return [r["entry_id"] for r in result["results"]]
+
+
+def test_stemming_folds_plurals_and_verb_forms():
+    assert stem("headaches") == stem("headache")
+    assert stem("running") == stem("run")
+    assert stem("tired") == stem("tiring")
+    assert [t for t, *_ in tokenize("The migraines, and I'm TIRED")] == [stem("migraine"), stem("tired")]
+
+
+def test_query_syntax():
+    terms, prefixes, phrases = parse_query('wine migr* "red wine" "alone"')
+    assert terms == [stem("wine"), stem("alone")]
+    assert prefixes == ["migr"]
+    assert phrases == [[(stem("red"), 0), (stem("wine"), 1)]]
+
+
+def test_bm25_prefers_rarer_terms_and_shorter_entries(tmp_path):
+    index = _index(tmp_path, {
+        "e1": "headache after red wine",
+        "e2": "headache again, long day at work, meetings, commute, more meetings and a late dinner",
+        "e3": "headache in the morning",
+        "e4": "slept well, wine with dinner",
+    })
+    ranked = _ids(index.search("u1", "headache"))
+    assert set(ranked[:2]) == {"e1", "e3"} and ranked[-1] == "e2"   # same tf, shorter entries first
+    assert _ids(index.search("u1", "headache wine"))[0] == "e1"     # matches both words
+    assert index.search("u1", "headache wine")["total"] == 4
+    index.close()
+
+
+def test_phrase_must_appear_in_order(tmp_path):
+    index = _index(tmp_path, {"e1": "red wine at dinner", "e2": "wine, red face", "e3": "red, then some wine"})
+    assert _ids(index.search("u1", '"red wine"')) == ["e1"]
+    assert set(_ids(index.search("u1", "red wine"))) == {"e1", "e2", "e3"}
+    index.close()
+
+
+def test_prefix_matches_every_term_starting_with_it(tmp_path):
+    index = _index(tmp_path, {"e1": "migraine again", "e2": "migraines all week", "e3": "mild headache"})
+    assert set(_ids(index.search("u1", "migr*"))) == {"e1", "e2"}
+    assert _ids(index.search("u1", "zz*")) == []
+    index.close()
+
+
+def test_users_and_reindexing_are_isolated(tmp_path):
+    index = _index(tmp_path, {"e1": "headache"})
+    index.add([{"id": "e2", "user_id": "u2", "date": "2026-01-01", "raw_text": "headache"}])
+    assert _ids(index.search("u1", "headache")) == ["e1"]
+    index.add([{"id": "e1", "user_id": "u1", "date": "2026-01-01", "raw_text": "fine today"}])   # edited
+    assert _ids(index.search("u1", "headache")) == [] and _ids(index.search("u1", "fine")) == ["e1"]
+    index.remove("u1", "e1")
+    assert index.search("u1", "fine")["total"] == 0
+    index.close()
+
+
+def test_snippets_are_escaped_and_marked(tmp_path):
+    index = _index(tmp_path, {"e1": "<b>bad</b> headache & nausea"})
+    snippet = index.search("u1", "headache")["results"][0]["snippet"]
+    assert "<mark>headache</mark>" in snippet and "&lt;b&gt;" in snippet and "&amp;" in snippet
+    index.close()
+
+
+def test_endpoint_builds_the_index_from_history_and_pages(app):
+    main = app
+
+    async def go():
+        rows = [{"user_id": "u1", "date": f"2026-01-{d:02d}", "raw_text": f"headache day {d}", "status": "confirmed",
+                 "extracted_json": {}} for d in range(1, 6)]
+        await main.storage.insert_entries(rows)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            first = (await client.get("/entries/u1/search", params={"q": "headaches", "limit": 3})).json()
+            assert first["total"] == 5 and len(first["results"]) == 3 and first["next_offset"] == 3
+            rest = (await client.get("/entries/u1/search", params={"q": "headaches", "limit": 3, "offset": 3})).json()
+            assert rest["next_offset"] is None
+            assert {r["entry_id"] for r in first["results"] + rest["results"]} == {r["id"] for r in await main.storage.history("u1")}
+            assert (await client.get("/entries/u1/search", params={"q": "  "})).status_code == 400
+
+    asyncio.run(go())
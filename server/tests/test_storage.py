@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeSupabase
+from storage import SQLiteStorage, SupabaseStorage
+
+
+@pytest.fixture(params=["sqlite", "supabase"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        backend = SQLiteStorage(str(tmp_path / "koru.sqlite3"))
+    else:
+        backend = SupabaseStorage(client=FakeSupabase())
+        backend.PAGE_SIZE = 4  # so history has to page
+    yield backend
+    asyncio.run(backend.close())
+
+
+def _row(day: str, status: str = "confirmed", **extra) -> dict:
+    return {"user_id": "u1", "date": day, "raw_text": day, "extracted_json": {"mood": "good"}, "status": status, **extra}
+
+
+async def _seed(store) -> list[dict]:
+    # Several entries share a day, so ordering has to fall back to id
+    rows = [_row(f"2026-01-{d:02d}") for d in (1, 2, 2, 2, 3, 4, 4, 5, 6, 6)]
+    rows.append(_row("2026-01-03", status="pending"))
+    rows.append({**_row("2026-01-03"), "user_id": "u2"})
+    return await store.insert_entries(rows)
+
+
+def _keys(rows: list[dict]) -> list[tuple[str, str]]:
+    return [(str(r["date"])[:10], r["id"]) for r in rows]
+
+
+def test_insert_and_get(store):
+    async def go():
+        inserted = await store.insert_entries([_row("2026-01-01")])
+        assert inserted[0]["id"]
+        got = await store.get_entry(inserted[0]["id"], "id, date, extracted_json, status")
+        assert got == {"id": inserted[0]["id"], "date": "2026-01-01", "extracted_json": {"mood": "good"}, "status": "confirmed"}
+        assert await store.get_entry("missing") is None
+
+    asyncio.run(go())
+
+
+def test_history_is_confirmed_oldest_first_with_ties_by_id(store):
+    async def go():
+        inserted = await _seed(store)
+        confirmed = sorted(_keys(r for r in inserted if r["status"] == "confirmed" and r["user_id"] == "u1"))
+        assert _keys(await store.history("u1")) == confirmed
+        assert _keys(await store.history("u1", limit=3)) == confirmed[-3:]
+
+    asyncio.run(go())
+
+
+def test_list_entries_pages_newest_first_by_keyset(store):
+    async def go():
+        inserted = await _seed(store)
+        expected = sorted(_keys(r for r in inserted if r["status"] == "confirmed" and r["user_id"] == "u1"), reverse=True)
+
+        pages, before = [], None
+        while True:
+            page = await store.list_entries("u1", "id, date", before=before, limit=3)
+            pages += _keys(page)
+            if len(page) < 3:
+                break
+            before = _keys(page)[-1]
+        assert pages == expected
+
+        ranged = await store.list_entries("u1", "id, date", start="2026-01-02", end="2026-01-04")
+        assert _keys(ranged) == [k for k in expected if "2026-01-02" <= k[0] <= "2026-01-04"]
+
+    asyncio.run(go())
+
+
+def test_history_page_continues_after_a_keyset(store):
+    async def go():
+        inserted = await _seed(store)
+        expected = sorted(_keys(r for r in inserted if r["status"] == "confirmed" and r["user_id"] == "u1"))
+        walked, after = [], None
+        while page := await store.history_page("u1", "id, date", limit=4, after=after):
+            walked += _keys(page)
+            after = walked[-1]
+        assert walked == expected
+
+    asyncio.run(go())
+
+
+def test_update_entry_checks_the_expected_status(store):
+    async def go():
+        (pending,) = await store.insert_entries([_row("2026-01-01", status="pending")])
+        assert await store.update_entry(pending["id"], {"status": "confirmed"}, expect_status="failed") is None
+        updated = await store.update_entry(pending["id"], {"status": "confirmed"}, expect_status="pending")
+        assert updated["status"] == "confirmed"
+        assert await store.update_entry(pending["id"], {"status": "confirmed"}, expect_status="pending") is None
+
+    asyncio.run(go())
+
+
+def test_entries_on_includes_every_status(store):
+    async def go():
+        await _seed(store)
+        rows = await store.entries_on("u1", "2026-01-03", "id, status")
+        assert sorted(r["status"] for r in rows) == ["confirmed", "pending"]
+
+    asyncio.run(go())
+
+
+def test_aggregates_round_trip(store):
+    async def go():
+        assert await store.get_aggregates("u1") is None
+        await store.save_aggregates("u1", {"total": 3})
+        await store.save_aggregates("u1", {"total": 4})
+        assert await store.get_aggregates("u1") == {"total": 4}
+        await store.delete_aggregates("u1")
+        assert await store.get_aggregates("u1") is None
+
+    asyncio.run(go())
+
+
+def test_unknown_columns_are_rejected(store):
+    async def go():
+        with pytest.raises(ValueError):
+            await store.list_entries("u1", "id, password")
+
+    asyncio.run(go())
@@ -0,0 +1,72 @@
+import asyncio
+
+import httpx
+
+import telemetry
+
+
+def test_counters_and_histograms_render_in_prometheus_text_format():
+    registry = telemetry.Registry()
+    requests = registry.counter("t_requests_total", "Requests.", ("route",))
+    latency = registry.histogram("t_latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    requests.inc('/a"b')
+    requests.inc('/a"b', amount=2)
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+    registry.collector(lambda: [("t_depth", "gauge", "Depth.", [({"queue": "x"}, 3)])])
+
+    lines = registry.render().splitlines()
+    assert lines[:3] == ["# HELP t_requests_total Requests.", "# TYPE t_requests_total counter",
+                         't_requests_total{route="/a\\"b"} 3']
+    assert 't_latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 't_latency_seconds_bucket{le="1.0"} 2' in lines
+    assert 't_latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "t_latency_seconds_sum 5.55" in lines and "t_latency_seconds_count 3" in lines
+    assert lines[-2:] == ["# TYPE t_depth gauge", 't_depth{queue="x"} 3']
+
+
+def test_instrumented_storage_times_and_counts_errors():
+    class Backend:
+        name = "fake"
+
+        async def ok(self):
+            return 1
+
+        async def broken(self):
+            raise KeyError("x")
+
+        def sync(self):
+            return "untouched"
+
+    storage = telemetry.InstrumentedStorage(Backend())
+    errors = telemetry.STORAGE_ERRORS.values.get(("fake", "broken", "KeyError"), 0)
+
+    async def go():
+        assert await storage.ok() == 1
+        try:
+            await storage.broken()
+        except KeyError:
+            pass
+
+    asyncio.run(go())
+    assert storage.sync() == "untouched"
+    assert telemetry.STORAGE_ERRORS.values[("fake", "broken", "KeyError")] == errors + 1
+    assert telemetry.STORAGE_LATENCY.series[("fake", "ok")][-1] > 0
+
+
+def test_requests_are_labelled_by_route_template(app):
+    main = app
+
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            for user in ("u1", "u2", "u3"):
+                await client.get(f"/entries/{user}")
+            await client.get("/no/such/path")
+            text = (await client.get("/metrics")).text
+
+        assert 'koru_http_requests_total{method="GET",route="/entries/{user_id}",status="2xx"}' in text
+        assert 'koru_http_requests_total{method="GET",route="unmatched",status="4xx"}' in text
+        assert 'route="/entries/u1"' not in text
+        assert "koru_job_queue_jobs" in text and "koru_http_requests_in_flight" in text
+
+    asyncio.run(go())
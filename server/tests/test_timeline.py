@@ -0,0 +1,141 @@
+import asyncio
+
+import httpx
+
+from benchmarks.synthetic import synthetic_entries
+
+
+def _client(main) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+
+
+async def _seed(main, n: int = 120):
+    rows = synthetic_entries(n, user_id="u1")
+    for row in rows:
+        row.update(main._derived_columns(row["extracted_json"]))
+    await main.storage.insert_entries(rows)
+
+
+def test_cold_first_page_does_not_wait_for_the_full_history(app):
+    main = app
+
+    async def go():
+        await _seed(main)
+        release = asyncio.Event()
+        history, list_entries = main.storage.history, main.storage.list_entries
+        listed = []
+
+        async def slow_history(*args, **kwargs):
+            await release.wait()
+            return await history(*args, **kwargs)
+
+        async def counted_list(*args, **kwargs):
+            listed.append(kwargs["limit"])
+            return await list_entries(*args, **kwargs)
+
+        main.storage.history, main.storage.list_entries = slow_history, counted_list
+        async with _client(main) as client:
+            r = await asyncio.wait_for(client.get("/entries/u1", params={"limit": 20}), 5)
+            assert r.status_code == 200 and len(r.json()["entries"]) == 20
+            assert listed == [21]                 # one keyset query, one row past the page
+
+            release.set()
+            await asyncio.gather(*main._entry_fills.values())
+            r = await client.get("/entries/u1", params={"limit": 20, "cursor": r.json()["next_cursor"]})
+            assert r.status_code == 200 and len(r.json()["entries"]) == 20
+            assert listed == [21]                 # the next page came from the entry cache
+
+    asyncio.run(go())
+
+
+def test_cursor_walks_every_entry_once(app):
+    main = app
+
+    async def go():
+        await _seed(main, 75)
+        async with _client(main) as client:
+            seen, cursor = [], None
+            while True:
+                params = {"limit": 20, "fields": "id,date", **({"cursor": cursor} if cursor else {})}
+                body = (await client.get("/entries/u1", params=params)).json()
+                seen += [(e["date"], e["id"]) for e in body["entries"]]
+                cursor = body["next_cursor"]
+                if cursor is None:
+                    break
+            assert len(seen) == 75 and seen == sorted(set(seen), reverse=True)
+
+    asyncio.run(go())
+
+
+def test_malformed_cursor_and_fields_are_rejected(app):
+    main = app
+
+    async def go():
+        async with _client(main) as client:
+            for params in ({"cursor": "not-a-cursor"}, {"cursor": main._encode_cursor({"date": "2026-13-01", "id": "x"})},
+                           {"cursor": main._encode_cursor({"date": "2026-01-01", "id": 'a"b'})},
+                           {"fields": "id,secret"}, {"start": "yesterday"}):
+                r = await client.get("/entries/u1", params=params)
+                assert r.status_code == 400, params
+
+    asyncio.run(go())
+
+
+def test_derived_columns_are_denormalized_from_the_extraction(app):
+    main = app
+    derived = main._derived_columns({
+        "symptoms": ["headache"], "food": ["wine"], "sleep_hours": 5, "stress": "high", "exercise": True,
+        "condition": "diabetes", "condition_data": {"glucose": 7.2, "insulin": True},
+    })
+    assert derived == {
+        "tags": ["headache", "wine", "high stress", "exercise", "glucose 7.2", "insulin taken"],
+        "mood": "neutral", "sleep": "low", "stress": "high",
+    }
+    assert main._derived_columns({"sleep": "high", "sleep_hours": 4})["sleep"] == "high"
+    assert main._derived_columns({"stress": "very"})["stress"] is None
+
+
+def test_tag_and_mood_filters_match_cold_and_cached(app):
+    main = app
+
+    async def go():
+        rows = []
+        for day in range(1, 21):
+            extracted = {"symptoms": ["headache"] if day % 3 == 0 else ["mild headache"], "food": [],
+                         "mood": "bad" if day % 2 else "good"}
+            rows.append({"user_id": "u1", "date": f"2026-01-{day:02d}", "raw_text": str(day), "status": "confirmed",
+                         "extracted_json": extracted, **main._derived_columns(extracted)})
+        await main.storage.insert_entries(rows)
+
+        async with _client(main) as client:
+            async def days(**params):
+                body = (await client.get("/entries/u1", params={"fields": "id,date", **params})).json()
+                return [e["date"] for e in body["entries"]]
+
+            cold = [await days(tag="headache"), await days(mood="bad"), await days(tag="headache", mood="good")]
+            await asyncio.gather(*main._entry_fills.values())
+            assert main.entry_cache.entries("u1", main.data_versions.get("u1")) is not None
+            hot = [await days(tag="headache"), await days(mood="bad"), await days(tag="headache", mood="good")]
+
+        assert cold == hot
+        assert cold[0] == [f"2026-01-{d:02d}" for d in (18, 15, 12, 9, 6, 3)]     # exact tags, not substrings
+        assert len(cold[1]) == 10 and cold[2] == ["2026-01-18", "2026-01-12", "2026-01-06"]
+
+    asyncio.run(go())
+
+
+def test_backfill_fills_rows_written_before_the_columns(app):
+    main = app
+    import backfill
+
+    async def go():
+        extracted = {"symptoms": ["fatigue"], "mood": "bad", "stress": "high"}
+        (row,) = await main.storage.insert_entries([
+            {"user_id": "u1", "date": "2026-01-01", "raw_text": "x", "status": "confirmed", "extracted_json": extracted},
+        ])
+        assert await backfill.backfill(batch=10) == {"u1"}
+        stored = await main.storage.get_entry(row["id"], "tags, mood, sleep, stress")
+        assert stored == {"tags": ["fatigue", "high stress"], "mood": "bad", "sleep": None, "stress": "high"}
+        assert await backfill.backfill(batch=10) == set()        # safe to re-run
+
+    asyncio.run(go())
@@ -0,0 +1,105 @@
+import asyncio
+
+import httpx
+
+import timeseries
+
+BP = {"primary": {"key": "bp", "unit": "mmHg", "high": 140, "low": 90, "split": "/"},
+      "indicators": [{"key": "medication", "type": "toggle"}, {"key": "heart_rate", "type": "text", "unit": "bpm"}]}
+
+
+def _day(day: str, *values: float, high: float = 180, low: float = 70) -> dict:
+    points = [{"value": v, "band": timeseries.band(v, {"high": high, "low": low})} for v in values]
+    return {"date": day, **timeseries.daily_rollup(points)}
+
+
+def test_specs_cover_the_split_and_text_metrics():
+    specs = timeseries.metric_specs(BP)
+    assert specs == {
+        "bp": {"unit": "mmHg", "high": 140, "low": 90},
+        "bp_secondary": {"unit": "mmHg", "high": None, "low": None},
+        "heart_rate": {"unit": "bpm", "high": None, "low": None},
+    }
+
+
+def test_readings_are_parsed_from_free_text():
+    assert timeseries.parse_readings(BP, {"bp": "135/85", "heart_rate": "72 bpm", "medication": True}) == [
+        ("bp", 135.0), ("bp_secondary", 85.0), ("heart_rate", 72.0),
+    ]
+    assert timeseries.parse_readings(BP, {"bp": ["120/80", "150/95"]}) == [
+        ("bp", 120.0), ("bp_secondary", 80.0), ("bp", 150.0), ("bp_secondary", 95.0),
+    ]
+    assert timeseries.parse_readings(BP, {"bp": "high", "heart_rate": None}) == []
+
+
+def test_bands_and_daily_rollup():
+    spec = {"high": 180, "low": 70}
+    assert [timeseries.band(v, spec) for v in (60, 70, 180, 200)] == [-1, 0, 0, 1]
+    assert _day("2026-01-01", 60, 100, 200) == {
+        "date": "2026-01-01", "count": 3, "sum": 360, "min": 60, "max": 200, "above": 1, "below": 1,
+    }
+    assert timeseries.daily_rollup([]) is None
+
+
+def test_week_and_month_buckets():
+    days = [_day("2026-01-04", 100), _day("2026-01-05", 200), _day("2026-01-11", 60), _day("2026-02-01", 120)]
+    weeks = timeseries.rollup(days, "week")
+    assert [(w["date"], w["count"]) for w in weeks] == [("2025-12-29", 1), ("2026-01-05", 2), ("2026-01-26", 1)]
+    months = timeseries.rollup(days, "month")
+    assert [(m["date"], m["count"], m["min"], m["max"]) for m in months] == [("2026-01-01", 3, 60, 200),
+                                                                          ("2026-02-01", 1, 120, 120)]
+
+
+def test_auto_bucket_is_the_finest_that_fits():
+    days = [_day(f"2026-01-{d:02d}", 100, 110) for d in range(1, 29)]
+    assert timeseries.choose_bucket(days, 100) == "raw"
+    assert timeseries.choose_bucket(days, 30) == "day"
+    assert timeseries.choose_bucket(days, 5) == "week"
+    assert timeseries.choose_bucket(days, 1) == "month"
+
+
+def test_rolling_average_spans_calendar_days_not_rows():
+    rows = [{"date": "2026-01-01", "count": 1, "sum": 100.0}, {"date": "2026-01-02", "count": 1, "sum": 200.0},
+            {"date": "2026-01-10", "count": 1, "sum": 50.0}]
+    assert [r["rolling_avg"] for r in timeseries.with_rolling(rows, "raw", 3)] == [100.0, 150.0, 50.0]
+
+
+def test_summary_reports_time_outside_the_range():
+    summary = timeseries.summary([_day("2026-01-01", 60, 100), _day("2026-01-02", 200, 100)])
+    assert summary["avg"] == 115.0 and (summary["min"], summary["max"]) == (60, 200)
+    assert (summary["above_pct"], summary["below_pct"], summary["in_range_pct"]) == (25.0, 25.0, 50.0)
+    assert (summary["days_above"], summary["days_below"]) == (1, 1)
+
+
+def _client(main) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+
+
+def test_series_endpoint_builds_from_history_and_follows_writes(app):
+    main = app
+
+    async def go():
+        rows = [{"user_id": "u1", "date": f"2026-01-{d:02d}", "raw_text": "", "status": "confirmed",
+                 "extracted_json": {"condition": "hypertension", "condition_data": {"bp": f"{120 + d}/{80 + d}"}}}
+                for d in range(1, 11)]
+        await main.storage.insert_entries(rows)
+
+        async with _client(main) as client:
+            body = (await client.get("/series/u1/bp")).json()
+            assert body["bucket"] == "raw" and body["condition"] == "hypertension" and body["unit"] == "mmHg"
+            assert [p["value"] for p in body["points"]] == [120.0 + d for d in range(1, 11)]
+            secondary = (await client.get("/series/u1/bp_secondary", params={"start": "2026-01-05"})).json()
+            assert [p["value"] for p in secondary["points"]] == [80.0 + d for d in range(5, 11)]
+
+            request = main.CheckInRequest(user_id="u1", text="bp check", date="2026-01-11",
+                                          condition="hypertension", condition_data={"bp": "150/100"})
+            await main._save_entry(request, {})
+            body = (await client.get("/series/u1/bp", params={"bucket": "week"})).json()
+            assert body["bucket"] == "week" and sum(p["count"] for p in body["points"]) == 11
+            assert body["summary"]["above"] == 1 and body["summary"]["max"] == 150.0
+
+            assert (await client.get("/series/u1/cholesterol")).status_code == 404
+            assert (await client.get("/series/u1/bp", params={"bucket": "hour"})).status_code == 400
+            assert (await client.get("/series/u1/bp", params={"start": "last week"})).status_code == 400
+
+    asyncio.run(go())
@@ -0,0 +1,210 @@
+"""
+Typed, downsampled series for condition metrics (glucose, blood pressure,
+heart rate…).
+
+condition_data arrives as free-form strings ("120/80", "95", "72 bpm"). It is
+parsed once at write time into numeric points — (metric, date, value, band)
+where band is -1 / 0 / 1 for below / inside / above the condition's
+thresholds — and storage keeps a per-day rollup (count, sum, min, max, above,
+below) next to the points. Reads never touch condition_data again: a range
+query is the daily rows for that range, rolled up here into week or month
+buckets when the range is long, with a trailing rolling average and the
+share of readings outside the thresholds.
+"""
+import re
+from datetime import date
+
+NUMBER_RE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)")
+BUCKETS = ("raw", "day", "week", "month")
+
+
+def metric_specs(cfg: dict) -> dict[str, dict]:
+    """Every numeric series a condition config produces: name → {unit, high, low}."""
+    prim = cfg["primary"]
+    specs = {prim["key"]: {"unit": prim["unit"], "high": prim.get("high"), "low": prim.get("low")}}
+    if prim.get("split"):
+        specs[f"{prim['key']}_secondary"] = {"unit": prim["unit"], "high": None, "low": None}
+    for ind in cfg.get("indicators", []):
+        if ind["type"] == "text":
+            specs[ind["key"]] = {"unit": ind.get("unit"), "high": None, "low": None}
+    return specs
+
+
+def _number(raw) -> float | None:
+    if isinstance(raw, bool) or raw is None:
+        return None
+    if isinstance(raw, (int, float)):
+        return float(raw)
+    match = NUMBER_RE.match(str(raw))
+    return float(match.group(1)) if match else None
+
+
+def parse_readings(cfg: dict, values: dict) -> list[tuple[str, float]]:
+    """(metric, value) for every numeric reading in one entry's condition_data.
+    A list value (e.g. "glucose": ["95", "160"]) is several readings that day."""
+    prim = cfg["primary"]
+    readings = []
+    for key in metric_specs(cfg):
+        if key == f"{prim['key']}_secondary":
+            continue
+        raw = values.get(key)
+        for item in raw if isinstance(raw, list) else [raw]:
+            if key == prim["key"] and prim.get("split") and prim["split"] in str(item):
+                parts = str(item).split(prim["split"])
+                first, second = _number(parts[0]), _number(parts[1])
+                if first is not None:
+                    readings.append((key, first))
+                if second is not None:
+                    readings.append((f"{key}_secondary", second))
+                continue
+            value = _number(item)
+            if value is not None:
+                readings.append((key, value))
+    return readings
+
+
+def band(value: float, spec: dict) -> int:
+    if spec.get("high") is not None and value > spec["high"]:
+        return 1
+    if spec.get("low") is not None and value < spec["low"]:
+        return -1
+    return 0
+
+
+def daily_rollup(points: list[dict]) -> dict | None:
+    """One day's rollup row from its points (rows with value and band)."""
+    if not points:
+        return None
+    values = [p["value"] for p in points]
+    return {
+        "count": len(values),
+        "sum": sum(values),
+        "min": min(values),
+        "max": max(values),
+        "above": sum(1 for p in points if p["band"] > 0),
+        "below": sum(1 for p in points if p["band"] < 0),
+    }
+
+
+# ── Bucketing ─────────────────────────────────────────────────────────────────
+def _bucket_index(day: str, bucket: str) -> int:
+    """Ordinal of the bucket containing `day` — consecutive buckets differ by 1."""
+    d = date.fromisoformat(day[:10])
+    if bucket == "month":
+        return d.year * 12 + d.month - 1
+    if bucket == "week":
+        return (d.toordinal() - 1) // 7  # ordinal 1 is a Monday
+    return d.toordinal()
+
+
+def _bucket_label(index: int, bucket: str) -> str:
+    if bucket == "month":
+        return date(index // 12, index % 12 + 1, 1).isoformat()
+    if bucket == "week":
+        return date.fromordinal(index * 7 + 1).isoformat()
+    return date.fromordinal(index).isoformat()
+
+
+def bucket_count(days: list[dict], bucket: str) -> int:
+    return len({_bucket_index(d["date"], bucket) for d in days})
+
+
+def choose_bucket(days: list[dict], max_points: int) -> str:
+    """Finest resolution whose point count fits in `max_points`."""
+    if sum(d["count"] for d in days) <= max_points:
+        return "raw"
+    for bucket in ("day", "week"):
+        if bucket_count(days, bucket) <= max_points:
+            return bucket
+    return "month"
+
+
+def rollup(days: list[dict], bucket: str) -> list[dict]:
+    """Merge daily rows (sorted by date) into day / week / month buckets."""
+    out: list[dict] = []
+    current = None
+    for d in days:
+        index = _bucket_index(d["date"], bucket)
+        if current is None or current["_index"] != index:
+            current = {"_index": index, "date": _bucket_label(index, bucket),
+                       "count": 0, "sum": 0.0, "min": d["min"], "max": d["max"], "above": 0, "below": 0}
+            out.append(current)
+        current["count"] += d["count"]
+        current["sum"] += d["sum"]
+        current["min"] = min(current["min"], d["min"])
+        current["max"] = max(current["max"], d["max"])
+        current["above"] += d["above"]
+        current["below"] += d["below"]
+    return out
+
+
+def with_rolling(rows: list[dict], bucket: str, window: int) -> list[dict]:
+    """
+    Add `rolling_avg` — the mean of every reading in the trailing `window`
+    buckets of calendar time (days for raw points), so gaps in logging don't
+    stretch the window. Rows need date, count and sum, sorted by date.
+    """
+    unit = "day" if bucket == "raw" else bucket
+    indexes = [_bucket_index(r["date"], unit) for r in rows]
+    total = count = 0.0
+    left = 0
+    for right, row in enumerate(rows):
+        total += row["sum"]
+        count += row["count"]
+        while indexes[left] <= indexes[right] - window:
+            total -= rows[left]["sum"]
+            count -= rows[left]["count"]
+            left += 1
+        row["rolling_avg"] = round(total / count, 1) if count else None
+    return rows
+
+
+def time_outside(days: list[dict]) -> dict:
+    """Share of readings (and of days) above / below the thresholds."""
+    readings = sum(d["count"] for d in days)
+    above = sum(d["above"] for d in days)
+    below = sum(d["below"] for d in days)
+
+    def pct(n: int) -> float:
+        return round(n / readings * 100, 1) if readings else 0.0
+
+    return {
+        "readings": readings,
+        "above": above,
+        "below": below,
+        "above_pct": pct(above),
+        "below_pct": pct(below),
+        "in_range_pct": pct(readings - above - below),
+        "days": len(days),
+        "days_above": sum(1 for d in days if d["above"]),
+        "days_below": sum(1 for d in days if d["below"]),
+    }
+
+
+def summary(days: list[dict]) -> dict:
+    readings = sum(d["count"] for d in days)
+    return {
+        "avg": round(sum(d["sum"] for d in days) / readings, 1) if readings else None,
+        "min": min((d["min"] for d in days), default=None),
+        "max": max((d["max"] for d in days), default=None),
+        **time_outside(days),
+    }
+
+
+def shape(rows: list[dict], bucket: str) -> list[dict]:
+    """Public form of bucket rows: avg instead of sum, no internal keys."""
+    if bucket == "raw":
+        return [{"date": r["date"], "value": r["sum"], "band": r["band"], "rolling_avg": r["rolling_avg"]} for r in rows]
+    return [
+        {
+            "date": r["date"],
+            "count": r["count"],
+            "avg": round(r["sum"] / r["count"], 1),
+            "min": r["min"],
+            "max": r["max"],
+            "above": r["above"],
+            "below": r["below"],
+            "rolling_avg": r["rolling_avg"],
+        }
+        for r in rows
+    ]